@@ -0,0 +1,135 @@
+"""Stream a graph's answer to stdout and an output file while the graph runs.
+
+Without streaming, the examples wait for the whole graph and then write
+`output.md` / `Untitled.md` in one go. `stream_answer` runs the graph with
+`astream_events` instead:
+
+- tokens generated inside the `answer_nodes` go to `out` (stdout) and to the
+  output file as they arrive; when an answer node runs again (a new draft),
+  the file is restarted so it only ever holds the latest draft,
+- nodes whose model output is not always the answer (an agent that may
+  reply with a tool call) are left out of `answer_nodes` and listed in
+  `answer_updates` instead: when such a node ends, a function of its state
+  update returns the answer text (or None), which is written out in one go,
+- node start/end events go to a separate progress channel (stderr by
+  default), so they never mix with the answer,
+- the file is written under a unique temporary name in the same directory
+  and moved into place with `os.replace` once the graph is done, so a reader
+  never sees a half-written file and concurrent runs do not clobber each
+  other's partial output (the last run to finish wins).
+
+    result = asyncio.run(stream_answer(runnable, inputs, "output.md", {"incorporate"},
+                                       answer_updates={"call_agent": final_answer_of}))
+"""
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Collection, Dict, Optional, TextIO
+
+
+@dataclass
+class ProgressEvent:
+    node: str
+    status: str  # "start" or "end"
+    elapsed: float  # seconds since the run started
+
+
+def print_progress(event: ProgressEvent, stream: TextIO = sys.stderr):
+    stream.write(f"[{event.elapsed:7.2f}s] {event.node} {event.status}\n")
+    stream.flush()
+
+
+class AtomicStreamFile:
+    """Text file written under a temporary name and renamed into place on commit."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+        self._file = os.fdopen(fd, "w", encoding="utf-8")
+
+    def write(self, text: str):
+        self._file.write(text)
+        self._file.flush()
+
+    def restart(self, text: str = ""):
+        """Discard everything written so far."""
+        self._file.seek(0)
+        self._file.truncate()
+        self.write(text)
+
+    def commit(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+async def stream_answer(
+    runnable,
+    inputs: Dict[str, Any],
+    output_path: str,
+    answer_nodes: Collection[str],
+    final_output: Optional[Callable[[Dict], str]] = None,
+    out: TextIO = sys.stdout,
+    on_progress: Callable[[ProgressEvent], None] = print_progress,
+    config: Optional[Dict] = None,
+    answer_updates: Optional[Dict[str, Callable[[Dict], Optional[str]]]] = None,
+) -> Dict:
+    """Run the graph, streaming answer tokens; return the final state.
+
+    If `final_output(result)` differs from the last streamed draft (e.g. the
+    node post-processes the model output), the file gets the final output.
+    """
+    started = time.perf_counter()
+    file = AtomicStreamFile(output_path)
+    draft_run = None  # run_id of the model call whose tokens are in the file
+    draft = []
+    result = None
+    try:
+        async for event in runnable.astream_events(inputs, config=config, version="v2"):
+            kind = event["event"]
+            node = event.get("metadata", {}).get("langgraph_node")
+
+            if kind == "on_chat_model_stream" and node in answer_nodes:
+                if event["run_id"] != draft_run:
+                    if draft_run is not None:
+                        out.write("\n\n")
+                    draft_run, draft = event["run_id"], []
+                    file.restart()
+                text = event["data"]["chunk"].content
+                draft.append(text)
+                out.write(text)
+                out.flush()
+                file.write(text)
+            elif kind in ("on_chain_start", "on_chain_end") and event["name"] == node and not node.startswith("__"):
+                answer_of = (answer_updates or {}).get(node)
+                if kind == "on_chain_end" and answer_of is not None:
+                    text = answer_of(event["data"]["output"])
+                    if text is not None:
+                        if draft_run is not None:
+                            out.write("\n\n")
+                        draft_run, draft = event["run_id"], [text]
+                        out.write(text)
+                        out.flush()
+                        file.restart(text)
+                status = "start" if kind == "on_chain_start" else "end"
+                on_progress(ProgressEvent(node, status, time.perf_counter() - started))
+            elif kind == "on_chain_end" and not event["parent_ids"]:
+                result = event["data"]["output"]
+
+        out.write("\n")
+        if final_output is not None and final_output(result) != "".join(draft):
+            file.restart(final_output(result))
+        file.commit()
+    except BaseException:
+        file.discard()
+        raise
+    return result
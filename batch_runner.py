@@ -0,0 +1,224 @@
+"""Run a compiled LangGraph graph over a JSONL file of questions.
+
+Each input line is a JSON object with a "question" (and optionally an "id",
+which defaults to the line number). The graph module turns a question into
+graph inputs with its `make_inputs(question)` function and a graph result
+into text with `final_output(result)`.
+
+- graphs run as asyncio tasks, at most `--concurrency` at a time,
+- `--model-limit phi4:latest=2` caps the concurrent calls to one Ollama
+  model across all running graphs (Ollama serves a model with a fixed
+  number of parallel slots, so extra requests only queue on the server),
+- every result is appended to the output JSONL as soon as it finishes,
+- on restart, ids that already have an "ok" record in the output are
+  skipped, so a crashed run resumes where it stopped,
+- at the end, throughput and p50/p95/p99 latency are printed.
+
+Usage:
+    python batch_runner.py questions.jsonl results.jsonl \\
+        --graph example_agent_web_search:runnable --concurrency 8 \\
+        --model-limit phi4:latest=2
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+
+class ModelConcurrencyLimiter(AsyncCallbackHandler):
+    """Callback handler that caps concurrent calls per model.
+
+    The slot is taken in `on_chat_model_start`, which the model awaits before
+    sending its request, and released when the call ends or fails. Models are
+    identified by the `ls_model_name` that LangChain puts in the run metadata.
+    """
+
+    def __init__(self, limits: Dict[str, int], poll_interval: float = 0.01):
+        self.limits = limits
+        self.poll_interval = poll_interval
+        # Threading semaphores, because graph nodes may be sync functions that
+        # LangGraph runs in worker threads, each with its own event loop for
+        # async callbacks.
+        self._semaphores = {model: threading.BoundedSemaphore(n) for model, n in limits.items()}
+        self._held: Dict[UUID, threading.BoundedSemaphore] = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any):
+        semaphore = self._semaphores.get((metadata or {}).get("ls_model_name"))
+        if semaphore is None:
+            return
+        while not semaphore.acquire(blocking=False):
+            await asyncio.sleep(self.poll_interval)
+        self._held[run_id] = semaphore
+
+    async def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        self._release(run_id)
+
+    async def on_llm_error(self, error, *, run_id: UUID, **kwargs: Any):
+        self._release(run_id)
+
+    def _release(self, run_id: UUID):
+        semaphore = self._held.pop(run_id, None)
+        if semaphore is not None:
+            semaphore.release()
+
+
+@dataclass
+class BatchStats:
+    ok: int = 0
+    errors: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        return (self.ok + self.errors) / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile of the latencies, in seconds."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    def report(self) -> str:
+        return (
+            f"{self.ok} ok, {self.errors} errors, {self.skipped} skipped (already done) in {self.elapsed:.1f}s: "
+            f"{self.throughput:.2f} questions/s, latency p50 {self.percentile(50):.2f}s "
+            f"p95 {self.percentile(95):.2f}s p99 {self.percentile(99):.2f}s"
+        )
+
+
+def read_questions(path: str) -> Iterator[Tuple[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                record = json.loads(line)
+                yield str(record.get("id", line_number)), record["question"]
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids with an "ok" record in `path`, dropping a torn last line left by a crash."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            data = data[: data.rfind(b"\n") + 1]
+            f.truncate(len(data))
+    done = set()
+    for line in data.decode("utf-8").splitlines():
+        record = json.loads(line)
+        if record["status"] == "ok":
+            done.add(record["id"])
+    return done
+
+
+def load_graph(spec: str):
+    """Import "module:attribute" and return (module, compiled graph)."""
+    module_name, _, attribute = spec.partition(":")
+    module = importlib.import_module(module_name)
+    return module, getattr(module, attribute or "runnable")
+
+
+async def run_batch(
+    graph_spec: str,
+    input_path: str,
+    output_path: str,
+    concurrency: int = 4,
+    model_limits: Optional[Dict[str, int]] = None,
+    recursion_limit: int = 50,
+) -> BatchStats:
+    module, runnable = load_graph(graph_spec)
+    stats = BatchStats()
+    done = completed_ids(output_path)
+    config = {"recursion_limit": recursion_limit}
+    if model_limits:
+        config["callbacks"] = [ModelConcurrencyLimiter(model_limits)]
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2 * concurrency)
+    out = open(output_path, "a", encoding="utf-8")
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            question_id, question = item
+            started = time.perf_counter()
+            record = {"id": question_id, "question": question}
+            try:
+                result = await runnable.ainvoke(module.make_inputs(question), config=config)
+                record.update(status="ok", output=module.final_output(result))
+                stats.ok += 1
+            except Exception as e:
+                record.update(status="error", error=f"{type(e).__name__}: {e}")
+                stats.errors += 1
+            latency = time.perf_counter() - started
+            stats.latencies.append(latency)
+            record["latency_s"] = round(latency, 3)
+            # One write per line, flushed right away, so a crash loses at most
+            # the line being written (completed_ids drops it on restart).
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+
+    started = time.perf_counter()
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        for question_id, question in read_questions(input_path):
+            if question_id in done:
+                stats.skipped += 1
+                continue
+            await queue.put((question_id, question))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        out.close()
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def parse_model_limits(values: List[str]) -> Dict[str, int]:
+    limits = {}
+    for value in values:
+        model, sep, limit = value.rpartition("=")
+        if not sep or not model:
+            raise argparse.ArgumentTypeError(f"Invalid model limit: {value}. Expected MODEL=N.")
+        limits[model] = int(limit)
+    return limits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file with one {\"id\", \"question\"} object per line")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    parser.add_argument("--graph", default="example_agent_web_search:runnable", help="module:attribute of the compiled graph")
+    parser.add_argument("--concurrency", type=int, default=4, help="graphs running at the same time")
+    parser.add_argument("--model-limit", action="append", default=[], metavar="MODEL=N",
+                        help="max concurrent calls to MODEL (repeatable)")
+    parser.add_argument("--recursion-limit", type=int, default=50)
+    args = parser.parse_args()
+
+    stats = asyncio.run(run_batch(
+        args.graph,
+        args.input,
+        args.output,
+        concurrency=args.concurrency,
+        model_limits=parse_model_limits(args.model_limit),
+        recursion_limit=args.recursion_limit,
+    ))
+    print(stats.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Benchmark: checkpoint size and load time, full msgpack vs. zstd vs. delta + zstd.
+
+Runs a long agent-style conversation (one ~1 KB AIMessage appended to a
+`MessageLog` per step, plus a replaced `content` string and a counter)
+through a graph with each saver, then reports:
+
+- bytes per checkpoint (average stored checkpoint blob) and database size,
+- write time per step,
+- cold load time of the latest checkpoint (what `graph.get_state` does after
+  a restart; the delta saver is opened with an empty cache, so it replays up
+  to `snapshot_every - 1` deltas onto a snapshot).
+
+Usage:
+    python benchmark_checkpoint_serde.py --steps 500 --snapshot-every 16
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import Annotated, TypedDict
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph import END, START, StateGraph
+
+from checkpoint_store import BatchedSqliteSaver
+from delta_checkpoint import DeltaSqliteSaver, ZstdSerializer
+from message_log import MessageLog, append_messages
+
+WORDS = ("fasting insulin autophagy ketones metabolism glucose hormone study research "
+         "benefit risk cell energy body weight brain sleep protein fat muscle the of and "
+         "to in is that for with as on by").split()
+
+CONFIG = {"configurable": {"thread_id": "bench"}}
+
+
+class State(TypedDict):
+    messages: Annotated[MessageLog, append_messages]
+    content: str
+    num_iterations: int
+
+
+def build_graph(checkpointer, seed: int = 0):
+    rng = random.Random(seed)
+
+    def respond(state: State):
+        text = " ".join(rng.choice(WORDS) for _ in range(160))
+        return {"messages": [AIMessage(content=text)], "content": text[:300], "num_iterations": state["num_iterations"] + 1}
+
+    builder = StateGraph(State)
+    builder.add_node("respond", respond)
+    builder.add_edge(START, "respond")
+    builder.add_edge("respond", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def open_saver(mode: str, path: str, snapshot_every: int, cache_size: int = 64):
+    if mode == "default":
+        return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+    if mode == "zstd":
+        return BatchedSqliteSaver.from_path(path, serde=ZstdSerializer())
+    return DeltaSqliteSaver.from_path(path, snapshot_every=snapshot_every, cache_size=cache_size)
+
+
+def close_saver(saver):
+    if isinstance(saver, BatchedSqliteSaver):
+        saver.close()
+    else:
+        saver.conn.close()
+
+
+def run(mode: str, directory: str, steps: int, snapshot_every: int, reads: int = 20):
+    path = os.path.join(directory, f"{mode}.sqlite")
+    saver = open_saver(mode, path, snapshot_every)
+    graph = build_graph(saver)
+    start = time.perf_counter()
+    graph.invoke({"messages": [HumanMessage(content="Tell me about fasting.")], "content": "", "num_iterations": 0}, CONFIG)
+    for _ in range(steps - 1):
+        graph.invoke({"messages": [HumanMessage(content="Go on.")]}, CONFIG)
+    write_seconds = (time.perf_counter() - start) / steps
+    expected = graph.get_state(CONFIG).values
+    close_saver(saver)
+
+    saver = open_saver(mode, path, snapshot_every, cache_size=0)
+    start = time.perf_counter()
+    for _ in range(reads):
+        state = build_graph(saver).get_state(CONFIG).values
+    load_seconds = (time.perf_counter() - start) / reads
+    assert state["messages"] == expected["messages"] and state["content"] == expected["content"]
+    close_saver(saver)
+
+    conn = sqlite3.connect(path)
+    count, blob_bytes = conn.execute("SELECT count(*), sum(length(checkpoint)) FROM checkpoints").fetchone()
+    conn.execute("VACUUM")
+    conn.close()
+    print(f"{mode:<8} {blob_bytes / count:10.0f} B/checkpoint  db {os.path.getsize(path) / 1e6:7.1f} MB  "
+          f"write {write_seconds * 1e3:7.2f} ms/step  cold load {load_seconds * 1e3:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--snapshot-every", type=int, default=16)
+    parser.add_argument("--modes", default="default,zstd,delta")
+    args = parser.parse_args()
+
+    print(f"{args.steps} steps, ~1 KB message per step")
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in args.modes.split(","):
+            run(mode, directory, args.steps, args.snapshot_every)
+
+
+if __name__ == "__main__":
+    main()
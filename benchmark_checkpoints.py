@@ -0,0 +1,139 @@
+"""Benchmark: SQLite checkpoint write throughput and get_state latency as history grows.
+
+Writes `--steps` checkpoints (default 100k) to one thread, the way a graph
+does it: one `put` plus one `put_writes` per step. After every block of steps
+it reports the write rate of that block, the latency of reading the latest
+checkpoint (what `graph.get_state` does) and the database size, and the
+size once the saver is closed (the retaining savers compact on close). Modes:
+
+1. default: `SqliteSaver`, commit after every write, keeps everything,
+2. batched: `BatchedSqliteSaver`, WAL + synchronous=NORMAL + group commits,
+3. retained: batched, plus keep the last `--keep-last` checkpoints,
+4. async: `AsyncBatchedSqliteSaver` with the same retention, via aput.
+
+Usage:
+    python benchmark_checkpoints.py --steps 100000 --report-every 20000
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from checkpoint_store import AsyncBatchedSqliteSaver, BatchedSqliteSaver
+
+CONFIG = {"configurable": {"thread_id": "bench", "checkpoint_ns": ""}}
+
+
+def make_checkpoint(step: int):
+    """A small checkpoint like the count graph in example_simple_graph_with_db.py writes."""
+    version = f"{step:032}.0"
+    return {
+        "v": 1,
+        "id": str(uuid6(clock_seq=step)),
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "channel_values": {"count": step, "note": "x" * 200},
+        "channel_versions": {"count": version, "note": version},
+        "versions_seen": {"printer": {"count": version}},
+        "pending_sends": [],
+    }
+
+
+def file_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def report(name: str, step: int, block_steps: int, block_seconds: float, read_seconds: float, path: str):
+    print(f"{name:<9} {step:>8} steps  {block_steps / block_seconds:9.0f} checkpoints/s  "
+          f"get latest {read_seconds * 1e3:7.3f} ms  db {file_size(path) / 1e6:6.1f} MB  wal {file_size(path + '-wal') / 1e6:5.1f} MB")
+
+
+def report_closed(name: str, path: str):
+    print(f"{name:<9} closed{'':>46}db {file_size(path) / 1e6:6.1f} MB  wal {file_size(path + '-wal') / 1e6:5.1f} MB")
+
+
+def time_latest(saver, reads: int = 50) -> float:
+    start = time.perf_counter()
+    for _ in range(reads):
+        saver.get_tuple({"configurable": {"thread_id": "bench"}})
+    return (time.perf_counter() - start) / reads
+
+
+def run_sync(name: str, saver, path: str, steps: int, report_every: int):
+    config = CONFIG
+    block_start = time.perf_counter()
+    for step in range(1, steps + 1):
+        checkpoint = make_checkpoint(step)
+        config = saver.put(config, checkpoint, {"source": "loop", "step": step, "writes": {}}, {})
+        saver.put_writes(config, [("count", step)], task_id=f"task-{step}")
+        if step % report_every == 0:
+            elapsed = time.perf_counter() - block_start
+            report(name, step, report_every, elapsed, time_latest(saver), path)
+            block_start = time.perf_counter()
+
+
+async def run_async(name: str, saver, path: str, steps: int, report_every: int):
+    config = CONFIG
+    block_start = time.perf_counter()
+    for step in range(1, steps + 1):
+        checkpoint = make_checkpoint(step)
+        config = await saver.aput(config, checkpoint, {"source": "loop", "step": step, "writes": {}}, {})
+        await saver.aput_writes(config, [("count", step)], task_id=f"task-{step}")
+        if step % report_every == 0:
+            elapsed = time.perf_counter() - block_start
+            read_start = time.perf_counter()
+            for _ in range(50):
+                await saver.aget_tuple({"configurable": {"thread_id": "bench"}})
+            report(name, step, report_every, elapsed, (time.perf_counter() - read_start) / 50, path)
+            block_start = time.perf_counter()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=100_000)
+    parser.add_argument("--report-every", type=int, default=20_000)
+    parser.add_argument("--keep-last", type=int, default=100)
+    parser.add_argument("--modes", default="default,batched,retained,async")
+    args = parser.parse_args()
+    modes = args.modes.split(",")
+
+    with tempfile.TemporaryDirectory() as directory:
+        if "default" in modes:
+            path = os.path.join(directory, "default.sqlite")
+            saver = SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+            run_sync("default", saver, path, args.steps, args.report_every)
+            saver.conn.close()
+            report_closed("default", path)
+
+        if "batched" in modes:
+            path = os.path.join(directory, "batched.sqlite")
+            saver = BatchedSqliteSaver.from_path(path)
+            run_sync("batched", saver, path, args.steps, args.report_every)
+            saver.close()
+            report_closed("batched", path)
+
+        if "retained" in modes:
+            path = os.path.join(directory, "retained.sqlite")
+            saver = BatchedSqliteSaver.from_path(path, keep_last=args.keep_last, compact_interval=1.0)
+            run_sync("retained", saver, path, args.steps, args.report_every)
+            saver.close()
+            report_closed("retained", path)
+
+        if "async" in modes:
+            async def run():
+                path = os.path.join(directory, "async.sqlite")
+                saver = await AsyncBatchedSqliteSaver.from_path(path, keep_last=args.keep_last, compact_interval=1.0)
+                await run_async("async", saver, path, args.steps, args.report_every)
+                await saver.aclose()
+                report_closed("async", path)
+
+            asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
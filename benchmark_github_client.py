@@ -0,0 +1,206 @@
+"""Benchmark: plain PyGithub vs. the ETag-caching, rate-limit-aware client, against a fake GitHub API.
+
+The fake server (a `ThreadingHTTPServer` on 127.0.0.1) serves repositories,
+issues and file contents with strong ETags, answers `If-None-Match` with a
+`304` that does not count against the quota (as GitHub does), and enforces a
+small primary rate limit (`--limit` requests per `--window` seconds) with
+the usual `X-RateLimit-*` headers and a 403 once it is exhausted.
+
+Two workloads, each run with a plain `Github` client and with the client of
+github_client.py installed:
+
+- repeated reads: an agent reading the same repo, issues and files every
+  round (`--rounds` x 8 reads),
+- fresh reads: more distinct URLs than the quota allows, so the plain client
+  runs into 403s and the scheduled one waits for the reset instead.
+
+For each it reports requests sent, quota used, 304s, rate-limit errors and
+wall time.
+
+Usage:
+    python benchmark_github_client.py --rounds 20 --limit 60 --window 5
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict
+
+from github import Auth, Github, GithubException
+from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass, Requester
+
+import github_client
+from github_client import GitHubHTTPCache, RateLimitScheduler
+
+
+class FakeGitHub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, limit: int, window: float, handler=None, latency: float = 0.0):
+        super().__init__(("127.0.0.1", 0), handler or FakeGitHubHandler)
+        self.limit = limit
+        self.window = window
+        self.latency = latency  # seconds added to every response, like a round trip to api.github.com
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "charged": 0, "not_modified": 0, "limited": 0}
+        self._reset_quota(time.time())
+
+    def _reset_quota(self, now: float):
+        self.remaining = self.limit
+        self.reset_at = now + self.window
+
+    def charge(self, conditional_hit: bool) -> Dict[str, str]:
+        """Rate-limit headers for this request, or None if the quota is exhausted."""
+        with self.lock:
+            now = time.time()
+            if now >= self.reset_at:
+                self._reset_quota(now)
+            self.counts["requests"] += 1
+            if conditional_hit:
+                self.counts["not_modified"] += 1
+            elif self.remaining <= 0:
+                self.counts["limited"] += 1
+                return None
+            else:
+                self.remaining -= 1
+                self.counts["charged"] += 1
+            return {
+                "X-RateLimit-Limit": str(self.limit),
+                "X-RateLimit-Remaining": str(self.remaining),
+                "X-RateLimit-Reset": str(int(self.reset_at) + 1),
+                "X-RateLimit-Resource": "core",
+            }
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = self._resource(self.path.split("?", 1)[0])
+        if body is None:
+            return self._send(404, {"message": "Not Found"}, {})
+        payload = json.dumps(body).encode("utf-8")
+        etag = '"%s"' % hashlib.sha1(payload).hexdigest()
+        conditional_hit = self.headers.get("If-None-Match") == etag
+        rate_headers = self.server.charge(conditional_hit)
+        if rate_headers is None:
+            reset = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(self.server.reset_at) + 1)}
+            return self._send(403, {"message": "API rate limit exceeded"}, reset)
+        if conditional_hit:
+            return self._send(304, None, {**rate_headers, "ETag": etag})
+        self._send(200, payload, {**rate_headers, "ETag": etag})
+
+    def _resource(self, path: str):
+        parts = path.strip("/").split("/")
+        if len(parts) < 3 or parts[0] != "repos":
+            return None
+        owner, name = parts[1], parts[2]
+        base = f"{self.server.url}/repos/{owner}/{name}"
+        if len(parts) == 3:
+            return {"id": 1, "name": name, "full_name": f"{owner}/{name}", "url": base,
+                    "default_branch": "main", "description": "fake repository"}
+        if len(parts) == 5 and parts[3] == "issues":
+            number = int(parts[4])
+            return {"id": number, "number": number, "title": f"Issue {number}", "body": "x" * 2000,
+                    "state": "open", "url": f"{base}/issues/{number}"}
+        if len(parts) >= 5 and parts[3] == "contents":
+            file_path = "/".join(parts[4:])
+            content = base64.b64encode((f"# {file_path}\n" + "print('hello')\n" * 200).encode()).decode()
+            return {"type": "file", "encoding": "base64", "path": file_path, "name": parts[-1],
+                    "content": content, "size": len(content), "sha": hashlib.sha1(file_path.encode()).hexdigest(),
+                    "url": f"{base}/contents/{file_path}"}
+        return None
+
+    def _send(self, status: int, body, headers: Dict[str, str]):
+        if isinstance(body, dict):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body or b"")))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+def repeated_reads(gh: Github, rounds: int):
+    for _ in range(rounds):
+        repo = gh.get_repo("octo/agent")
+        for number in (1, 2, 3):
+            repo.get_issue(number).title
+        for path in ("README.md", "src/app.py", "src/tools.py", "pyproject.toml"):
+            repo.get_contents(path).decoded_content
+
+
+def fresh_reads(gh: Github, count: int):
+    repo = gh.get_repo("octo/agent", lazy=True)
+    for number in range(1, count + 1):
+        repo.get_issue(number).title
+
+
+def run(label: str, server: FakeGitHub, workload: Callable[[Github], None]):
+    server.counts = dict.fromkeys(server.counts, 0)
+    server._reset_quota(time.time())
+    gh = Github(base_url=server.url, auth=Auth.Token("fake"), retry=None, seconds_between_requests=None)
+    errors = 0
+    start = time.perf_counter()
+    try:
+        workload(gh)
+    except GithubException as e:
+        if e.status != 403:
+            raise
+        errors += 1
+    elapsed = time.perf_counter() - start
+    c = server.counts
+    print(f"  {label:<10} requests {c['requests']:4}  quota used {c['charged']:4}  304s {c['not_modified']:4}  "
+          f"rate-limited {c['limited']:3}  failed {'yes' if errors else 'no ':3}  {elapsed:6.2f}s")
+
+
+def plain_client():
+    Requester._Requester__httpConnectionClass = HTTPRequestsConnectionClass
+    Requester._Requester__httpsConnectionClass = HTTPSRequestsConnectionClass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--fresh", type=int, default=150, help="distinct issues read in the fresh workload")
+    parser.add_argument("--limit", type=int, default=60, help="fake primary rate limit per window")
+    parser.add_argument("--window", type=float, default=5.0, help="rate-limit window in seconds")
+    args = parser.parse_args()
+
+    server = FakeGitHub(args.limit, args.window)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as directory:
+        cache = GitHubHTTPCache(os.path.join(directory, "github_cache.sqlite"))
+        workloads = [
+            (f"repeated reads ({args.rounds} rounds x 8)", lambda gh: repeated_reads(gh, args.rounds)),
+            (f"fresh reads ({args.fresh} issues)", lambda gh: fresh_reads(gh, args.fresh)),
+        ]
+        for title, workload in workloads:
+            print(f"{title}, limit {args.limit}/{args.window:g}s:")
+            plain_client()
+            run("plain", server, workload)
+            cache.clear()
+            scheduler = github_client.install(cache, RateLimitScheduler(pace_below=args.limit // 4))
+            run("cached", server, workload)
+            print(f"  {'':<10} {scheduler.stats}")
+        cache.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
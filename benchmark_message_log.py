@@ -0,0 +1,100 @@
+"""Benchmark: copying `messages + [new]` vs. the append-only MessageLog channel.
+
+Runs the same LangGraph loop (one node appending one AIMessage per step) with
+two State definitions and a MemorySaver checkpointer:
+
+- copy:   `messages: list`, the node returns `messages + [new_message]`
+- append: `messages: Annotated[MessageLog, append_messages]`, the node returns `[new_message]`
+
+and reports per-step wall time, bytes of the node's serialized write, peak
+traced memory, and the serialized checkpoint per step. The last one is what
+a checkpointer actually stores: the `messages` channel changes every step,
+so its value is serialized in full each time and stays O(history) in both
+modes. MessageLog shrinks the node write and the copying, not the
+checkpoint; for that see delta_checkpoint.py.
+
+Usage:
+    python benchmark_message_log.py --steps 200
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Annotated, List, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph import END, START, StateGraph
+
+from message_log import MessageLog, append_messages
+
+serde = JsonPlusSerializer()
+
+
+class CopyState(TypedDict):
+    messages: List[BaseMessage]
+    step: int
+
+
+class AppendState(TypedDict):
+    messages: Annotated[MessageLog, append_messages]
+    step: int
+
+
+def build(state_type, append: bool, steps: int, write_sizes: List[int], step_times: List[float]):
+    def node(state):
+        started = time.perf_counter()
+        new_message = AIMessage(content=f"Step {state['step']}: " + "lorem ipsum " * 40)
+        if append:
+            update = {"messages": [new_message], "step": state["step"] + 1}
+        else:
+            update = {"messages": state["messages"] + [new_message], "step": state["step"] + 1}
+        write_sizes.append(len(serde.dumps_typed(update["messages"])[1]))
+        step_times.append(time.perf_counter() - started)
+        return update
+
+    def should_continue(state):
+        return END if state["step"] >= steps else "node"
+
+    builder = StateGraph(state_type)
+    builder.add_node("node", node)
+    builder.add_edge(START, "node")
+    builder.add_conditional_edges("node", should_continue, {"node": "node", END: END})
+    return builder.compile(checkpointer=MemorySaver())
+
+
+def run(name: str, state_type, append: bool, steps: int):
+    write_sizes, step_times = [], []
+    graph = build(state_type, append, steps, write_sizes, step_times)
+    config = {"configurable": {"thread_id": name}, "recursion_limit": steps + 10}
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = graph.invoke({"messages": [HumanMessage(content="start")], "step": 0}, config)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(result["messages"]) == steps + 1
+    checkpoint_sizes = [len(serde.dumps_typed(t.checkpoint)[1]) for t in graph.checkpointer.list(config)][::-1]
+    tail = max(1, steps // 10)
+    print(f"{name:<7} {elapsed / steps * 1000:8.3f} ms/step (graph)  "
+          f"node+serialize first/last {step_times[0] * 1e6:7.1f}/{sum(step_times[-tail:]) / tail * 1e6:7.1f} us  "
+          f"write first/last {write_sizes[0]:7d}/{write_sizes[-1]:8d} B  "
+          f"total writes {sum(write_sizes) / 1e6:8.2f} MB  peak {peak / 1e6:8.2f} MB")
+    print(f"{'':<7} checkpoint first/last {checkpoint_sizes[0]:7d}/{checkpoint_sizes[-1]:8d} B  "
+          f"total checkpoints {sum(checkpoint_sizes) / 1e6:8.2f} MB over {len(checkpoint_sizes)} checkpoints")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.steps} steps, MemorySaver checkpointer")
+    run("copy", CopyState, append=False, steps=args.steps)
+    run("append", AppendState, append=True, steps=args.steps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Benchmark: many content-graph runs on one Ollama host, with and without ModelScheduler.
+
+Starts a fake Ollama server (aiohttp, `/api/chat` and `/api/generate`) that
+behaves like a host with room for one model: pending requests are taken in
+arrival order, a request for a model that is not loaded waits for the
+loaded model's running requests to finish and then pays `--load-seconds`
+to swap it in, and each loaded model serves `--parallel` requests at once,
+`--request-seconds` each. `keep_alive` is honored (0 unloads right away).
+
+Then `--runs` runs of the example_langGraph.py graph execute concurrently,
+with its models replaced by `ChatOllama` instances pointed at the fake
+server: llama3.2 generates and answers as agent, phi4 fact checks (and
+always asks for more sources, so every run does 3 iterations). Reported:
+model loads on the server, wall time and run latency percentiles,
+first without a scheduler and then with `ModelScheduler` (warm-up included).
+
+Usage:
+    python benchmark_model_scheduler.py --runs 16 --load-seconds 2 --request-seconds 0.2
+"""
+import argparse
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from aiohttp import web
+from langchain_core.messages import HumanMessage
+from langchain_ollama import ChatOllama
+
+import example_langGraph as app
+from batch_runner import BatchStats
+from model_scheduler import ModelScheduler
+
+REPLIES = {"phi4:latest": "needs more sources", "llama3.2:latest": "Fasting changes how the body uses energy."}
+
+
+def keep_alive_seconds(value) -> float:
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"(-?[0-9.]+)(ms|s|m|h)?", str(value))
+    number, unit = float(match.group(1)), match.group(2) or "s"
+    return number * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+
+
+class FakeOllama:
+    """Model residency and load cost of a single-model Ollama host.
+
+    With `max_queue`, chat requests beyond that many waiting ones get a 503
+    like Ollama's `OLLAMA_MAX_QUEUE`.
+    """
+
+    def __init__(self, load_seconds: float, request_seconds: float, parallel: int, max_loaded: int = 1,
+                 max_queue: Optional[int] = None):
+        self.load_seconds = load_seconds
+        self.request_seconds = request_seconds
+        self.parallel = parallel
+        self.max_loaded = max_loaded
+        self.max_queue = max_queue
+        self.loads = 0
+        self.requests = 0
+        self.refused = 0
+        self.waiting = 0
+        self.loaded: "OrderedDict[str, float]" = OrderedDict()  # model -> expires at
+        self.inflight: Dict[str, int] = {}
+
+    def start(self):
+        self._pending = asyncio.Lock()  # Ollama schedules pending requests one at a time
+        self._changed = asyncio.Condition()
+
+    async def acquire(self, model: str):
+        async with self._pending:
+            async with self._changed:
+                while model not in self.loaded and len(self.loaded) >= self.max_loaded:
+                    now = time.monotonic()
+                    idle = [m for m in self.loaded if not self.inflight.get(m)]
+                    expired = [m for m in idle if self.loaded[m] <= now]
+                    if idle:
+                        del self.loaded[(expired or idle)[0]]
+                    else:
+                        await self._changed.wait()
+                if model not in self.loaded:
+                    await asyncio.sleep(self.load_seconds)
+                    self.loads += 1
+                    self.loaded[model] = float("inf")
+                while self.inflight.get(model, 0) >= self.parallel:
+                    await self._changed.wait()
+                self.inflight[model] = self.inflight.get(model, 0) + 1
+                self.loaded.move_to_end(model)
+
+    async def release(self, model: str, keep_alive):
+        async with self._changed:
+            self.inflight[model] -= 1
+            if not self.inflight[model]:
+                seconds = keep_alive_seconds(keep_alive)
+                if seconds == 0:
+                    self.loaded.pop(model, None)
+                elif model in self.loaded:
+                    self.loaded[model] = time.monotonic() + seconds if seconds > 0 else float("inf")
+            self._changed.notify_all()
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        model = body["model"]
+        if self.max_queue is not None and self.waiting >= self.max_queue:
+            self.refused += 1
+            return web.json_response({"error": "server busy, please try again.  maximum pending requests exceeded"},
+                                     status=503)
+        self.waiting += 1
+        try:
+            await self.acquire(model)
+        finally:
+            self.waiting -= 1
+        try:
+            await asyncio.sleep(self.request_seconds)
+            self.requests += 1
+        finally:
+            await self.release(model, body.get("keep_alive"))
+        message = {"role": "assistant", "content": REPLIES.get(model, "ok")}
+        final = {"model": model, "created_at": "2024-01-01T00:00:00Z", "message": {"role": "assistant", "content": ""},
+                 "done": True, "done_reason": "stop", "prompt_eval_count": 10, "eval_count": 10}
+        if not body.get("stream", True):
+            return web.json_response({**final, "message": message})
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        chunk = {"model": model, "created_at": final["created_at"], "message": message, "done": False}
+        await response.write((json.dumps(chunk) + "\n" + json.dumps(final) + "\n").encode())
+        await response.write_eof()
+        return response
+
+    async def generate(self, request: web.Request) -> web.Response:
+        """Empty prompt: load the model (or unload it with keep_alive=0)."""
+        body = await request.json()
+        model = body["model"]
+        if keep_alive_seconds(body.get("keep_alive")) == 0:
+            async with self._changed:
+                if not self.inflight.get(model):
+                    self.loaded.pop(model, None)
+            reason = "unload"
+        else:
+            await self.acquire(model)
+            await self.release(model, body.get("keep_alive"))
+            reason = "load"
+        return web.json_response({"model": model, "created_at": "2024-01-01T00:00:00Z", "response": "",
+                                  "done": True, "done_reason": reason})
+
+    def reset(self):
+        self.loaded.clear()
+        self.loads = self.requests = self.refused = 0
+
+
+def serve(fake: FakeOllama) -> str:
+    """Run the fake server on a background thread; returns its base URL."""
+    ready = threading.Event()
+    address = {}
+
+    async def run():
+        fake.start()
+        server = web.Application()
+        server.router.add_post("/api/chat", fake.chat)
+        server.router.add_post("/api/generate", fake.generate)
+        runner = web.AppRunner(server, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        address["url"] = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        ready.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=lambda: asyncio.run(run()), daemon=True).start()
+    ready.wait()
+    return address["url"]
+
+
+def use_models(base_url: str, scheduler: Optional[ModelScheduler]):
+    def make(model: str, temperature: float) -> ChatOllama:
+        llm = ChatOllama(model=model, temperature=temperature, base_url=base_url)
+        return scheduler.manage(llm) if scheduler else llm
+
+    app.generation_model = make("llama3.2:latest", 0.7)
+    app.fact_check_model = make("phi4:latest", 0.0)
+    app.agent_llm = make("phi4:latest", 0.5)
+    app.agent = app.agent_prompt | app.agent_llm
+    app.tool_agent_llm = make("llama3.2:latest", 0.5)
+    app.tool_agent = app.tool_agent_prompt | app.tool_agent_llm.bind_tools(app.tool_router.tools)
+    app.incorporate_chain = app.incorporate_prompt | app.generation_model
+
+
+async def run_graphs(runs: int) -> BatchStats:
+    stats = BatchStats()
+
+    async def one(i: int):
+        start = time.perf_counter()
+        await app.runnable.ainvoke({"messages": [HumanMessage(content=f"Write a blog post about fasting ({i}).")],
+                                    "num_iterations": 0})
+        stats.latencies.append(time.perf_counter() - start)
+        stats.ok += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(runs)))
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=16, help="graph runs at the same time")
+    parser.add_argument("--load-seconds", type=float, default=2.0, help="fake cost of loading a model")
+    parser.add_argument("--request-seconds", type=float, default=0.2, help="fake time per chat request")
+    parser.add_argument("--parallel", type=int, default=4, help="requests one loaded model serves at once")
+    parser.add_argument("--max-wait", type=float, default=10.0, help="scheduler fairness bound in seconds")
+    args = parser.parse_args()
+
+    fake = FakeOllama(args.load_seconds, args.request_seconds, args.parallel)
+    base_url = serve(fake)
+    print(f"{args.runs} concurrent runs x 3 iterations, load {args.load_seconds:g}s, "
+          f"request {args.request_seconds:g}s, {args.parallel} parallel per model")
+
+    use_models(base_url, None)
+    stats = asyncio.run(run_graphs(args.runs))
+    print(f"  no scheduler  {fake.loads:3} model loads for {fake.requests} requests  {stats.elapsed:6.1f}s  "
+          f"run latency p50 {stats.percentile(50):5.1f}s p95 {stats.percentile(95):5.1f}s")
+
+    fake.reset()
+    scheduler = ModelScheduler(parallel=args.parallel, max_wait=args.max_wait)
+    use_models(base_url, scheduler)
+    start = time.perf_counter()
+    scheduler.warm_up(["llama3.2:latest"])
+    warm_up = time.perf_counter() - start
+    stats = asyncio.run(run_graphs(args.runs))
+    print(f"  scheduler     {fake.loads:3} model loads for {fake.requests} requests  {stats.elapsed:6.1f}s  "
+          f"run latency p50 {stats.percentile(50):5.1f}s p95 {stats.percentile(95):5.1f}s  "
+          f"(+{warm_up:.1f}s warm-up at start)")
+    print(f"  {scheduler.stats}")
+
+
+if __name__ == "__main__":
+    main()
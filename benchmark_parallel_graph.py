@@ -0,0 +1,99 @@
+"""Benchmark: wall-clock per iteration of the content graph, sequential vs. parallel branches.
+
+Runs the real nodes of example_langGraph.py with its models swapped for fake
+chat models that take `--latency` seconds per call. Every iteration makes one
+generation call and then the fact check and the agent call; sequentially that
+is about 3 x latency, with the two branches fanned out about 2 x latency.
+
+The parallel graph is timed once more with the fake models wrapped by
+example_langGraph.py's `model_scheduler`, as in the example. The fact check
+(phi4) and the agent (llama3.2) only overlap if the scheduler lets both
+models be active at once (`max_loaded`, from OLLAMA_MAX_LOADED_MODELS);
+with `max_loaded=1` the branches take turns and the speedup is gone.
+
+Usage:
+    python benchmark_parallel_graph.py --latency 0.5 --runs 3
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional, Union
+
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+import example_langGraph as app
+from model_scheduler import ModelScheduler
+
+
+class SlowChatModel(FakeListChatModel):
+    """FakeListChatModel that waits `latency` seconds before every response."""
+
+    model: str = "fake"
+    latency: float = 0.5
+    keep_alive: Union[str, float, None] = None  # set by ModelScheduler.manage()
+    base_url: Optional[str] = None
+
+    def _call(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        time.sleep(self.latency)
+        return super()._call(messages, stop, run_manager, **kwargs)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        yield from super()._stream(messages, stop, run_manager, **kwargs)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            yield chunk
+
+
+def use_fake_models(latency: float, scheduler: Optional[ModelScheduler] = None):
+    def make(model: str, response: str):
+        llm = SlowChatModel(model=model, responses=[response], latency=latency)
+        return scheduler.manage(llm) if scheduler else llm
+
+    # The fact check never passes, so every run does the full 3 iterations.
+    app.generation_model = make("llama3.2:latest", "Fasting changes how the body uses energy.")
+    app.fact_check_model = make("phi4:latest", "needs more sources")
+    app.agent_llm = make("llama3.2:latest", "Thought: Do I need to use a tool? No\nFinal Answer: The content is fine.")
+    app.agent = app.agent_prompt | app.agent_llm
+    app.tool_agent_llm = app.agent_llm  # replies without tool calls, i.e. a final answer
+    app.tool_agent = app.tool_agent_prompt | app.tool_agent_llm
+    app.incorporate_chain = app.incorporate_prompt | app.generation_model
+
+
+async def time_graph(runnable, runs: int) -> float:
+    """Mean seconds per iteration over `runs` runs of the graph."""
+    elapsed = iterations = 0
+    for _ in range(runs):
+        inputs = {"messages": [HumanMessage(content="Write a blog post about fasting.")], "num_iterations": 0}
+        start = time.perf_counter()
+        result = await runnable.ainvoke(inputs)
+        elapsed += time.perf_counter() - start
+        iterations += result["num_iterations"]
+    return elapsed / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per fake model call")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    use_fake_models(args.latency)
+    sequential = asyncio.run(time_graph(app.build_graph(parallel=False), args.runs))
+    parallel = asyncio.run(time_graph(app.build_graph(parallel=True), args.runs))
+    use_fake_models(args.latency, app.model_scheduler)
+    scheduled = asyncio.run(time_graph(app.build_graph(parallel=True), args.runs))
+
+    print(f"model latency {args.latency:.2f}s, {args.runs} runs of 3 iterations")
+    print(f"sequential {sequential:7.3f} s/iteration")
+    print(f"parallel   {parallel:7.3f} s/iteration  ({sequential / parallel:.2f}x faster)")
+    print(f"parallel + model_scheduler (max_loaded={app.model_scheduler.max_loaded}) "
+          f"{scheduled:7.3f} s/iteration  ({sequential / scheduled:.2f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
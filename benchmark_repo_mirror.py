@@ -0,0 +1,185 @@
+"""Benchmark: GitHub toolkit file tools, contents API vs. the tree-SHA repo mirror.
+
+Runs a fake GitHub API (benchmark_github_client.FakeGitHub, with `--latency`
+added to every response) holding a `--files` file repository, and times the
+"overview of existing files in main" workload of the agent examples: list
+every file of the branch, then read `--reads` of them through the toolkit's
+`GitHubAPIWrapper.run`. Reported per run: API requests, wall time and
+whether the answers match the contents-API ones.
+
+- toolkit: `GitHubAPIWrapper` as shipped, one contents call per directory
+  and per file read, on every run,
+- mirror cold: `MirroredGitHubAPIWrapper` on an empty mirror (branch, one
+  recursive tree, then one blob per file read),
+- mirror warm: the branch has not moved (one conditional branch request),
+- mirror after push: `--changed` files modified (branch, tree, and the new
+  blobs of changed files that had been read, prefetched on `--workers`
+  threads).
+
+Runs are further apart than the mirror's refresh interval, so each checks
+the branch once.
+
+Usage:
+    python benchmark_repo_mirror.py --files 5000 --latency 0.03 --workers 8
+"""
+import argparse
+import base64
+import hashlib
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from github import Auth, Github
+from langchain_community.utilities.github import GitHubAPIWrapper
+
+import github_client
+from benchmark_github_client import FakeGitHub, FakeGitHubHandler, plain_client
+from github_client import GitHubHTTPCache
+from repo_mirror import MirroredGitHubAPIWrapper, RepoMirror
+
+REPO = "octo/agent"
+
+
+class FakeRepo:
+    """Files of one branch, with git-style blob, tree and commit SHAs."""
+
+    def __init__(self, files: int, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.files: Dict[str, bytes] = {}
+        for i in range(files):
+            path = f"pkg{i % 10}/mod{i // 10 % 10}/file_{i}.py"
+            self.files[path] = self._content(path)
+        self.commit()
+
+    def _content(self, path: str) -> bytes:
+        lines = self.rng.randint(20, 200)
+        return (f"# {path} rev {self.rng.random():.6f}\n" + "def handler(event):\n    return event\n" * lines).encode()
+
+    def change(self, count: int):
+        for path in self.rng.sample(sorted(self.files), count):
+            self.files[path] = self._content(path)
+        self.commit()
+
+    def commit(self):
+        self.blob_shas = {path: hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+                          for path, data in self.files.items()}
+        self.blobs = {self.blob_shas[path]: data for path, data in self.files.items()}
+        listing = "\n".join(f"{path} {sha}" for path, sha in sorted(self.blob_shas.items()))
+        self.tree_sha = hashlib.sha1(listing.encode()).hexdigest()
+        self.commit_sha = hashlib.sha1(f"commit {self.tree_sha}".encode()).hexdigest()
+        self.directories: Dict[str, List[str]] = {}
+        for path in self.files:
+            parts = path.split("/")
+            for depth in range(len(parts)):
+                parent, child = "/".join(parts[:depth]), "/".join(parts[: depth + 1])
+                entries = self.directories.setdefault(parent, [])
+                if child not in entries:
+                    entries.append(child)
+
+
+class FakeRepoHandler(FakeGitHubHandler):
+    def _resource(self, path: str):
+        repo: FakeRepo = self.server.repo
+        base = f"{self.server.url}/repos/{REPO}"
+        prefix = f"/repos/{REPO}"
+        if path.rstrip("/") == prefix:
+            return {"id": 1, "name": "agent", "full_name": REPO, "url": base, "default_branch": "main"}
+        if not path.startswith(prefix + "/"):
+            return None
+        kind, _, rest = path[len(prefix) + 1:].partition("/")
+        if kind == "branches":
+            return {"name": rest, "commit": {"sha": repo.commit_sha, "url": f"{base}/commits/{repo.commit_sha}",
+                                             "commit": {"tree": {"sha": repo.tree_sha, "url": f"{base}/git/trees/{repo.tree_sha}"},
+                                                        "url": f"{base}/git/commits/{repo.commit_sha}"}}}
+        if kind == "git" and rest.startswith("trees/"):
+            entries = [{"path": p, "mode": "040000", "type": "tree", "sha": hashlib.sha1(p.encode()).hexdigest()}
+                       for p in repo.directories if p]
+            entries += [{"path": p, "mode": "100644", "type": "blob", "sha": sha, "size": len(repo.files[p]),
+                         "url": f"{base}/git/blobs/{sha}"} for p, sha in repo.blob_shas.items()]
+            return {"sha": repo.tree_sha, "url": f"{base}/git/trees/{repo.tree_sha}", "tree": entries, "truncated": False}
+        if kind == "git" and rest.startswith("blobs/"):
+            sha = rest[len("blobs/"):]
+            data = repo.blobs.get(sha)
+            if data is None:
+                return None
+            return {"sha": sha, "size": len(data), "url": f"{base}/git/blobs/{sha}",
+                    "content": base64.b64encode(data).decode(), "encoding": "base64"}
+        if kind == "contents":
+            return self._contents(repo, rest.strip("/"), base)
+        return None
+
+    def _contents(self, repo: FakeRepo, path: str, base: str):
+        def entry(p: str):
+            is_dir = p in repo.directories
+            return {"type": "dir" if is_dir else "file", "path": p, "name": p.rsplit("/", 1)[-1],
+                    "sha": repo.blob_shas.get(p, hashlib.sha1(p.encode()).hexdigest()),
+                    "size": 0 if is_dir else len(repo.files[p]), "url": f"{base}/contents/{p}"}
+
+        if path in repo.directories:
+            return [entry(p) for p in repo.directories[path]]
+        if path in repo.files:
+            return {**entry(path), "encoding": "base64", "content": base64.b64encode(repo.files[path]).decode()}
+        return None
+
+
+def overview(wrapper: GitHubAPIWrapper, reads: List[str]):
+    listing = wrapper.run("list_files_in_main_branch", "")
+    files = sorted(listing.split("\n")[1:])
+    return files, [wrapper.run("read_file", path) for path in reads]
+
+
+def run(label: str, server: FakeGitHub, wrapper: GitHubAPIWrapper, reads: List[str], expected=None):
+    before = server.counts["requests"]
+    start = time.perf_counter()
+    result = overview(wrapper, reads)
+    elapsed = time.perf_counter() - start
+    match = "" if expected is None else f"  same answers: {result == expected}"
+    print(f"  {label:<18} {server.counts['requests'] - before:5} requests  {elapsed:6.2f}s{match}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--reads", type=int, default=20, help="files read per run")
+    parser.add_argument("--changed", type=int, default=50, help="files modified by the push")
+    parser.add_argument("--latency", type=float, default=0.03, help="seconds added to each fake API response")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    server = FakeGitHub(limit=1_000_000, window=3600, handler=FakeRepoHandler, latency=args.latency)
+    server.repo = FakeRepo(args.files)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    reads = random.Random(1).sample(sorted(server.repo.files), args.reads)
+    fields = dict(github_repository=REPO, active_branch="main", github_base_branch="main")
+
+    print(f"{args.files} files, {args.reads} reads per run, {args.latency * 1e3:.0f}ms per request:")
+    plain_client()
+    gh = Github(base_url=server.url, auth=Auth.Token("fake"), retry=None, seconds_between_requests=None)
+    toolkit = GitHubAPIWrapper.model_construct(github=gh, github_repo_instance=gh.get_repo(REPO, lazy=True), **fields)
+    expected = run("toolkit", server, toolkit, reads)
+
+    with tempfile.TemporaryDirectory() as directory:
+        github_client.install(GitHubHTTPCache(os.path.join(directory, "github_cache.sqlite")))
+        gh = Github(base_url=server.url, auth=Auth.Token("fake"), retry=None, seconds_between_requests=None)
+        repo = gh.get_repo(REPO)
+        mirror = RepoMirror(repo, os.path.join(directory, "mirror.sqlite"), workers=args.workers)
+        mirrored = MirroredGitHubAPIWrapper.model_construct(github=gh, github_repo_instance=repo, mirror=mirror, **fields)
+        run("mirror cold", server, mirrored, reads, expected)
+        mirror.expire("main")  # as if the refresh interval had passed
+        run("mirror warm", server, mirrored, reads, expected)
+
+        server.repo.change(args.changed)
+        mirror.expire("main")
+        expected = run("toolkit after push", server, toolkit, reads)
+        run("mirror after push", server, mirrored, reads, expected)
+        print(f"  {mirror.stats}")
+        mirror.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
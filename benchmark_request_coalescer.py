@@ -0,0 +1,113 @@
+"""Benchmark: concurrent fact-check calls, one request per call vs. CoalescingChatModel.
+
+Sends `--calls` "Assess accuracy: <draft>" prompts to a temperature-0
+`ChatOllama`, arriving at random over `--spread` seconds, the way a batch of
+example_langGraph.py runs reaches its fact-check node. Drafts are drawn from
+`--drafts` distinct texts, so some prompts repeat. The server is the fake
+Ollama of benchmark_model_scheduler.py with `--parallel` slots,
+`--request-seconds` per request and room for `--server-queue` waiting
+requests (more get a 503, like `OLLAMA_MAX_QUEUE`).
+
+Reported: calls answered, calls refused with 503, requests the server ran,
+wall time and answered calls per second, first with plain `ainvoke` per call,
+then through a `RequestCoalescer` sized to the server's slots, composed like
+example_langGraph.py's fact checker (`CoalescingChatModel` around a
+`ModelScheduler`-managed model). Before that, the composed model is checked
+to merge identical concurrent prompts into one request. The server
+runs `--parallel` requests at a time either way; the coalescer answers more
+calls per second only by merging repeated drafts, and avoids the 503s.
+
+Usage:
+    python benchmark_request_coalescer.py --calls 96 --drafts 48 --parallel 4 --server-queue 16
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+from langchain_ollama import ChatOllama
+
+from batch_runner import BatchStats
+from benchmark_model_scheduler import FakeOllama, serve
+from model_scheduler import ModelScheduler
+from request_coalescer import CoalescingChatModel, RequestCoalescer
+
+
+async def run_calls(model, prompts, offsets) -> BatchStats:
+    stats = BatchStats()
+
+    async def one(prompt: str, offset: float):
+        await asyncio.sleep(offset)
+        start = time.perf_counter()
+        try:
+            await model.ainvoke(prompt)
+            stats.ok += 1
+            stats.latencies.append(time.perf_counter() - start)
+        except Exception:
+            stats.errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(p, o) for p, o in zip(prompts, offsets)))
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def fact_check_model(llm: ChatOllama, coalescer: RequestCoalescer) -> CoalescingChatModel:
+    """The fact checker of example_langGraph.py: coalescer around a scheduler-managed model."""
+    return CoalescingChatModel(llm=ModelScheduler(parallel=coalescer.max_parallel).manage(llm), coalescer=coalescer)
+
+
+async def check_merging(model: CoalescingChatModel, copies: int = 8):
+    await asyncio.gather(*(model.ainvoke("Assess accuracy: the same draft.") for _ in range(copies)))
+    stats = model.coalescer.stats
+    print(f"  composed model, {copies} identical calls: {stats.requests} request(s), {stats.merged} merged")
+    if stats.requests != 1:
+        raise SystemExit("the composed fact-check model does not merge identical prompts")
+
+
+def report(label: str, stats: BatchStats, fake: FakeOllama):
+    print(f"  {label:<10} answered {stats.ok:4}  refused {stats.errors:4}  server requests {fake.requests:4}  "
+          f"{stats.elapsed:5.1f}s  {stats.ok / stats.elapsed:5.1f} calls/s  p95 {stats.percentile(95):4.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=96)
+    parser.add_argument("--drafts", type=int, default=48, help="distinct drafts the prompts are drawn from")
+    parser.add_argument("--spread", type=float, default=1.0, help="seconds over which the calls arrive")
+    parser.add_argument("--parallel", type=int, default=4, help="server slots (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--server-queue", type=int, default=16, help="server queue (OLLAMA_MAX_QUEUE)")
+    parser.add_argument("--request-seconds", type=float, default=0.25)
+    parser.add_argument("--queue", type=int, default=32, help="coalescer max_queue (backpressure beyond it)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    prompts = [f"Assess accuracy: draft {rng.randrange(args.drafts)} about fasting." for _ in range(args.calls)]
+    offsets = [rng.uniform(0, args.spread) for _ in prompts]
+    logging.getLogger("aiohttp.server").setLevel(logging.CRITICAL)  # 503s to clients that already hung up
+    fake = FakeOllama(0.0, args.request_seconds, args.parallel, max_queue=args.server_queue)
+    base_url = serve(fake)
+    print(f"{args.calls} calls ({len(set(prompts))} distinct prompts) over {args.spread:g}s; server: "
+          f"{args.parallel} slots, queue {args.server_queue}, {args.request_seconds:g}s per request")
+
+    # A fresh ChatOllama per asyncio.run: its async client is bound to the loop.
+    def make_llm() -> ChatOllama:
+        return ChatOllama(model="phi4:latest", temperature=0.0, base_url=base_url)
+
+    asyncio.run(check_merging(fact_check_model(make_llm(), RequestCoalescer(max_parallel=args.parallel))))
+    fake.reset()
+
+    stats = asyncio.run(run_calls(make_llm(), prompts, offsets))
+    report("per call", stats, fake)
+
+    fake.reset()
+    coalescer = RequestCoalescer(max_parallel=args.parallel, max_queue=args.queue)
+    stats = asyncio.run(run_calls(fact_check_model(make_llm(), coalescer), prompts, offsets))
+    report("coalesced", stats, fake)
+    print(f"  {coalescer.stats}")
+
+
+if __name__ == "__main__":
+    main()
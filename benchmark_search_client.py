@@ -0,0 +1,141 @@
+"""Benchmark: per-call client construction vs. the pooled SearchClient.
+
+Starts a local stub search server (keep-alive HTTP/1.1, JSON results) and
+runs the same queries three ways:
+
+1. per-call: a new session and client for every query, as `web_search_tool`
+   used to build a new DuckDuckGo wrapper on every call,
+2. pooled: one long-lived `SearchClient` shared by all calls,
+3. pooled async: the same client driven concurrently through `ainvoke`.
+
+Usage:
+    python benchmark_search_client.py --calls 200 --latency-ms 5
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from search_client import SearchClient
+
+
+class StubSearchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections alive so pooling matters
+    # Send headers and body in one segment; otherwise delayed ACKs stall keep-alive requests.
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    latency = 0.0
+    connections = set()
+    connections_lock = threading.Lock()
+
+    def do_GET(self):
+        with self.connections_lock:
+            self.connections.add(self.client_address)
+        params = parse_qs(urlparse(self.path).query)
+        query = params.get("q", [""])[0]
+        max_results = int(params.get("max_results", ["4"])[0])
+        time.sleep(self.latency)
+        body = json.dumps([
+            {"snippet": f"Result {i} for {query}", "title": f"Title {i}", "link": f"https://example.com/{i}"}
+            for i in range(max_results)
+        ]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubFetcher:
+    """Fetches results from the stub server over a `requests.Session`."""
+
+    def __init__(self, base_url: str, session: requests.Session):
+        self.base_url = base_url
+        self.session = session
+
+    def __call__(self, query, region, time_limit, max_results):
+        resp = self.session.get(
+            self.base_url,
+            params={"q": query, "region": region, "time": time_limit, "max_results": max_results},
+            timeout=10,
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+
+def pooled_session(size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=size)
+    session.mount("http://", adapter)
+    return session
+
+
+def report(name: str, calls: int, elapsed: float):
+    with StubSearchHandler.connections_lock:
+        connections = len(StubSearchHandler.connections)
+        StubSearchHandler.connections.clear()
+    print(f"{name:<14} {calls / elapsed:10.1f} calls/s  {elapsed / calls * 1000:8.2f} ms/call  "
+          f"{connections:5d} TCP connections")
+
+
+def run_per_call(base_url: str, queries):
+    start = time.perf_counter()
+    for query in queries:
+        session = requests.Session()
+        client = SearchClient(fetch=StubFetcher(base_url, session), rate=None)
+        client.invoke(query)
+        client.close()
+        session.close()
+    return time.perf_counter() - start
+
+
+def run_pooled(client: SearchClient, queries):
+    start = time.perf_counter()
+    for query in queries:
+        client.invoke(query)
+    return time.perf_counter() - start
+
+
+async def run_pooled_async(client: SearchClient, queries):
+    start = time.perf_counter()
+    await asyncio.gather(*(client.ainvoke(query) for query in queries))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated server latency per request")
+    parser.add_argument("--concurrency", type=int, default=8, help="max concurrency of the pooled client")
+    args = parser.parse_args()
+
+    StubSearchHandler.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSearchHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/search"
+    queries = [f"query {i}" for i in range(args.calls)]
+
+    print(f"{args.calls} calls, {args.latency_ms} ms simulated server latency")
+    report("per-call", args.calls, run_per_call(base_url, queries))
+
+    client = SearchClient(
+        fetch=StubFetcher(base_url, pooled_session(args.concurrency)),
+        max_concurrency=args.concurrency,
+        rate=None,
+    )
+    report("pooled", args.calls, run_pooled(client, queries))
+    report("pooled async", args.calls, asyncio.run(run_pooled_async(client, queries)))
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Benchmark: SemanticSearchCache behaviour and VectorIndex IVF recall, offline.
+
+Uses the deterministic `HashingEmbeddings` of benchmark_table_retrieval.py
+and a fake clock, so it needs neither Ollama nor the network. First it
+checks the cache (the script exits with an error if a check fails):
+
+- hit: a rephrasing of a stored query returns the stored results without
+  calling the backend,
+- miss: an unrelated query goes to the backend,
+- expiry: after `ttl` the same query misses again, and storing it reuses
+  the expired row instead of adding one.
+
+Then it compares the two `VectorIndex` modes on `--vectors` clustered random
+vectors, added in batches of 1000 as a growing cache would: recall@1 of IVF
+(`--nprobe` of `--nlist` clusters scanned) against the exact flat search,
+and milliseconds per query for both.
+
+Usage:
+    python benchmark_semantic_search_cache.py --vectors 50000 --dim 256 --nprobe 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmark_table_retrieval import HashingEmbeddings
+from semantic_search_cache import SemanticSearchCache, VectorIndex
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def check(label: str, ok: bool, detail: str = ""):
+    print(f"  {label:<38} {'ok' if ok else 'FAILED'}  {detail}")
+    if not ok:
+        raise SystemExit(f"check failed: {label}")
+
+
+def check_cache():
+    calls = []
+
+    def backend(query: str) -> str:
+        calls.append(query)
+        return f"results for {query}"
+
+    clock = FakeClock()
+    cache = SemanticSearchCache(HashingEmbeddings(), backend, threshold=0.8, ttl=3600, clock=clock)
+    print("SemanticSearchCache with HashingEmbeddings:")
+
+    cache.search("latest news about AI")
+    match = cache.lookup("the latest news about AI")
+    score = f"similarity {match[2]:.2f}" if match else ""
+    check("rephrasing above the threshold", match is not None, score)
+    results = cache.search("the latest news about AI")
+    check("hit returns the stored results", results == "results for latest news about AI" and len(calls) == 1,
+          f"backend calls {len(calls)}")
+
+    cache.search("current price of bitcoin")
+    check("unrelated query misses", len(calls) == 2, f"backend calls {len(calls)}")
+    rows = len(cache._index)
+
+    clock.now += 3601
+    cache.search("latest news about AI")
+    check("expired entry is not served", len(calls) == 3, f"backend calls {len(calls)}")
+    check("expired row is reused", len(cache._index) == rows and cache.stats.expired == 1,
+          f"rows {rows} -> {len(cache._index)}, expired {cache.stats.expired}")
+    results = cache.search("the latest news about AI")
+    check("the refreshed entry hits again", results == "results for latest news about AI" and len(calls) == 3,
+          f"{cache.stats}")
+
+
+def clustered_vectors(rng: np.random.Generator, count: int, dim: int, clusters: int) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    return centers[rng.integers(clusters, size=count)] + 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+
+
+def time_queries(index: VectorIndex, queries: np.ndarray):
+    start = time.perf_counter()
+    ids = [index.search(q, k=1)[0][0] for q in queries]
+    return ids, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nlist", type=int, default=None, help="IVF clusters (default: sqrt of the vectors)")
+    parser.add_argument("--nprobe", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    check_cache()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = clustered_vectors(rng, args.vectors, args.dim, clusters=max(1, args.vectors // 500))
+    targets = rng.integers(args.vectors, size=args.queries)
+    queries = vectors[targets] + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    flat = VectorIndex(args.dim, "flat")
+    flat.add(vectors)
+    ivf = VectorIndex(args.dim, "ivf", nlist=args.nlist, nprobe=args.nprobe, ivf_min_size=1)
+    start = time.perf_counter()
+    for i in range(0, args.vectors, 1000):  # in batches, like a growing cache: retrains as it doubles
+        ivf.add(vectors[i:i + 1000])
+    train = time.perf_counter() - start
+
+    exact, flat_ms = time_queries(flat, queries)
+    approx, ivf_ms = time_queries(ivf, queries)
+    recall = np.mean(np.asarray(exact) == np.asarray(approx))
+    print(f"VectorIndex, {args.vectors} x {args.dim} vectors, {args.queries} queries:")
+    print(f"  flat  {flat_ms:7.3f} ms/query")
+    print(f"  ivf   {ivf_ms:7.3f} ms/query  nprobe {args.nprobe} of {len(ivf._lists)} lists  "
+          f"recall@1 vs flat {recall:.3f}  (adding {train:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Benchmark: create_sql_query_chain prompt size and latency, full schema vs. retrieved tables.
+
+Builds a synthetic 500-table SQLite schema (ten business domains, the city /
+country tables of city_db among them, foreign keys inside each domain) and
+asks a handful of questions whose answer needs known tables. For each
+question it reports:
+
+- prompt tokens with every table vs. with the `TableRetriever` selection,
+- whether the selection contains the tables the question needs (recall),
+- retrieval time,
+- with `--model`, end-to-end chain latency on that Ollama model (without it
+  only prompt sizes are reported: a fake model's latency would just restate
+  the token counts).
+
+Embeddings default to the offline `HashingEmbeddings` below. The database
+is a `CachedSQLDatabase` with a warm snapshot, so the numbers only show the
+prompt difference.
+
+Usage:
+    python benchmark_table_retrieval.py --tables 500 --k 5
+    python benchmark_table_retrieval.py --model llama3.2 --embeddings nomic-embed-text
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import time
+from typing import List, Optional
+
+import numpy as np
+from langchain.chains import create_sql_query_chain
+from langchain.chains.sql_database.prompt import SQL_PROMPTS
+from langchain_core.embeddings import Embeddings
+
+from context_window import count_text_tokens
+from schema_cache import CachedSQLDatabase
+from table_retriever import TableRetriever
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic, offline embedder: hashed word and bigram counts, L2-normalized."""
+
+    def __init__(self, size: int = 256):
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        words = re.findall(r"\w+", text.casefold())
+        vector = np.zeros(self.size, dtype=np.float32)
+        for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            vector[int.from_bytes(digest, "little") % self.size] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+# domain -> tables the questions below are about, as (name, columns, foreign keys)
+CORE_TABLES = {
+    "geo": [
+        ("countries", ["name TEXT", "continent TEXT", "capital TEXT"], []),
+        ("cities", ["name TEXT", "population INTEGER", "country_id INTEGER"], ["country_id:countries"]),
+    ],
+    "hr": [
+        ("departments", ["name TEXT", "budget REAL"], []),
+        ("employees", ["first_name TEXT", "last_name TEXT", "salary REAL", "department_id INTEGER"],
+         ["department_id:departments"]),
+    ],
+    "sales": [
+        ("customers", ["name TEXT", "email TEXT", "signup_date DATE"], []),
+        ("orders", ["customer_id INTEGER", "order_date DATE", "total_amount REAL"], ["customer_id:customers"]),
+    ],
+    "inventory": [
+        ("products", ["name TEXT", "unit_price REAL", "reorder_level INTEGER"], []),
+        ("stock_levels", ["product_id INTEGER", "warehouse TEXT", "quantity INTEGER"], ["product_id:products"]),
+    ],
+    "support": [
+        ("agents", ["name TEXT", "team TEXT"], []),
+        ("tickets", ["agent_id INTEGER", "opened_at TIMESTAMP", "resolved_at TIMESTAMP", "priority TEXT"],
+         ["agent_id:agents"]),
+    ],
+}
+DOMAINS = ["geo", "hr", "sales", "inventory", "support", "finance", "marketing", "logistics", "billing", "analytics"]
+FILLER_WORDS = ("account audit batch budget campaign carrier channel claim contract cost coupon delivery device "
+                "event forecast grant invoice journal lead ledger license metric partner payment payroll plan "
+                "policy promotion quota rate refund region report route schedule segment session shift "
+                "shipment sku survey tax tier trip vendor visit voucher").split()
+COLUMN_WORDS = "code status amount score label notes created_at updated_at owner kind level weight ratio".split()
+
+QUESTIONS = [
+    ("Return the top 5 cities (along with their populations and countries) with the highest population.",
+     {"geo_cities", "geo_countries"}),
+    ("Which employees earn the highest salary in each department?", {"hr_employees", "hr_departments"}),
+    ("What is the total order amount per customer?", {"sales_orders", "sales_customers"}),
+    ("List the products whose stock quantity is below their reorder level.",
+     {"inventory_products", "inventory_stock_levels"}),
+    ("What is the average ticket resolution time for each support agent?", {"support_tickets", "support_agents"}),
+]
+
+
+def build_schema(path: str, tables: int, seed: int = 0):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    names = set()
+
+    def create(name: str, columns: List[str], foreign_keys: List[str]):
+        references = [f"FOREIGN KEY ({column}) REFERENCES {table}(id)"
+                      for column, table in (fk.split(":") for fk in foreign_keys)]
+        conn.execute(f"CREATE TABLE {name} ({', '.join(['id INTEGER PRIMARY KEY'] + columns + references)})")
+        names.add(name)
+
+    for domain, core in CORE_TABLES.items():
+        for name, columns, foreign_keys in core:
+            create(f"{domain}_{name}", columns, [f"{c}:{domain}_{t}" for c, t in (fk.split(":") for fk in foreign_keys)])
+    while len(names) < tables:
+        domain = rng.choice(DOMAINS)
+        name = f"{domain}_{rng.choice(FILLER_WORDS)}_{rng.choice(FILLER_WORDS)}"
+        if name in names:
+            continue
+        columns = [f"{word} TEXT" for word in rng.sample(COLUMN_WORDS, 5)]
+        siblings = sorted(n for n in names if n.startswith(f"{domain}_"))
+        foreign_keys = []
+        if siblings and rng.random() < 0.5:
+            parent = rng.choice(siblings)
+            columns.append(f"{parent}_id INTEGER")
+            foreign_keys.append(f"{parent}_id:{parent}")
+        create(name, columns, foreign_keys)
+    conn.commit()
+    conn.close()
+
+
+def prompt_tokens(db, table_names: Optional[List[str]]) -> int:
+    prompt = SQL_PROMPTS[db.dialect].format(input="", top_k="5", table_info=db.get_table_info(table_names))
+    return count_text_tokens(prompt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--model", help="Ollama model to use instead of the fake one, e.g. llama3.2")
+    parser.add_argument("--embeddings", help="Ollama embedding model, e.g. nomic-embed-text")
+    args = parser.parse_args()
+
+    llm = None
+    if args.model:
+        from langchain_ollama import ChatOllama
+
+        llm = ChatOllama(model=args.model, temperature=0)
+    if args.embeddings:
+        from langchain_ollama import OllamaEmbeddings
+
+        from embedding_cache import CachedEmbeddings
+
+        embeddings = CachedEmbeddings(OllamaEmbeddings(model=args.embeddings))
+    else:
+        embeddings = HashingEmbeddings()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "schema.sqlite")
+        build_schema(path, args.tables)
+        db = CachedSQLDatabase.from_uri(f"sqlite:///{path}", cache_path=os.path.join(directory, "cache.sqlite"))
+        db.get_table_info()  # warm the snapshot
+
+        start = time.perf_counter()
+        retriever = TableRetriever(db, embeddings, k=args.k)
+        print(f"{args.tables} tables, index built in {time.perf_counter() - start:.2f}s")
+        chain = create_sql_query_chain(llm=llm, db=db) if llm is not None else None
+
+        full_tokens = prompt_tokens(db, None)
+        totals = {"full": 0.0, "retrieved": 0.0}
+        found = 0
+        for question, needed in QUESTIONS:
+            start = time.perf_counter()
+            inputs = retriever.chain_inputs(question)
+            retrieval = time.perf_counter() - start
+            tables = inputs["table_names_to_use"]
+            found += needed <= set(tables)
+            line = (f"- {question[:60]:<60} tokens {full_tokens:6} -> {prompt_tokens(db, tables):5} "
+                    f"({len(tables)} tables, needed found: {needed <= set(tables)})  retrieval {retrieval * 1e3:5.1f}ms")
+
+            if chain is not None:
+                start = time.perf_counter()
+                chain.invoke({"question": question})
+                full_latency = time.perf_counter() - start
+                start = time.perf_counter()
+                chain.invoke(inputs)
+                retrieved_latency = time.perf_counter() - start + retrieval
+                totals["full"] += full_latency
+                totals["retrieved"] += retrieved_latency
+                line += f"  latency {full_latency:6.2f}s -> {retrieved_latency:5.2f}s"
+            print(line)
+        summary = f"recall {found}/{len(QUESTIONS)}"
+        if chain is not None:
+            summary += (f"; mean latency {totals['full'] / len(QUESTIONS):.2f}s -> "
+                        f"{totals['retrieved'] / len(QUESTIONS):.2f}s")
+        print(summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark: token counting throughput, reload-per-call vs. registry vs. batched.
+
+Counts tokens for N synthetic documents (default 10k) three ways:
+
+1. reload: load the tokenizer for every document, as the old `count_tokens` did
+   (a fresh registry and tiktoken's module-level encoding cache cleared, so
+   each document pays the full load; only timed on the first --reload-docs
+   documents, it is very slow),
+2. single: one cached tokenizer from the registry, one document per call,
+3. batch: one `count_tokens_batch` call over all documents.
+
+If the tokenizer cannot be loaded (no `transformers`, or tiktoken cannot
+fetch its encoding offline), the single and batch rows time the
+`len(text) // 4` estimate that context_window.py falls back to, and the
+reload row is skipped.
+
+Usage:
+    python benchmark_tokenizers.py --tokenizer gpt2 --docs 10000
+    TOKENIZER_SNAPSHOT_DIR=./snapshots python benchmark_tokenizers.py --tokenizer meta-llama/Meta-Llama-3-8B-Instruct
+"""
+import argparse
+import random
+import time
+
+from tokenizer_registry import TokenizerRegistry, TokenizerUnavailable
+
+WORDS = ("fasting insulin autophagy ketones metabolism glucose hormone study research "
+         "benefit risk cell energy body weight brain sleep protein fat muscle the of and "
+         "to in is that for with as on by").split()
+
+
+def make_documents(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(50, 400))) + "."
+        for _ in range(count)
+    ]
+
+
+class EstimateTokenizer:
+    """The `len(text) // 4` estimate of context_window.count_text_tokens."""
+
+    name = "len//4 estimate"
+
+    def encode(self, text: str):
+        return range(max(1, len(text) // 4))
+
+    def encode_batch(self, texts):
+        return [self.encode(text) for text in texts]
+
+
+def load_uncached(name: str):
+    """Load `name` like the old per-call code: no registry, no tiktoken encoding cache."""
+    try:
+        import tiktoken.registry
+
+        tiktoken.registry.ENCODINGS.clear()
+    except ImportError:
+        pass
+    return TokenizerRegistry().get(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokenizer", default="gpt2")
+    parser.add_argument("--docs", type=int, default=10_000)
+    parser.add_argument("--reload-docs", type=int, default=20)
+    args = parser.parse_args()
+
+    documents = make_documents(args.docs)
+    total_chars = sum(len(d) for d in documents)
+    print(f"{args.docs} documents, {total_chars / 1e6:.1f}M characters, tokenizer {args.tokenizer}")
+
+    def report(name, docs, elapsed, tokens):
+        print(f"{name:<7} {docs / elapsed:12.0f} docs/s  {tokens / elapsed / 1e6:8.2f}M tokens/s  ({elapsed:.3f}s)")
+
+    try:
+        tokenizer = TokenizerRegistry().get(args.tokenizer)  # load outside the timed sections
+    except TokenizerUnavailable as e:
+        print(f"{e}; timing the len//4 estimate instead")
+        tokenizer = None
+
+    if tokenizer is not None:
+        reload_docs = documents[: args.reload_docs]
+        start = time.perf_counter()
+        tokens = sum(len(load_uncached(args.tokenizer).encode(doc)) for doc in reload_docs)
+        report("reload", len(reload_docs), time.perf_counter() - start, tokens)
+    else:
+        tokenizer = EstimateTokenizer()
+
+    start = time.perf_counter()
+    single = [len(tokenizer.encode(doc)) for doc in documents]
+    report("single", len(documents), time.perf_counter() - start, sum(single))
+
+    start = time.perf_counter()
+    batched = [len(ids) for ids in tokenizer.encode_batch(documents)]
+    report("batch", len(documents), time.perf_counter() - start, sum(batched))
+
+    assert single == batched, "batched counts differ from single counts"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Benchmark: LLM calls per answered question, ReAct text protocol vs. structured tool calls.
+
+Runs the graph of example_agent_web_search.py over `--questions` questions
+in both agent modes and counts every chat-model call (agent decisions and
+incorporate calls) with a callback handler. A question is answered when the
+graph ends on a final answer; with the text protocol each reply the parser
+cannot read sends the graph around `call_agent` once more, and a run that
+hits `--recursion-limit` counts as unanswered.
+
+Without `--model` the models are a scripted fake that searches first and
+answers once it has results, and whose replies are malformed with
+probability `--react-error-rate` (text protocol: `Action: tool(args)`
+instead of `Action Input`, markdown-bolded keywords, invented tool names,
+answers without `Final Answer:`) or `--tool-error-rate` (tool calls with a
+wrong argument name or unknown tool). That run is a cost model, not a
+measurement: the rates are inputs, so its "saved" figure follows from them
+and says nothing about how often either protocol fails; the output is
+labelled accordingly. Only `--model` / `--tool-model` (real Ollama models)
+measure the protocols.
+
+Usage:
+    python benchmark_tool_calling.py --questions 50
+    python benchmark_tool_calling.py --model phi4:latest --tool-model llama3.2:latest --questions 20
+"""
+import argparse
+import random
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langgraph.errors import GraphRecursionError
+from pydantic import PrivateAttr
+
+import example_agent_web_search as app
+
+QUESTIONS = [
+    "What are the latest news about AI? Summarize them",
+    "Who won the most recent Formula 1 race?",
+    "What is the current price of Bitcoin?",
+    "Which new Python release came out this year and what changed?",
+    "What did the latest IPCC report conclude?",
+]
+
+REACT_ERRORS = [
+    'Thought: Do I need to use a tool? Yes\nAction: web_search_tool(query="{q}")',
+    "I will look this up.\n\n**Action:** web_search_tool\n**Action Input:** {q}",
+    "Thought: Do I need to use a tool? Yes\nAction: Search the web\nAction Input: {q}",
+]
+REACT_ANSWER_ERROR = "Here is a summary of what I found: {a}"
+
+
+class CallCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.calls = 0
+
+    def on_chat_model_start(self, serialized, messages, **kwargs: Any):
+        self.calls += 1
+
+
+class ScriptedAgentModel(BaseChatModel):
+    """Searches first, answers once a tool result is in the history; some replies are malformed."""
+
+    react_error_rate: float = 0.25
+    tool_error_rate: float = 0.05
+    seed: int = 0
+    _rng: random.Random = PrivateAttr()
+
+    def model_post_init(self, __context: Any):
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-agent"
+
+    @property
+    def model(self) -> str:
+        return "fake"
+
+    def bind_tools(self, tools, **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                  tools: Optional[List[Dict]] = None, **kwargs: Any) -> ChatResult:
+        text = [str(m.content) for m in messages]
+        if any("Refine the following" in t for t in text):
+            return self._reply(AIMessage(content="A refined answer based on the search results."))
+        question = next((t for t in text if t and not t.startswith("You are")), "")
+        searched = any(t.startswith("Tool Result:") for t in text)
+        answer = "Based on the search results, here is the summary."
+        if tools is not None:
+            return self._reply(self._tool_reply(question, searched, answer))
+        return self._reply(AIMessage(content=self._react_reply(question, searched, answer)))
+
+    def _react_reply(self, question: str, searched: bool, answer: str) -> str:
+        if self._rng.random() < self.react_error_rate:
+            return (REACT_ANSWER_ERROR.format(a=answer) if searched
+                    else self._rng.choice(REACT_ERRORS).format(q=question))
+        if searched:
+            return f"Thought: Do I need to use a tool? No\nFinal Answer: {answer}"
+        return f"Thought: Do I need to use a tool? Yes\nAction: web_search_tool\nAction Input: {question}"
+
+    def _tool_reply(self, question: str, searched: bool, answer: str) -> AIMessage:
+        if searched:
+            return AIMessage(content=answer)
+        name, args = "web_search_tool", {"query": question}
+        if self._rng.random() < self.tool_error_rate:
+            name, args = self._rng.choice([("web_search_tool", {"q": question}), ("search", {"query": question})])
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{self._rng.random():.8f}"}])
+
+    def _reply(self, message: AIMessage) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class FakeSearch:
+    def search(self, query: str) -> str:
+        return f"1. {query} - example.com\n2. More about {query} - example.org"
+
+
+def use_models(agent_llm, tool_agent_llm):
+    app.agent_llm = agent_llm
+    app.agent = app.agent_prompt | agent_llm
+    app.incorporate_chain = app.incorporate_prompt | agent_llm
+    app.tool_agent_llm = tool_agent_llm
+    app.tool_agent = app.tool_agent_prompt | tool_agent_llm.bind_tools(app.tool_router.tools)
+
+
+def run_mode(mode: str, questions: List[str], recursion_limit: int):
+    app.AGENT_MODE = mode
+    answered = calls = 0
+    for question in questions:
+        counter = CallCounter()
+        try:
+            result = app.runnable.invoke(app.make_inputs(question),
+                                         config={"callbacks": [counter], "recursion_limit": recursion_limit})
+            answered += result["messages"][-1].content.startswith("No web search needed")
+        except GraphRecursionError:
+            pass
+        calls += counter.calls
+    return answered, calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--model", help="Ollama model for the text protocol, e.g. phi4:latest")
+    parser.add_argument("--tool-model", help="Ollama model for tool calls, e.g. llama3.2:latest")
+    parser.add_argument("--react-error-rate", type=float, default=0.25, help="fake: malformed ReAct replies")
+    parser.add_argument("--tool-error-rate", type=float, default=0.05, help="fake: invalid tool calls")
+    parser.add_argument("--recursion-limit", type=int, default=25)
+    args = parser.parse_args()
+
+    app.semantic_cache = FakeSearch()
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(args.questions)]
+    if args.model:
+        from langchain_ollama import ChatOllama
+
+        use_models(ChatOllama(model=args.model, temperature=0.2),
+                   ChatOllama(model=args.tool_model or args.model, temperature=0.2))
+        print(f"models: {args.model} (text), {args.tool_model or args.model} (tools)")
+    else:
+        fake = ScriptedAgentModel(react_error_rate=args.react_error_rate, tool_error_rate=args.tool_error_rate)
+        use_models(fake, fake)
+        print(f"COST MODEL, not a measurement: scripted fake model with an assumed {args.react_error_rate:.0%} "
+              f"malformed ReAct replies and {args.tool_error_rate:.0%} invalid tool calls "
+              f"(pass --model / --tool-model to measure)")
+
+    results = {mode: run_mode(mode, questions, args.recursion_limit) for mode in ("react", "tools")}
+    for mode, (answered, calls) in results.items():
+        per_answer = calls / answered if answered else float("inf")
+        print(f"  {mode:<6} answered {answered:3}/{len(questions)}  LLM calls {calls:4}  per answered question {per_answer:5.2f}")
+    (react_answered, react_calls), (tools_answered, tools_calls) = results["react"], results["tools"]
+    if react_answered and tools_answered:
+        saved = react_calls / react_answered - tools_calls / tools_answered
+        source = "measured" if args.model else "implied by the assumed error rates"
+        print(f"  saved {saved:.2f} LLM calls per answered question ({source})")
+
+
+if __name__ == "__main__":
+    main()
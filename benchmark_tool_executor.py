@@ -0,0 +1,117 @@
+"""Benchmark: one response's tool calls run one after another vs. with ToolExecutor.
+
+Builds a model-style `tool_calls` list of `--calls` calls over four fake
+tools: three sync ones that sleep like HTTP lookups and an async one, plus
+optionally (`--hang`) a sync tool that never answers in time and is cut off
+by its per-tool timeout. Runs the list the way example_ollama.py did (a for
+loop over `tool.invoke`) and with `ToolExecutor` at a few `max_parallel`
+values, checks that results come back in request order, and prints the
+per-call timings of the last run.
+
+Usage:
+    python benchmark_tool_executor.py --calls 8 --hang
+"""
+import argparse
+import asyncio
+import time
+
+from langchain_core.tools import tool
+
+from tool_executor import ToolExecutor
+
+
+@tool
+def get_weather(city: str) -> str:
+    """Current weather for a city."""
+    time.sleep(0.4)
+    return f"weather in {city}: sunny"
+
+
+@tool
+def get_stock_price(symbol: str) -> str:
+    """Latest stock price for a ticker symbol."""
+    time.sleep(0.6)
+    return f"{symbol}: 123.45"
+
+
+@tool
+def search_docs(query: str) -> str:
+    """Search the internal documentation."""
+    time.sleep(0.5)
+    return f"3 documents about {query}"
+
+
+@tool
+async def lookup_user(user_id: int) -> str:
+    """Look up a user record."""
+    await asyncio.sleep(0.3)
+    return f"user {user_id}: active"
+
+
+@tool
+def slow_report(name: str) -> str:
+    """Build a report (hangs, to exercise the timeout)."""
+    time.sleep(3.0)
+    return f"report {name}"
+
+
+TOOLS = [get_weather, get_stock_price, search_docs, lookup_user, slow_report]
+
+
+def make_calls(count: int, hang: bool):
+    templates = [
+        ("get_weather", lambda i: {"city": f"city-{i}"}),
+        ("get_stock_price", lambda i: {"symbol": f"SYM{i}"}),
+        ("search_docs", lambda i: {"query": f"topic {i}"}),
+        ("lookup_user", lambda i: {"user_id": i}),
+    ]
+    calls = [{"name": templates[i % 4][0], "args": templates[i % 4][1](i), "id": f"call_{i}", "type": "tool_call"}
+             for i in range(count)]
+    if hang:
+        calls.insert(count // 2, {"name": "slow_report", "args": {"name": "q3"}, "id": "call_hang", "type": "tool_call"})
+    return calls
+
+
+def sequential(calls):
+    by_name = {t.name: t for t in TOOLS}
+    results = []
+    for call in calls:
+        tool_ = by_name[call["name"]]
+        if tool_.coroutine is not None:
+            results.append(str(asyncio.run(tool_.ainvoke(call["args"]))))
+        else:
+            results.append(str(tool_.invoke(call["args"])))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=8)
+    parser.add_argument("--hang", action="store_true", help="add a call that exceeds its 1s timeout")
+    args = parser.parse_args()
+
+    calls = make_calls(args.calls, args.hang)
+    start = time.perf_counter()
+    expected = sequential(calls)
+    print(f"{len(calls)} tool calls")
+    print(f"  sequential loop         {time.perf_counter() - start:6.2f}s")
+
+    for max_parallel in (2, 4, 8):
+        executor = ToolExecutor(TOOLS, max_parallel=max_parallel, timeout=5, timeouts={"slow_report": 1.0})
+        start = time.perf_counter()
+        messages = executor.run(calls)
+        elapsed = time.perf_counter() - start
+        in_order = [m.tool_call_id for m in messages] == [c["id"] for c in calls]
+        same = all(m.content == e for m, e in zip(messages, expected) if m.status != "error")
+        print(f"  executor max_parallel={max_parallel}  {elapsed:6.2f}s  in request order: {in_order}  "
+              f"same results: {same}  overlap {executor.stats.overlap:.1f}x  timeouts {executor.stats.timeouts}")
+        executor.close()
+
+    print("  per-call timings (last run):")
+    for timing in executor.timings:
+        print(f"    {timing.call_id:<10} {timing.name:<16} {timing.mode:<6} start {timing.started:5.2f}s  "
+              f"{timing.seconds:5.2f}s  {timing.status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""In-memory checkpointer with bounded history, thread count and byte size.
+
+`MemorySaver` keeps every checkpoint of every thread for the life of the
+process. `BoundedMemorySaver` is a drop-in replacement that:
+
+- keeps at most `max_checkpoints` checkpoints per thread (oldest dropped
+  first, together with their pending writes),
+- keeps at most `max_threads` threads, evicting the least recently used one,
+- evicts least recently used threads while the serialized size of all
+  stored checkpoints and writes is above `max_bytes`,
+- optionally spills evicted threads to `spill_dir` (msgpack files) and loads
+  them back the next time the thread is used,
+- exposes its accounting as `stats`.
+
+    memory = BoundedMemorySaver(max_checkpoints=20, max_threads=100, max_bytes=64 << 20)
+    graph = builder.compile(checkpointer=memory)
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterator, Optional
+
+import msgpack
+from langgraph.checkpoint.base import CheckpointTuple
+from langgraph.checkpoint.memory import InMemorySaver
+
+
+@dataclass
+class MemorySaverStats:
+    threads: int = 0
+    checkpoints: int = 0
+    bytes: int = 0
+    dropped_checkpoints: int = 0  # trimmed by max_checkpoints
+    evicted_threads: int = 0
+    spilled_threads: int = 0
+    reloaded_threads: int = 0
+
+
+def _typed_size(value) -> int:
+    return len(value[1]) if value else 0
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """MemorySaver with per-thread history limits and LRU eviction of whole threads."""
+
+    def __init__(
+        self,
+        *,
+        serde=None,
+        max_checkpoints: Optional[int] = 20,
+        max_threads: Optional[int] = 1000,
+        max_bytes: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+    ):
+        super().__init__(serde=serde)
+        self.max_checkpoints = max_checkpoints
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        if self.spill_dir:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self.stats = MemorySaverStats()
+        self._lock = threading.RLock()
+        self._threads: "OrderedDict[Hashable, int]" = OrderedDict()  # thread_id -> bytes, LRU order
+
+    def get_tuple(self, config) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            if not self._touch(thread_id):
+                return None
+            return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None) -> Iterator[CheckpointTuple]:
+        # Spilled threads are only listed when asked for by thread_id.
+        with self._lock:
+            if config and not self._touch(config["configurable"]["thread_id"]):
+                return
+            checkpoint_tuples = [*super().list(config, filter=filter, before=before, limit=limit)]
+        yield from checkpoint_tuples
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            self._touch(thread_id, create=True)
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            checkpoint_data, metadata_data, _ = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            self._add_bytes(thread_id, _typed_size(checkpoint_data) + _typed_size(metadata_data))
+            self.stats.checkpoints += 1
+            self._trim(thread_id, checkpoint_ns)
+            self._enforce_limits(keep=thread_id)
+            return saved
+
+    def put_writes(self, config, writes, task_id, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        key = (thread_id, config["configurable"].get("checkpoint_ns", ""), config["configurable"]["checkpoint_id"])
+        with self._lock:
+            self._touch(thread_id, create=True)
+            before = self._writes_size(key)
+            super().put_writes(config, writes, task_id, task_path)
+            self._add_bytes(thread_id, self._writes_size(key) - before)
+            self._enforce_limits(keep=thread_id)
+
+    def evict(self, thread_id: Hashable):
+        """Drop a thread from memory, spilling it to disk if `spill_dir` is set."""
+        with self._lock:
+            namespaces = self.storage.pop(thread_id, {})
+            writes = {key: self.writes.pop(key) for key in [k for k in self.writes if k[0] == thread_id]}
+            size = self._threads.pop(thread_id, 0)
+            self.stats.bytes -= size
+            self.stats.threads = len(self._threads)
+            self.stats.checkpoints -= sum(len(checkpoints) for checkpoints in namespaces.values())
+            self.stats.evicted_threads += 1
+            if self.spill_dir is not None and namespaces:
+                self._spill_path(thread_id).write_bytes(msgpack.packb(
+                    {
+                        "storage": {ns: {cid: list(saved) for cid, saved in checkpoints.items()}
+                                    for ns, checkpoints in namespaces.items()},
+                        "writes": [[key[1], key[2], [[list(k), list(w)] for k, w in inner.items()]]
+                                   for key, inner in writes.items()],
+                    },
+                    use_bin_type=True,
+                ))
+                self.stats.spilled_threads += 1
+
+    # The helpers below expect self._lock to be held.
+
+    def _touch(self, thread_id: Hashable, create: bool = False) -> bool:
+        """Mark the thread as recently used, loading it back from disk if it was spilled.
+
+        Returns False for a thread that is not stored anywhere; it is only
+        registered when `create` is set (i.e. for writes).
+        """
+        if thread_id in self._threads:
+            self._threads.move_to_end(thread_id)
+            return True
+        if self.spill_dir is not None and self._spill_path(thread_id).exists():
+            self._reload(thread_id)
+            self._enforce_limits(keep=thread_id)
+            return True
+        if not create:
+            return False
+        self._threads[thread_id] = 0
+        self.stats.threads = len(self._threads)
+        self._enforce_limits(keep=thread_id)
+        return False
+
+    def _reload(self, thread_id: Hashable):
+        path = self._spill_path(thread_id)
+        data = msgpack.unpackb(path.read_bytes(), raw=False, strict_map_key=False)
+        size = count = 0
+        for ns, checkpoints in data["storage"].items():
+            for cid, (checkpoint_data, metadata_data, parent) in checkpoints.items():
+                self.storage[thread_id][ns][cid] = (tuple(checkpoint_data), tuple(metadata_data), parent)
+                size += _typed_size(checkpoint_data) + _typed_size(metadata_data)
+                count += 1
+        for ns, cid, inner in data["writes"]:
+            for (task, idx), (task_id, channel, value, task_path) in inner:
+                self.writes[(thread_id, ns, cid)][(task, idx)] = (task_id, channel, tuple(value), task_path)
+                size += _typed_size(value)
+        path.unlink()
+        self._threads[thread_id] = size
+        self.stats.bytes += size
+        self.stats.checkpoints += count
+        self.stats.threads = len(self._threads)
+        self.stats.reloaded_threads += 1
+
+    def _trim(self, thread_id: Hashable, checkpoint_ns: str, keep: Optional[int] = None):
+        """Drop the oldest checkpoints of a thread (and their writes) beyond `keep`."""
+        keep = self.max_checkpoints if keep is None else keep
+        if keep is None:
+            return
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        excess = len(checkpoints) - keep
+        if excess <= 0:
+            return
+        freed = 0
+        for checkpoint_id in sorted(checkpoints)[:excess]:
+            checkpoint_data, metadata_data, _ = checkpoints.pop(checkpoint_id)
+            freed += _typed_size(checkpoint_data) + _typed_size(metadata_data)
+            key = (thread_id, checkpoint_ns, checkpoint_id)
+            freed += self._writes_size(key)
+            self.writes.pop(key, None)
+        self._add_bytes(thread_id, -freed)
+        self.stats.checkpoints -= excess
+        self.stats.dropped_checkpoints += excess
+
+    def _enforce_limits(self, keep: Hashable):
+        """Evict least recently used threads (never `keep`) until within limits.
+
+        If `keep` alone is over `max_bytes`, its history is cut down to the
+        latest checkpoint instead.
+        """
+        while True:
+            over_threads = self.max_threads is not None and len(self._threads) > self.max_threads
+            over_bytes = self.max_bytes is not None and self.stats.bytes > self.max_bytes
+            if not (over_threads or over_bytes):
+                return
+            victim = next((t for t in self._threads if t != keep), None)
+            if victim is not None:
+                self.evict(victim)
+                continue
+            if over_bytes:
+                for checkpoint_ns in list(self.storage.get(keep, ())):
+                    self._trim(keep, checkpoint_ns, keep=1)
+            return
+
+    def _add_bytes(self, thread_id: Hashable, size: int):
+        self._threads[thread_id] = self._threads.get(thread_id, 0) + size
+        self.stats.bytes += size
+
+    def _writes_size(self, key) -> int:
+        inner: Dict[Any, Any] = self.writes.get(key) or {}
+        return sum(_typed_size(w[2]) for w in inner.values())
+
+    def _spill_path(self, thread_id: Hashable) -> Path:
+        name = hashlib.sha256(repr(thread_id).encode("utf-8")).hexdigest()[:32]
+        return self.spill_dir / f"{name}.msgpack"
@@ -0,0 +1,364 @@
+"""SQLite checkpointers tuned for many small writes, with a retention policy.
+
+`SqliteSaver` commits after every `put` / `put_writes` with SQLite's default
+`synchronous=FULL`, so each graph step pays a couple of fsyncs, and it keeps
+every checkpoint a thread ever wrote. The savers here:
+
+- use WAL with `synchronous=NORMAL` (a commit only appends to the WAL; the
+  database stays consistent after a crash, the last commits may be lost on
+  power failure),
+- group commits: writes are committed every `commit_every` writes or after
+  `commit_interval` seconds, whichever comes first, and on `flush()`/`close()`,
+- keep only the newest `keep_last` checkpoints (and their pending writes) of
+  every thread written to, pruned in each group commit; a background task
+  returns the freed pages to the OS with an incremental vacuum every
+  `compact_interval` seconds and checkpoints the WAL (which is truncated
+  back to 8 MB when it grew past that), and closing the saver compacts once
+  more, so a short-lived process leaves a small file too.
+
+    saver = BatchedSqliteSaver.from_path("checkpoints.sqlite", keep_last=20)
+    graph = builder.compile(checkpointer=saver)
+
+`AsyncBatchedSqliteSaver` is the aiosqlite version for `ainvoke`/`astream`.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional, Set, Tuple
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+logger = logging.getLogger(__name__)
+
+# auto_vacuum only takes effect on a new database, so it has to come first.
+PRAGMAS = """
+PRAGMA auto_vacuum=INCREMENTAL;
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA journal_size_limit=8388608;
+"""
+
+# Newest checkpoint_id that falls outside the retention window. Checkpoint ids
+# are time-ordered UUIDs, so everything at or below it is older.
+CUTOFF = (
+    "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+    "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?"
+)
+DELETE_CHECKPOINTS = "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id <= ?"
+DELETE_WRITES = "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id <= ?"
+THREAD_KEYS = "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints"
+
+
+@dataclass
+class CheckpointStoreStats:
+    commits: int = 0
+    writes: int = 0
+    pruned: int = 0  # checkpoints deleted by the retention policy
+    compactions: int = 0
+
+    @property
+    def writes_per_commit(self) -> float:
+        return self.writes / self.commits if self.commits else 0.0
+
+
+def thread_key(config: RunnableConfig) -> Tuple[str, str]:
+    return str(config["configurable"]["thread_id"]), config["configurable"].get("checkpoint_ns", "")
+
+
+class BatchedSqliteSaver(SqliteSaver):
+    """SqliteSaver with WAL, group commits and a keep-last-N retention policy."""
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        *,
+        serde=None,
+        commit_every: int = 64,
+        commit_interval: float = 0.05,
+        keep_last: Optional[int] = None,
+        compact_interval: float = 5.0,
+    ):
+        super().__init__(conn, serde=serde)
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.keep_last = keep_last
+        self.compact_interval = compact_interval
+        self.stats = CheckpointStoreStats()
+        self._pending = 0
+        self._dirty: Set[Tuple[str, str]] = set()  # threads written since the last prune
+        self._freed = False  # pruned since the last vacuum
+        self._closed = threading.Event()
+        self._worker = threading.Thread(target=self._background, name="checkpoint-store", daemon=True)
+        self._worker.start()
+
+    @classmethod
+    def from_path(cls, path: str, **kwargs) -> "BatchedSqliteSaver":
+        return cls(sqlite3.connect(path, check_same_thread=False), **kwargs)
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        self.conn.executescript(PRAGMAS)
+        super().setup()
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        with self.lock:
+            self.setup()
+            cur = self.conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+                if transaction:
+                    self._pending += 1
+                    self.stats.writes += 1
+                    if self._pending >= self.commit_every:
+                        self._commit()
+
+    def put(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        if self.keep_last is not None:
+            with self.lock:
+                self._dirty.add(thread_key(config))
+        return saved
+
+    def flush(self):
+        """Commit everything written so far."""
+        with self.lock:
+            if self._pending or self._dirty:
+                self._commit()
+
+    def prune(self) -> int:
+        """Apply the retention policy to the threads written since the last prune."""
+        if self.keep_last is None:
+            return 0
+        with self.lock:
+            deleted = self._prune_dirty()
+            self._commit()
+            return deleted
+
+    def compact(self, full: bool = False):
+        """Prune, then give free pages back to the OS and truncate the WAL.
+
+        `full=True` runs VACUUM, which rewrites the whole file; it is needed once
+        for databases created without incremental auto-vacuum.
+        """
+        if self.keep_last is not None:
+            with self.lock:
+                self._dirty.update(self.conn.execute(THREAD_KEYS).fetchall())
+        self.prune()
+        with self.lock:
+            self._vacuum("VACUUM" if full else "PRAGMA incremental_vacuum", "TRUNCATE")
+
+    def close(self):
+        self._closed.set()
+        self._worker.join()
+        try:
+            self.flush()
+            if self.keep_last is not None:
+                self.compact()
+        finally:
+            self.conn.close()
+
+    def _commit(self):
+        # Group commits also apply the retention policy, so it never lags
+        # behind the writes by more than one commit.
+        self._prune_dirty()
+        self.conn.commit()
+        self._pending = 0
+        self.stats.commits += 1
+
+    def _prune_dirty(self) -> int:
+        keys, self._dirty = self._dirty, set()
+        deleted = 0
+        for thread_id, checkpoint_ns in keys:
+            cutoff = self._cutoff(thread_id, checkpoint_ns)
+            if cutoff is None:
+                continue
+            deleted += self.conn.execute(DELETE_CHECKPOINTS, (thread_id, checkpoint_ns, cutoff)).rowcount
+            self.conn.execute(DELETE_WRITES, (thread_id, checkpoint_ns, cutoff))
+        self.stats.pruned += deleted
+        self._freed = self._freed or deleted > 0
+        return deleted
+
+    def _cutoff(self, thread_id: str, checkpoint_ns: str) -> Optional[str]:
+        """Newest checkpoint_id of the thread that may be deleted, if any."""
+        row = self.conn.execute(CUTOFF, (thread_id, checkpoint_ns, self.keep_last)).fetchone()
+        return row[0] if row else None
+
+    def _vacuum(self, statement: str, wal_checkpoint: str):
+        # Both need the pending group commit out of the way: VACUUM cannot run
+        # inside a transaction and wal_checkpoint fails with one open.
+        if self._pending:
+            self._commit()
+        self.conn.execute(statement).fetchall()
+        self.conn.execute(f"PRAGMA wal_checkpoint({wal_checkpoint})").fetchall()
+        self._freed = False
+        self.stats.compactions += 1
+
+    def _background(self):
+        last_compaction = time.monotonic()
+        while not self._closed.wait(self.commit_interval):
+            try:
+                self.flush()
+                if self._freed and time.monotonic() - last_compaction >= self.compact_interval:
+                    with self.lock:
+                        self._vacuum("PRAGMA incremental_vacuum", "PASSIVE")
+                    last_compaction = time.monotonic()
+            except sqlite3.Error:
+                logger.exception("Background commit/compaction failed")
+
+
+class _GroupCommitConnection:
+    """aiosqlite connection whose commit() only commits every N calls.
+
+    AsyncSqliteSaver calls `conn.commit()` after every write; everything else
+    is passed through to the real connection.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, saver: "AsyncBatchedSqliteSaver"):
+        self._conn = conn
+        self._saver = saver
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __await__(self):
+        return self._conn.__await__()
+
+    async def commit(self):
+        saver = self._saver
+        saver._pending += 1
+        saver.stats.writes += 1
+        if saver._pending >= saver.commit_every:
+            await saver._commit()
+
+
+class AsyncBatchedSqliteSaver(AsyncSqliteSaver):
+    """AsyncSqliteSaver with WAL, group commits and a keep-last-N retention policy."""
+
+    def __init__(
+        self,
+        conn: aiosqlite.Connection,
+        *,
+        serde=None,
+        commit_every: int = 64,
+        commit_interval: float = 0.05,
+        keep_last: Optional[int] = None,
+        compact_interval: float = 5.0,
+    ):
+        super().__init__(conn, serde=serde)
+        self.raw_conn = conn
+        self.conn = _GroupCommitConnection(conn, self)
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.keep_last = keep_last
+        self.compact_interval = compact_interval
+        self.stats = CheckpointStoreStats()
+        self._pending = 0
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._freed = False
+        self._worker: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def from_path(cls, path: str, **kwargs) -> "AsyncBatchedSqliteSaver":
+        return cls(await aiosqlite.connect(path), **kwargs)
+
+    async def setup(self) -> None:
+        if self.is_setup:
+            return
+        if not self.raw_conn.is_alive():
+            await self.raw_conn
+        await self.raw_conn.executescript(PRAGMAS)
+        await super().setup()
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._background())
+
+    async def aput(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        saved = await super().aput(config, checkpoint, metadata, new_versions)
+        if self.keep_last is not None:
+            self._dirty.add(thread_key(config))
+        return saved
+
+    async def flush(self):
+        async with self.lock:
+            if self._pending or self._dirty:
+                await self._commit()
+
+    async def prune(self) -> int:
+        if self.keep_last is None:
+            return 0
+        async with self.lock:
+            deleted = await self._prune_dirty()
+            await self._commit()
+            return deleted
+
+    async def compact(self, full: bool = False):
+        if self.keep_last is not None:
+            async with self.lock:
+                async with self.raw_conn.execute(THREAD_KEYS) as cur:
+                    self._dirty.update(await cur.fetchall())
+        await self.prune()
+        async with self.lock:
+            await self._vacuum("VACUUM" if full else "PRAGMA incremental_vacuum", "TRUNCATE")
+
+    async def aclose(self):
+        try:
+            if self._worker is not None:
+                self._worker.cancel()
+                await asyncio.gather(self._worker, return_exceptions=True)
+            await self.flush()
+            if self.keep_last is not None:
+                await self.compact()
+        finally:
+            await self.raw_conn.close()
+
+    async def _commit(self):
+        await self._prune_dirty()
+        await self.raw_conn.commit()
+        self._pending = 0
+        self.stats.commits += 1
+
+    async def _prune_dirty(self) -> int:
+        keys, self._dirty = self._dirty, set()
+        deleted = 0
+        for thread_id, checkpoint_ns in keys:
+            async with self.raw_conn.execute(CUTOFF, (thread_id, checkpoint_ns, self.keep_last)) as cur:
+                row = await cur.fetchone()
+            if row is None:
+                continue
+            async with self.raw_conn.execute(DELETE_CHECKPOINTS, (thread_id, checkpoint_ns, row[0])) as cur:
+                deleted += cur.rowcount
+            await self.raw_conn.execute_fetchall(DELETE_WRITES, (thread_id, checkpoint_ns, row[0]))
+        self.stats.pruned += deleted
+        self._freed = self._freed or deleted > 0
+        return deleted
+
+    async def _vacuum(self, statement: str, wal_checkpoint: str):
+        if self._pending:
+            await self._commit()
+        await self.raw_conn.execute_fetchall(statement)
+        await self.raw_conn.execute_fetchall(f"PRAGMA wal_checkpoint({wal_checkpoint})")
+        self._freed = False
+        self.stats.compactions += 1
+
+    async def _background(self):
+        last_compaction = time.monotonic()
+        while True:
+            await asyncio.sleep(self.commit_interval)
+            try:
+                await self.flush()
+                if self._freed and time.monotonic() - last_compaction >= self.compact_interval:
+                    async with self.lock:
+                        await self._vacuum("PRAGMA incremental_vacuum", "PASSIVE")
+                    last_compaction = time.monotonic()
+            except sqlite3.Error:
+                logger.exception("Background commit/compaction failed")
@@ -0,0 +1,150 @@
+"""Token-budgeted context window for the agent graphs.
+
+The generate -> call_agent -> incorporate loop keeps growing `messages`, and
+every call sends the whole history to Ollama. `ContextWindow.fit` trims the
+history to a per-model token budget before each model call:
+
+- leading system messages (plus `keep_first` pinned turns, e.g. the original
+  request) and the newest turns are always kept,
+- the middle is dropped, or replaced by a summary when a summarizer is set,
+- token counts are cached per message, so each call only counts what is new.
+
+    context_window = ContextWindow(budgets={"llama3.2:latest": 3072, "phi4:latest": 12288})
+    response = generation_model.invoke(context_window.fit(messages, generation_model.model))
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, SystemMessage
+
+from tokenizer_registry import TokenizerUnavailable, count_tokens
+
+# Prompt budgets in tokens, leaving room for the reply inside Ollama's context window.
+DEFAULT_BUDGETS = {
+    "llama3.2:latest": 3072,
+    "phi4:latest": 12288,
+}
+
+# Tokens a chat template adds around each message (role markers, separators).
+MESSAGE_OVERHEAD = 4
+
+
+def count_text_tokens(text: str, tokenizer: str = "cl100k_base") -> int:
+    """Count tokens with the shared tokenizer registry, or estimate if it can't be loaded."""
+    try:
+        return count_tokens(text, tokenizer)
+    except TokenizerUnavailable:
+        return max(1, len(text) // 4)
+
+
+def normalize_model_name(model: str) -> str:
+    return model if ":" in model else f"{model}:latest"
+
+
+class ContextWindow:
+    """Trims message histories to a per-model token budget."""
+
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, int]] = None,
+        default_budget: int = 2048,
+        counter: Callable[[str], int] = count_text_tokens,
+        summarizer: Optional[Callable[[List[BaseMessage]], str]] = None,
+        summary_budget: int = 256,
+        keep_first: int = 0,
+        cache_size: int = 10_000,
+    ):
+        self.budgets = {normalize_model_name(k): v for k, v in (budgets or DEFAULT_BUDGETS).items()}
+        self.default_budget = default_budget
+        self.counter = counter
+        self.summarizer = summarizer
+        self.summary_budget = summary_budget
+        self.keep_first = keep_first
+        self.cache_size = cache_size
+        self._counts: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._summaries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def budget_for(self, model: str) -> int:
+        return self.budgets.get(normalize_model_name(model), self.default_budget)
+
+    def count(self, message: BaseMessage) -> int:
+        """Token count of one message, cached by role and content."""
+        key = self._key(message)
+        with self._lock:
+            tokens = self._counts.get(key)
+            if tokens is not None:
+                self._counts.move_to_end(key)
+                return tokens
+        tokens = self.counter(message.text()) + MESSAGE_OVERHEAD
+        with self._lock:
+            self._counts[key] = tokens
+            if len(self._counts) > self.cache_size:
+                self._counts.popitem(last=False)
+        return tokens
+
+    def count_messages(self, messages: Sequence[BaseMessage]) -> int:
+        return sum(self.count(m) for m in messages)
+
+    def fit(self, messages: Sequence[BaseMessage], model: str) -> List[BaseMessage]:
+        """Return the messages that fit the model's budget, oldest first."""
+        messages = list(messages)
+        budget = self.budget_for(model)
+        if self.count_messages(messages) <= budget:
+            return messages
+
+        head = 0
+        while head < len(messages) and isinstance(messages[head], SystemMessage):
+            head += 1
+        head = min(len(messages) - 1, head + self.keep_first)
+        system, rest = messages[:head], messages[head:]
+
+        remaining = budget - self.count_messages(system)
+        if self.summarizer is not None:
+            remaining -= self.summary_budget
+
+        # Walk back from the newest message; the newest one is always kept.
+        start = len(rest)
+        while start > 0:
+            tokens = self.count(rest[start - 1])
+            if tokens > remaining and start < len(rest):
+                break
+            remaining -= tokens
+            start -= 1
+
+        dropped, kept = rest[:start], rest[start:]
+        if dropped and self.summarizer is not None:
+            return system + [SystemMessage(content=self._summary(dropped))] + kept
+        return system + kept
+
+    def _summary(self, dropped: List[BaseMessage]) -> str:
+        key = tuple(self._key(m) for m in dropped)
+        with self._lock:
+            summary = self._summaries.get(key)
+        if summary is None:
+            summary = "Summary of the earlier conversation: " + self.summarizer(dropped)
+            with self._lock:
+                self._summaries[key] = summary
+                if len(self._summaries) > 128:
+                    self._summaries.popitem(last=False)
+        return summary
+
+    @staticmethod
+    def _key(message: BaseMessage) -> Hashable:
+        content = message.content
+        if not isinstance(content, str):
+            content = repr(content)
+        return message.type, content
+
+
+def make_summarizer(model, max_words: int = 150) -> Callable[[List[BaseMessage]], str]:
+    """Summarize dropped turns with a chat model (a small, fast one is enough)."""
+
+    def summarize(messages: List[BaseMessage]) -> str:
+        transcript = "\n".join(f"{m.type}: {m.text()}" for m in messages)
+        prompt = (f"Summarize the following conversation in at most {max_words} words, "
+                  f"keeping facts, decisions and open questions:\n\n{transcript}")
+        return model.invoke(prompt).content
+
+    return summarize
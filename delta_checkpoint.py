@@ -0,0 +1,249 @@
+"""Delta-encoded, zstd-compressed checkpoints.
+
+Every checkpoint stores the full graph state, so a conversation of n steps
+writes O(n^2) bytes of messages. `DeltaSqliteSaver` stores each checkpoint
+as a delta against its parent instead:
+
+- channels whose version did not change are stored as a reference,
+- list-like channels that only grew (`messages`, a `MessageLog` or a list)
+  store just the appended items,
+- any other changed channel is stored in full,
+- every `snapshot_every`-th checkpoint of a chain is a full snapshot, so
+  loading replays at most `snapshot_every - 1` deltas onto a snapshot, and
+  recently written or loaded states are kept in a small LRU cache,
+- with `keep_last`, pruning stops at the snapshot the oldest retained
+  checkpoints replay from, so up to `snapshot_every - 1` older checkpoints
+  are kept as well and every retained checkpoint still loads.
+
+Blobs are LangGraph's msgpack encoding, compressed with zstd by
+`ZstdSerializer` (plain msgpack rows written by `SqliteSaver` still load).
+
+    saver = DeltaSqliteSaver.from_path("checkpoints.sqlite", snapshot_every=16)
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import zstandard
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import CheckpointTuple
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from checkpoint_store import CUTOFF, BatchedSqliteSaver, thread_key
+from message_log import MessageLog
+
+logger = logging.getLogger(__name__)
+
+# Retained checkpoints whose parent (the base of a delta) is older than a given id.
+UNANCHORED = (
+    "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+    "AND checkpoint_id >= ? AND parent_checkpoint_id < ?"
+)
+PARENT = "SELECT parent_checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+BELOW = (
+    "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ? "
+    "ORDER BY checkpoint_id DESC LIMIT 1"
+)
+
+DELTA_KEY = "__delta__"
+ZSTD_SUFFIX = "+zstd"
+
+
+class ZstdSerializer(SerializerProtocol):
+    """JsonPlusSerializer (msgpack) output compressed with zstd."""
+
+    def __init__(self, level: int = 3, min_size: int = 128, serde: Optional[SerializerProtocol] = None):
+        self.serde = serde or JsonPlusSerializer()
+        self.min_size = min_size  # smaller payloads are not worth a zstd frame
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._lock = threading.Lock()  # zstd contexts are not thread-safe
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.serde.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.serde.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        if len(data) < self.min_size:
+            return type_, data
+        with self._lock:
+            return type_ + ZSTD_SUFFIX, self._compressor.compress(data)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(ZSTD_SUFFIX):
+            with self._lock:
+                payload = self._decompressor.decompress(payload)
+            type_ = type_[: -len(ZSTD_SUFFIX)]
+        return self.serde.loads_typed((type_, payload))
+
+
+def _extends(value, base) -> bool:
+    """True if `value` is `base` plus appended items."""
+    if type(value) is not type(base) or not isinstance(value, (list, MessageLog)) or len(value) < len(base):
+        return False
+    # Values written by consecutive steps share their items, so this is
+    # mostly identity checks.
+    return all(a is b or a == b for a, b in zip(value, base))
+
+
+def _append(base, items: List[Any]):
+    return base.extend(items) if isinstance(base, MessageLog) else base + items
+
+
+class DeltaSqliteSaver(BatchedSqliteSaver):
+    """BatchedSqliteSaver that stores checkpoints as deltas against their parent.
+
+    With `keep_last`, the checkpoints back to the snapshot of the oldest
+    retained one are kept too, so the retained deltas can still be replayed.
+    """
+
+    def __init__(self, conn, *, serde=None, snapshot_every: int = 16, cache_size: int = 64,
+                 keep_last: Optional[int] = None, **kwargs):
+        super().__init__(conn, serde=serde or ZstdSerializer(), keep_last=keep_last, **kwargs)
+        self.lock = threading.RLock()  # list() loads delta bases while its cursor is open
+        self.snapshot_every = snapshot_every
+        self.cache_size = cache_size
+        # checkpoint_id -> (channel_values, chain depth; 0 for a snapshot)
+        self._states: "OrderedDict[str, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._states_lock = threading.Lock()
+
+    def put(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        values = checkpoint["channel_values"]
+        parent_id = config["configurable"].get("checkpoint_id")
+        key = thread_key(config)
+        parent = self._state(key, parent_id) if parent_id else None
+        if parent is not None and self.keep_last is not None and not self._stored(key, parent_id):
+            parent = None  # a fork from a pruned (only cached) checkpoint: store a snapshot
+        depth = 0
+        stored = checkpoint
+        if parent is not None and parent[1] + 1 < self.snapshot_every:
+            depth = parent[1] + 1
+            stored = {**checkpoint, "channel_values": {DELTA_KEY: self._delta(values, parent[0], parent_id, depth)}}
+        saved = super().put(config, stored, metadata, new_versions)
+        self._remember(checkpoint["id"], values, depth)
+        return saved
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self._resolve(super().get_tuple(config))
+
+    def list(self, config, *, filter=None, before=None, limit=None) -> Iterator[CheckpointTuple]:
+        for checkpoint_tuple in super().list(config, filter=filter, before=before, limit=limit):
+            try:
+                yield self._resolve(checkpoint_tuple)
+            except LookupError as e:
+                # e.g. pruned by an older version that cut chains mid-way; the rest of the history still loads
+                logger.warning("Skipping checkpoint in history: %s", e)
+
+    def _cutoff(self, thread_id: str, checkpoint_ns: str) -> Optional[str]:
+        """Newest deletable checkpoint_id: older than every snapshot a retained delta replays from."""
+        if self.keep_last < 1:
+            return super()._cutoff(thread_id, checkpoint_ns)
+        key = (thread_id, checkpoint_ns)
+        row = self.conn.execute(CUTOFF, (thread_id, checkpoint_ns, self.keep_last - 1)).fetchone()
+        if row is None:
+            return None
+        oldest = row[0]  # oldest checkpoint the retention policy keeps
+        while True:
+            # Chains leave the kept range only through checkpoints whose parent is older than it.
+            exits = self.conn.execute(UNANCHORED, (thread_id, checkpoint_ns, oldest, oldest)).fetchall()
+            lowest = min([self._snapshot_of(key, checkpoint_id) for (checkpoint_id,) in exits] + [oldest])
+            if lowest == oldest:
+                break
+            oldest = lowest
+        row = self.conn.execute(BELOW, (thread_id, checkpoint_ns, oldest)).fetchone()
+        return row[0] if row else None
+
+    def _snapshot_of(self, key: Tuple[str, str], checkpoint_id: str) -> str:
+        """The snapshot a checkpoint replays from: its ancestor `depth` parents up (a delta's base is its parent)."""
+        with self._states_lock:
+            state = self._states.get(checkpoint_id)
+        if state is not None:
+            depth = state[1]
+        else:
+            values = self._load_values(key, checkpoint_id)
+            depth = values[DELTA_KEY]["depth"] if values and DELTA_KEY in values else 0
+        for _ in range(depth):
+            row = self.conn.execute(PARENT, (*key, checkpoint_id)).fetchone()
+            if row is None or row[0] is None:
+                break
+            checkpoint_id = row[0]
+        return checkpoint_id
+
+    def _delta(self, values: Dict[str, Any], base: Dict[str, Any], base_id: str, depth: int) -> Dict[str, Any]:
+        delta = {"base": base_id, "depth": depth, "same": [], "appended": {}, "set": {}}
+        for channel, value in values.items():
+            if channel in base and value is base[channel]:
+                delta["same"].append(channel)
+            elif channel in base and _extends(value, base[channel]):
+                delta["appended"][channel] = list(value[len(base[channel]):])
+            elif channel in base and value == base[channel]:
+                delta["same"].append(channel)
+            else:
+                delta["set"][channel] = value
+        return delta
+
+    def _resolve(self, checkpoint_tuple: Optional[CheckpointTuple]) -> Optional[CheckpointTuple]:
+        if checkpoint_tuple is None or DELTA_KEY not in checkpoint_tuple.checkpoint["channel_values"]:
+            return checkpoint_tuple
+        checkpoint = checkpoint_tuple.checkpoint
+        with self._states_lock:
+            state = self._states.get(checkpoint["id"])
+        if state is None:
+            state = self._apply(thread_key(checkpoint_tuple.config), checkpoint["id"], checkpoint["channel_values"][DELTA_KEY])
+        values = state[0]
+        return checkpoint_tuple._replace(checkpoint={**checkpoint, "channel_values": values})
+
+    def _state(self, key: Tuple[str, str], checkpoint_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Full channel values and chain depth of a checkpoint, from the cache or the database."""
+        with self._states_lock:
+            state = self._states.get(checkpoint_id)
+            if state is not None:
+                self._states.move_to_end(checkpoint_id)
+                return state
+        values = self._load_values(key, checkpoint_id)
+        if values is None:
+            return None
+        if DELTA_KEY in values:
+            return self._apply(key, checkpoint_id, values[DELTA_KEY])
+        self._remember(checkpoint_id, values, 0)
+        return values, 0
+
+    def _apply(self, key: Tuple[str, str], checkpoint_id: str, delta: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        base = self._state(key, delta["base"])
+        if base is None:
+            raise LookupError(f"Base checkpoint {delta['base']} of {checkpoint_id} is missing")
+        base_values = base[0]
+        values = {channel: base_values[channel] for channel in delta["same"]}
+        for channel, items in delta["appended"].items():
+            values[channel] = _append(base_values[channel], items)
+        values.update(delta["set"])
+        self._remember(checkpoint_id, values, delta["depth"])
+        return values, delta["depth"]
+
+    def _stored(self, key: Tuple[str, str], checkpoint_id: str) -> bool:
+        with self.cursor(transaction=False) as cur:
+            cur.execute("SELECT 1 FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                        (*key, checkpoint_id))
+            return cur.fetchone() is not None
+
+    def _load_values(self, key: Tuple[str, str], checkpoint_id: str) -> Optional[Dict[str, Any]]:
+        with self.cursor(transaction=False) as cur:
+            cur.execute(
+                "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (*key, checkpoint_id),
+            )
+            row = cur.fetchone()
+        return self.serde.loads_typed(row)["channel_values"] if row else None
+
+    def _remember(self, checkpoint_id: str, values: Dict[str, Any], depth: int):
+        with self._states_lock:
+            self._states[checkpoint_id] = (values, depth)
+            self._states.move_to_end(checkpoint_id)
+            while len(self._states) > self.cache_size:
+                self._states.popitem(last=False)
@@ -0,0 +1,160 @@
+"""Content-addressed embedding cache backed by a memory-mapped vector file.
+
+`CachedEmbeddings` wraps any LangChain `Embeddings` (e.g. `OllamaEmbeddings`)
+so that a text is only sent to the model the first time it is seen:
+
+- the cache key is a 16-byte BLAKE2b digest of the model name and the text,
+- vectors live in a float32 NumPy memmap (`<model>.f32`), one row per text,
+- the index (`<model>.idx`) is just the digests in row order, 16 bytes per
+  entry, so startup reads the index but never loads the vectors into RAM,
+- misses from one call are de-duplicated and sent to the model in batches
+  through `embed_documents`.
+
+    embeddings = CachedEmbeddings(OllamaEmbeddings(model="nomic-embed-text"))
+    embeddings.embed_query("Hello, how are you?")
+    print(embeddings.stats)
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DIGEST_SIZE = 16
+
+
+@dataclass
+class EmbeddingCacheStats:
+    hits: int = 0
+    misses: int = 0
+    rows: int = 0
+    bytes_mapped: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that stores every vector once, keyed by content hash."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: Optional[str] = None,
+        path: str = ".embedding_cache",
+        batch_size: int = 64,
+        initial_rows: int = 1024,
+    ):
+        self.embeddings = embeddings
+        self.model = model or getattr(embeddings, "model", None) or type(embeddings).__name__
+        self.batch_size = batch_size
+        self.initial_rows = initial_rows
+        self.stats = EmbeddingCacheStats()
+
+        self._dir = Path(path)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        stem = re.sub(r"[^A-Za-z0-9_.-]", "_", self.model)
+        self._vectors_path = self._dir / f"{stem}.f32"
+        self._index_path = self._dir / f"{stem}.idx"
+        self._meta_path = self._dir / f"{stem}.json"
+
+        self._lock = threading.Lock()
+        self._rows: Dict[bytes, int] = {}
+        self._dim: Optional[int] = None
+        self._vectors: Optional[np.memmap] = None
+
+        if self._meta_path.exists():
+            self._dim = json.loads(self._meta_path.read_text())["dim"]
+            self._load_index()
+            self._map(max(self.initial_rows, len(self._rows)))
+
+    def key(self, text: str) -> bytes:
+        return hashlib.blake2b(f"{self.model}\0{text}".encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            missing: Dict[bytes, str] = {}
+            for key, text in zip(keys, texts):
+                if key not in self._rows and key not in missing:
+                    missing[key] = text
+            self.stats.misses += len(missing)
+            self.stats.hits += len(texts) - len(missing)
+
+        if missing:
+            miss_keys = list(missing)
+            for start in range(0, len(miss_keys), self.batch_size):
+                batch = miss_keys[start:start + self.batch_size]
+                vectors = self.embeddings.embed_documents([missing[k] for k in batch])
+                with self._lock:
+                    self._store(batch, vectors)
+
+        with self._lock:
+            return [self._vectors[self._rows[key]].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def get_vectors(self, texts: List[str]) -> np.ndarray:
+        """Embed `texts` and return them as one float32 array (rows in input order)."""
+        self.embed_documents(texts)
+        with self._lock:
+            return self._vectors[[self._rows[self.key(text)] for text in texts]]
+
+    def flush(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+
+    # The helpers below expect self._lock to be held (or run during __init__).
+
+    def _load_index(self):
+        data = self._index_path.read_bytes() if self._index_path.exists() else b""
+        count = len(data) // DIGEST_SIZE  # ignore a torn trailing record
+        self._rows = {data[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE]: i for i in range(count)}
+        self.stats.rows = count
+
+    def _map(self, capacity: int):
+        """(Re)map the vector file with room for `capacity` rows, growing the file if needed."""
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        row_bytes = self._dim * np.dtype(np.float32).itemsize
+        size = capacity * row_bytes
+        with open(self._vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        capacity = os.path.getsize(self._vectors_path) // row_bytes
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self._dim))
+        self.stats.bytes_mapped = capacity * row_bytes
+
+    def _store(self, keys: List[bytes], vectors: List[List[float]]):
+        if self._dim is None:
+            self._dim = len(vectors[0])
+            self._meta_path.write_text(json.dumps({"model": self.model, "dim": self._dim}))
+            self._map(self.initial_rows)
+
+        new = [(k, v) for k, v in zip(keys, vectors) if k not in self._rows]
+        needed = len(self._rows) + len(new)
+        if needed > self._vectors.shape[0]:
+            self._map(max(needed, 2 * self._vectors.shape[0]))
+
+        first = len(self._rows)
+        for offset, (_, vector) in enumerate(new):
+            self._vectors[first + offset] = vector
+        self._vectors.flush()
+        # Digests are appended only after their vectors are on disk, so a crash
+        # never leaves an index entry pointing at an unwritten row.
+        with open(self._index_path, "ab") as f:
+            f.write(b"".join(k for k, _ in new))
+        for offset, (key, _) in enumerate(new):
+            self._rows[key] = first + offset
+        self.stats.rows = len(self._rows)
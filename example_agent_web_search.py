@@ -1,91 +1,125 @@
-from langchain_ollama import ChatOllama
+import asyncio
+from langchain_ollama import ChatOllama, OllamaEmbeddings
 from langchain_core.messages import HumanMessage, AIMessage, FunctionMessage
 from langgraph.graph import StateGraph, END
 from typing import Annotated, Dict, List, Any, TypedDict, Union
-from langchain_community.tools import DuckDuckGoSearchResults
-from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.tools import tool
 from langchain_core.runnables import RunnablePassthrough
 
+from search_cache import SearchCache
+from search_client import SearchClient
+from embedding_cache import CachedEmbeddings
+from semantic_search_cache import SemanticSearchCache
+from react_stream import stream_react
+from tool_calling import ToolRouter, decide_with_tools
+from message_log import MessageLog, append_messages
+from answer_stream import stream_answer
+
 # 1. Define models
 # Reduced temperature for more deterministic behavior in this example
 agent_llm = ChatOllama(model="phi4:latest", temperature=0.2)
 
 # 2. Define State
 class State(TypedDict):
-    # Union is a type that can hold one of several types,
-    # meaning it can be either a HumanMessage or an AIMessage
-    messages: List[Union[HumanMessage, AIMessage | FunctionMessage]]
+    # Append-only history: nodes return only their new messages and the
+    # append_messages reducer adds them without copying the earlier ones.
+    messages: Annotated[MessageLog, append_messages]
     content: str  # Store the content that might need web searching
     search_results: str # Store the web search results
     num_iterations: int  # Add a counter to track iterations
 
 # 3. Define the tool
+# One pooled, rate-limited client serves every search, and repeated queries
+# are answered from a local SQLite cache instead of DuckDuckGo.
+search_client = SearchClient(max_concurrency=4, rate=1.0)
+search_cache = SearchCache(".search_cache.sqlite", backend=search_client.invoke)
+
+# Rephrasings of a recent query reuse its results: queries are embedded with
+# nomic-embed-text and compared against past searches before going to the web.
+semantic_cache = SemanticSearchCache(
+    CachedEmbeddings(OllamaEmbeddings(model="nomic-embed-text")),
+    backend=search_cache.search,
+    threshold=0.92,
+    path=".semantic_search_cache/index",
+)
+
 @tool
 def web_search_tool(query: str) -> str:
     """Conduct a web search based on the provided query."""
-    # Use the DuckDuckGoSearchResults with full API (not 'lite').
-    wrapper = DuckDuckGoSearchAPIWrapper()
-    search = DuckDuckGoSearchResults(api_wrapper=wrapper)
-    search_results = search.run(query)
-    return search_results
-
-# 4. Define nodes
+    return semantic_cache.search(query)
+
+# 4. Define prompts and chains (built once, reused by every node call)
+tools = {"web_search_tool": web_search_tool}
+tool_router = ToolRouter(list(tools.values()))
+
+# "tools": the model returns structured tool calls (bind_tools) whose arguments
+# are checked against the tool schema; "react": the Thought/Action text protocol.
+AGENT_MODE = "tools"
+
+agent_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", "You are a helpful assistant, that can use tools. "
+         "You have access to the following tool:"
+         "\n web_search_tool: Conduct a web search based on the provided query."),
+        MessagesPlaceholder(variable_name="messages"),
+        ("system", "You must first decide if you need to use a tool. "
+         "If you decide to use a tool, use this format: \n```\nThought: "
+         "Do I need to use a tool? Yes\nAction: <tool_name>\nAction Input: "
+         "<tool_input>\n```\nIf not, use this format: \n```\nThought: "
+         "Do I need to use a tool? No\nFinal Answer: <your answer>\n```"),
+    ]
+)
+agent = agent_prompt | agent_llm
+
+tool_agent_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", "You are a helpful assistant, that can use tools. "
+         "Call web_search_tool when the request needs current information from the web; "
+         "otherwise answer directly."),
+        MessagesPlaceholder(variable_name="messages"),
+    ]
+)
+# phi4's Ollama template has no tool support; llama3.2 does (see example_ollama.py).
+tool_agent_llm = ChatOllama(model="llama3.2:latest", temperature=0.2)
+tool_agent = tool_agent_prompt | tool_agent_llm.bind_tools(tool_router.tools)
+
+incorporate_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful assistant, that has access to internet search results."),
+    ("human", "Refine the following information based on the web search results provided.  Here is the original information/question: {content}. \n\nHere are the web search results: {search_results}")
+])
+incorporate_chain = incorporate_prompt | agent_llm
+
+# 5. Define nodes
 def call_agent(state: State) -> Dict:
     """
     Call the agent to decide whether to search the web or not.
     If search is required, the agent will use the web_search_tool.
     """
     messages = state["messages"]
-    tools = {"web_search_tool": web_search_tool}
-
-    # Define the prompt
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", "You are a helpful assistant, that can use tools. "
-             "You have access to the following tool:"
-             "\n web_search_tool: Conduct a web search based on the provided query."),
-            MessagesPlaceholder(variable_name="messages"),
-            ("system", "You must first decide if you need to use a tool. "
-             "If you decide to use a tool, use this format: \n```\nThought: "
-             "Do I need to use a tool? Yes\nAction: <tool_name>\nAction Input: "
-             "<tool_input>\n```\nIf not, use this format: \n```\nThought: "
-             "Do I need to use a tool? No\nFinal Answer: <your answer>\n```"),
-        ]
-    )
-    
-    agent = prompt | agent_llm
 
-    # Get Agent response
-    agent_response = agent.invoke({"messages": messages})
+    if AGENT_MODE == "tools":
+        decision = decide_with_tools(tool_agent, {"messages": messages.to_list()}, tool_router)
+    else:
+        # Stream the agent response; generation stops as soon as the tool call is complete.
+        decision = stream_react(agent, {"messages": messages.to_list()})
 
     # Check if the agent wants to use a tool
-    if "Thought: Do I need to use a tool? Yes" in agent_response.content:
-        # Extract tool name and input
-        tool_name_start = agent_response.content.find("Action: ") + len("Action: ")
-        tool_name_end = agent_response.content.find("\n", tool_name_start)
-        tool_name = agent_response.content[tool_name_start:tool_name_end].strip()
-        
-        tool_input_start = agent_response.content.find("Action Input: ") + len("Action Input: ")
-        tool_input = agent_response.content[tool_input_start:].strip()
-
-        # Invoke the tool
-        if tool_name in tools:
-            tool_result = tools[tool_name].invoke(tool_input)
-        else:
-            tool_result = f"Error: Tool '{tool_name}' not found."
+    if decision.is_tool_call:
+        tool_input = decision.tool_input
+
+        # Invoke the tool (validated structured arguments, or the Action Input text)
+        tool_result = tool_router.run(decision.tool_name, decision.tool_args or tool_input)
         
         agent_response = f"Tool Result: {tool_result}"
-        return {"messages": messages + [AIMessage(content=agent_response)], "content": tool_input, "search_results": tool_result, "num_iterations": state['num_iterations'] + 1}
-    elif "Thought: Do I need to use a tool? No" in agent_response.content:
-        final_answer_start = agent_response.content.find("Final Answer: ") + len("Final Answer: ")
-        final_answer = agent_response.content[final_answer_start:].strip()
+        return {"messages": [AIMessage(content=agent_response)], "content": tool_input, "search_results": tool_result, "num_iterations": state['num_iterations'] + 1}
+    elif decision.is_final_answer:
+        final_answer = decision.final_answer
         agent_response = f"No web search needed: {final_answer}"
-        return {"messages": messages + [AIMessage(content=agent_response)], "content": final_answer, "search_results": "", "num_iterations": state['num_iterations'] + 1}
+        return {"messages": [AIMessage(content=agent_response)], "content": final_answer, "search_results": "", "num_iterations": state['num_iterations'] + 1}
     else:
         agent_response = "Error: Could not determine if a tool should be used or not."
-        return {"messages": messages + [AIMessage(content=agent_response)], "content": agent_response, "search_results": "", "num_iterations": state['num_iterations'] + 1}
+        return {"messages": [AIMessage(content=agent_response)], "content": agent_response, "search_results": "", "num_iterations": state['num_iterations'] + 1}
 
 def incorporate_search_results(state: State) -> Dict:
     """Incorporate web search results into the content."""
@@ -95,16 +129,9 @@ def incorporate_search_results(state: State) -> Dict:
     content = state['content']
     
     if "No web search needed" not in last_message:
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a helpful assistant, that has access to internet search results."),
-            ("human", f"Refine the following information based on the web search results provided.  Here is the original information/question: {content}. \n\nHere are the web search results: {search_results}")
-        ])
-
-        chain = prompt | agent_llm
-
-        response = chain.invoke({})
+        response = incorporate_chain.invoke({"content": content, "search_results": search_results})
         new_message = AIMessage(content=response.content)
-        return {"messages": messages + [new_message], "content": response.content, "num_iterations": state['num_iterations'], "search_results":""}
+        return {"messages": [new_message], "content": response.content, "num_iterations": state['num_iterations'], "search_results":""}
     else:
         return {"num_iterations": state['num_iterations']}  # if no search results, nothing to incorporate, so just pass state along
 
@@ -125,7 +152,7 @@ def decide_to_continue(state: State) -> str:
     return "call_agent"
 
 
-# 5. Build graph
+# 6. Build graph
 graph = StateGraph(State)
 graph.add_node("call_agent", call_agent)
 graph.add_node("incorporate", incorporate_search_results)
@@ -137,12 +164,32 @@ graph.set_entry_point("call_agent")
 
 runnable = graph.compile()
 
-# 6. Execute with proper input format
-inputs = {"messages": [HumanMessage(content="What are the latest news about AI? Summarize them")], "num_iterations": 0, "content":"", "search_results":""}
-result = runnable.invoke(inputs)
-
-print("Final content:", result["messages"][-1].content)
-
-# Save the final content as "Untitled.txt" in the current directory.
-with open("output.md", "w") as f:
-    f.write(result["messages"][-1].content)
+def make_inputs(question: str) -> Dict:
+    return {"messages": [HumanMessage(content=question)], "num_iterations": 0, "content": "", "search_results": ""}
+
+def final_output(result: Dict) -> str:
+    return result["messages"][-1].content
+
+def final_answer_of(update: Dict) -> Union[str, None]:
+    """The answer in a call_agent update, if the agent gave one (not a tool call)."""
+    messages = update.get("messages") or []
+    if messages and messages[-1].content.startswith("No web search needed"):
+        return messages[-1].content
+    return None
+
+# 7. Execute with proper input format
+if __name__ == "__main__":
+    inputs = make_inputs("What are the latest news about AI? Summarize them")
+
+    # Stream the answer to stdout and output.md (node progress goes to stderr).
+    # call_agent's model output is a tool call or ReAct text, so only its final
+    # answer is written, once the node is done.
+    asyncio.run(stream_answer(
+        runnable, inputs, "output.md", answer_nodes={"incorporate"}, final_output=final_output,
+        answer_updates={"call_agent": final_answer_of},
+    ))
+
+    print("Search cache:", search_cache.stats)
+    print(f"Semantic cache: {semantic_cache.stats.hits} hits, "
+          f"{semantic_cache.stats.seconds_saved_per_hit:.2f}s saved per hit")
+    semantic_cache.save()
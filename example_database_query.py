@@ -1,35 +1,54 @@
-from langchain_community.utilities import SQLDatabase
-from langchain_ollama import ChatOllama
+from langchain_ollama import ChatOllama, OllamaEmbeddings
 from langchain.chains import create_sql_query_chain
 
+from embedding_cache import CachedEmbeddings
+from llm_cache import TieredLLMCache
+from schema_cache import CachedSQLDatabase
+from sql_executor import SQLExecutor, tuned_engine_args
+from table_retriever import TableRetriever
+
 DB_USER = "user"
 DB_PASSWORD = "password"
 DB_HOST = "localhost"
 DB_PORT = "5432"
 DB_NAME = "city_db"
 
-# Create database connection
+# Create database connection (table info comes from a schema snapshot that is
+# only rebuilt when the catalog changes)
+DB_URI = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 try:
-    db = SQLDatabase.from_uri(
-        f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
+    db = CachedSQLDatabase.from_uri(DB_URI, engine_args=tuned_engine_args(DB_URI))
 except Exception as e:
     print(f"Error connecting to database: {e}")
     exit(1)
 
 
-# Create LangChain model
-llm = ChatOllama(model="llama3.2", temperature=0)
+# Create LangChain model (temperature 0, so repeated questions are served from the cache)
+llm_cache = TieredLLMCache(".llm_cache.sqlite")
+llm = llm_cache.enable(ChatOllama(model="llama3.2", temperature=0))
 
 # Create SQL query chain
 chain = create_sql_query_chain(llm=llm, db=db)
 
+# Only the tables relevant to the question (plus their foreign-key neighbors)
+# go into the prompt
+table_retriever = TableRetriever(db, CachedEmbeddings(OllamaEmbeddings(model="nomic-embed-text")), k=5)
+
+# Runs the generated SQL read-only, with a LIMIT, a cost check and cached
+# question -> SQL and results
+executor = SQLExecutor(db, chain, max_rows=100)
+
 # Define query
 question = ("Return the top 5 cities (along with their populations "
             "and countries) with the highest population.")
 
 # Execute query and handle errors
 try:
-    response = chain.invoke({"question": question})
-    print(response)
+    # Retrieval (an embedding call) only runs when the plan cache has no SQL for the question.
+    result = executor.ask(question, lambda: table_retriever.chain_inputs(question))
+    print(result.sql)
+    print(result.columns)
+    for row in result.rows:
+        print(row)
 except Exception as e:
     print(f"Error executing query: {e}")
@@ -1,37 +1,90 @@
+import functools
 import os
 from pathlib import Path
+from typing import List, TypedDict
 
 from dotenv import load_dotenv
-from langgraph import StateGraph
-from langchain_core.messages import HumanMessage
+from langgraph.graph import StateGraph, END
+from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from langchain_ollama import ChatOllama
-from langchain_community.agent_toolkits.github.toolkit import GitHubToolkit
-from langchain_community.utilities.github import GitHubAPIWrapper
 
-class AgentState:
+import github_client
+from tool_calling import ToolRouter
+from tool_executor import ToolExecutor
+
+class AgentState(TypedDict):
     """Represents the state of our agent."""
 
-    messages: list = []
+    messages: List[BaseMessage]
     """The list of messages in the conversation history."""
-    next: str = ""
+    next: str
     """The next action or function to execute."""
-    repository: str = ""
+    repository: str
     """The repository being used."""
 
 def get_github_tools():
-    """Create a GitHub Toolkit and get its tools."""
-
-    github = GitHubAPIWrapper()
-    toolkit = GitHubToolkit.from_github_api_wrapper(github)
-    tools = toolkit.get_tools()
-    return tools
+    """Get the GitHub Toolkit tools.
+
+    The toolkit and its authenticated client are built once per process and
+    share an ETag response cache and rate-limit scheduler (see github_client).
+    """
+
+    return github_client.get_github_tools()
+
+# "tools": the model returns structured tool calls (bind_tools) that the router
+# validates and runs; "text": tool names are matched in the model's reply.
+AGENT_MODE = "tools"
+
+@functools.lru_cache(maxsize=None)
+def get_tool_router():
+    """Name lookup and argument schemas of the GitHub tools, built once."""
+
+    return ToolRouter(get_github_tools())
+
+# GitHub tools that only read. The others (set/create branch, create/update/
+# delete file, comments, PRs) change the wrapper's active branch or the
+# repository, so they run one at a time, in the order the model asked for them.
+READ_ONLY_TOOLS = {
+    "Get Issues",
+    "Get Issue",
+    "List open pull requests (PRs)",
+    "Get Pull Request",
+    "Overview of files included in PR",
+    "List Pull Requests' Files",
+    "Read File",
+    "Overview of existing files in Main branch",
+    "Overview of files in current working branch",
+    "List branches in this repository",
+    "Get files from a directory",
+    "Search issues and pull requests",
+    "Search code",
+    "Get latest release",
+    "Get releases",
+    "Get release",
+}
+
+@functools.lru_cache(maxsize=None)
+def get_tool_executor():
+    """Runs the read-only calls of one reply concurrently, 60s at most each."""
+
+    return ToolExecutor(get_tool_router(), max_parallel=4, timeout=60, concurrent=READ_ONLY_TOOLS)
+
+@functools.lru_cache(maxsize=None)
+def get_tool_llm():
+    """The chat model with the GitHub tools bound (phi4's Ollama template has no tool support)."""
+
+    return ChatOllama(model="llama3.2", temperature=0.5).bind_tools(get_tool_router().tools)
 
 def call_llm(state):
     """Calls the LLM to decide the next action."""
 
     messages = state["messages"]
+    if AGENT_MODE == "tools":
+        result = get_tool_llm().invoke(messages)
+        return {"next": "call_tool" if result.tool_calls else "end", "messages": messages + [result]}
+
     prompt = ChatPromptTemplate.from_messages(
         [("human", "{messages}")]
     )
@@ -43,6 +96,12 @@ def call_llm(state):
 def call_tool(state):
     """Calls the tool decided on by the LLM"""
     messages = state["messages"]
+    if AGENT_MODE == "tools":
+        # One ToolMessage per requested call, in request order; read-only calls run
+        # concurrently, the others one at a time in request order
+        results = get_tool_executor().run(messages[-1].tool_calls)
+        return {"messages": messages + results, "next": ""}
+
     next = state["next"]
     tools = get_github_tools()
     result = {}
@@ -65,6 +124,8 @@ def call_tool(state):
 def decide_next(state):
     """Determines the next step to take in the agent graph."""
 
+    if state["next"] == "end":
+        return END
     if state["next"] == "" or state["next"] == "call llm":
         return "call_llm"
     return "call_tool"
@@ -86,10 +147,10 @@ def build_agent_graph(tools):
         "call_llm", decide_next, {
             "call_llm": "call_llm",
             "call_tool": "call_tool",
+            END: END,
         }
     )
     graph.add_edge("call_tool", "call_llm")
-    graph.add_edge("call_llm", END)
 
     # Compile and return
     return graph.compile()
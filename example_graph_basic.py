@@ -1,6 +1,7 @@
 from typing import TypedDict
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
+
+from bounded_memory import BoundedMemorySaver
 
 # Define the State
 class State(TypedDict):
@@ -26,7 +27,8 @@ graphBuilder.add_edge("printer", END)
 
 # Configuration and memory
 config = {"configurable": {"thread_id": 1}}
-memory = MemorySaver()
+# Keep the last 20 checkpoints per thread, so the REPL does not grow without bound
+memory = BoundedMemorySaver(max_checkpoints=20, max_threads=100, max_bytes=64 << 20)
 
 # Compile the graph
 graph = graphBuilder.compile(checkpointer=memory)
@@ -47,6 +49,7 @@ while True:
     user_input = input(">> ")
     if user_input.lower() in ["exit", "quit", "q"]:
         print("Exiting...")
+        print(memory.stats)
         break
 
     count = graph.get_state(config).values["count"]
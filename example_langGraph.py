@@ -1,106 +1,165 @@
+import asyncio
+import os
 from langchain_ollama import ChatOllama
 from langchain_core.messages import HumanMessage, AIMessage, FunctionMessage
 from langgraph.graph import StateGraph, END
 from typing import Annotated, Dict, List, Any, TypedDict, Union
-from langchain_community.tools import DuckDuckGoSearchResults
-from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.tools import tool
 from langchain_core.runnables import RunnablePassthrough
 
+from search_cache import SearchCache
+from search_client import SearchClient
+from react_stream import astream_react
+from tool_calling import ToolRouter, adecide_with_tools
+from message_log import MessageLog, append_messages
+from context_window import ContextWindow
+from llm_cache import TieredLLMCache
+from answer_stream import stream_answer
+from model_scheduler import ModelScheduler
+from request_coalescer import CoalescingChatModel, RequestCoalescer
+
 # 1. Define models
-generation_model = ChatOllama(model="llama3.2:latest", temperature=0.7)
-fact_check_model = ChatOllama(model="phi4:latest", temperature=0.0)
-agent_llm = ChatOllama(model="phi4:latest", temperature=0.5)
+# Concurrent runs alternate llama3.2 and phi4; the scheduler groups their calls
+# by model so a host that holds few models at a time swaps less often. Within a
+# run, fact_check (phi4) and call_agent (llama3.2) run in parallel, which needs
+# both models active: max_loaded follows OLLAMA_MAX_LOADED_MODELS and defaults
+# to 2. With 1 (a host with room for one model) the two branches take turns.
+model_scheduler = ModelScheduler(
+    parallel=4, max_loaded=int(os.getenv("OLLAMA_MAX_LOADED_MODELS", "2")), max_wait=10.0,
+)
+generation_model = model_scheduler.manage(ChatOllama(model="llama3.2:latest", temperature=0.7))
+# Only the temperature-0 fact checker is cached; the sampled models are not.
+llm_cache = TieredLLMCache(".llm_cache.sqlite")
+# Concurrent runs fact check at the same time, often the same draft: merge
+# identical prompts and keep at most the server's parallel slots in flight.
+fact_check_coalescer = RequestCoalescer(max_parallel=4, max_queue=64)
+fact_check_model = CoalescingChatModel(
+    # The cache moves up to the outermost wrapper: hits skip the coalescer and phi4's turn.
+    llm=model_scheduler.manage(llm_cache.enable(ChatOllama(model="phi4:latest", temperature=0.0))),
+    coalescer=fact_check_coalescer,
+)
+agent_llm = model_scheduler.manage(ChatOllama(model="phi4:latest", temperature=0.5))
+
+# Trim the growing history to each model's prompt token budget before every call.
+# Pass summarizer=make_summarizer(...) to summarize the dropped middle instead.
+context_window = ContextWindow(
+    budgets={"llama3.2:latest": 3072, "phi4:latest": 12288},
+    keep_first=1,  # always keep the original request
+)
 
 # 2. Define State
 class State(TypedDict):
-    # Union is a type that can hold one of several types,
-    # meaning it can be either a HumanMessage or an AIMessage
-    messages: List[Union[HumanMessage, AIMessage | FunctionMessage]]
+    # Append-only history: nodes return only their new messages and the
+    # append_messages reducer adds them without copying the earlier ones.
+    messages: Annotated[MessageLog, append_messages]
     content: str
+    assessment: str  # fact checker's verdict on `content`
+    agent_response: str  # call_agent's result, added to `messages` by the join node
     num_iterations: int  # Add a counter to track iterations
 
 # 3. Define the tool
+# One pooled, rate-limited client serves every search, and repeated queries
+# are answered from a local SQLite cache instead of DuckDuckGo.
+search_client = SearchClient(max_concurrency=4, rate=1.0)
+search_cache = SearchCache(".search_cache.sqlite", backend=search_client.invoke)
+
 @tool
 def web_search_tool(query: str) -> str:
     """Conduct a web search based on the provided query."""
-    # Use the DuckDuckGoSearchResults with full API (not 'lite').
-    wrapper = DuckDuckGoSearchAPIWrapper()
-    search = DuckDuckGoSearchResults(api_wrapper=wrapper)
-    search_results = search.run(query)
-    return search_results
-
-# 4. Define nodes
-def generate_content(state: State) -> Dict:
+    return search_cache.search(query)
+
+# 4. Define prompts and chains (built once, reused by every node call)
+tools = {"web_search_tool": web_search_tool}
+tool_router = ToolRouter(list(tools.values()))
+
+# "tools": the model returns structured tool calls (bind_tools) whose arguments
+# are checked against the tool schema; "react": the Thought/Action text protocol.
+AGENT_MODE = "tools"
+
+agent_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", "You are a helpful assistant, that can use tools. You have access to the following tool:\n web_search_tool: Conduct a web search based on the provided query."),
+        MessagesPlaceholder(variable_name="messages"),
+        ("system", "You must first decide if you need to use a tool. If you decide to use a tool, use this format: \n```\nThought: Do I need to use a tool? Yes\nAction: <tool_name>\nAction Input: <tool_input>\n```\nIf not, use this format: \n```\nThought: Do I need to use a tool? No\nFinal Answer: <your answer>\n```"),
+    ]
+)
+agent = agent_prompt | agent_llm
+
+tool_agent_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", "You are a helpful assistant, that can use tools. Call web_search_tool when the content needs facts checked or updated from the web; otherwise answer directly."),
+        MessagesPlaceholder(variable_name="messages"),
+    ]
+)
+# phi4's Ollama template has no tool support; llama3.2 does (see example_ollama.py).
+tool_agent_llm = model_scheduler.manage(ChatOllama(model="llama3.2:latest", temperature=0.5))
+tool_agent = tool_agent_prompt | tool_agent_llm.bind_tools(tool_router.tools)
+
+incorporate_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are a helpful assistant, that has access to internet search results."),
+    ("human", "Refine the following content based on the web search results provided.  Here is the original content: {content}. \n\nHere are the web search results: {search_results}")
+])
+incorporate_chain = incorporate_prompt | generation_model
+
+# 5. Define nodes
+# fact_check and call_agent only read `content`, so they run concurrently
+# after every generation; the nodes are async so the two model calls overlap.
+async def generate_content(state: State) -> Dict:
     messages = state['messages']
-    response = generation_model.invoke(messages)
+    response = await generation_model.ainvoke(context_window.fit(messages, generation_model.model))
     new_message = AIMessage(content=response.content)
-    return {"messages": messages + [new_message], "content": response.content, "num_iterations": state['num_iterations'] + 1}
+    return {"messages": [new_message], "content": response.content, "num_iterations": state['num_iterations'] + 1}
 
-def check_factual_accuracy(state: State) -> Dict:
+async def check_factual_accuracy(state: State) -> Dict:
     content = state['content']
     prompt = f"Assess accuracy: {content}"
-    response = fact_check_model.invoke(prompt)
+    response = await fact_check_model.ainvoke(prompt)
     return {"assessment": response.content.lower().strip()}
 
-def decide_if_accurate(state: State) -> str:
-    # Add a new condition to prevent infinite loops: Stop after 3 iterations.
-    if "accurate" in state.get("assessment", "") or state["num_iterations"] >= 3:
-        return END
-    return "generate"
-
-def call_agent(state: State) -> Dict:
+async def call_agent(state: State) -> Dict:
     """
     Call the agent to decide whether to search the web or not.
     If search is required, the agent will use the web_search_tool.
     """
     messages = state["messages"]
-    tools = {"web_search_tool": web_search_tool}
-
-    # Define the prompt
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", "You are a helpful assistant, that can use tools. You have access to the following tool:\n web_search_tool: Conduct a web search based on the provided query."),
-            MessagesPlaceholder(variable_name="messages"),
-            ("system", "You must first decide if you need to use a tool. If you decide to use a tool, use this format: \n```\nThought: Do I need to use a tool? Yes\nAction: <tool_name>\nAction Input: <tool_input>\n```\nIf not, use this format: \n```\nThought: Do I need to use a tool? No\nFinal Answer: <your answer>\n```"),
-        ]
-    )
-    agent = prompt | agent_llm
 
-    # Get Agent response
-    agent_response = agent.invoke({"messages": messages})
+    if AGENT_MODE == "tools":
+        inputs = {"messages": context_window.fit(messages, tool_agent_llm.model)}
+        decision = await adecide_with_tools(tool_agent, inputs, tool_router)
+    else:
+        # Stream the agent response; generation stops as soon as the tool call is complete.
+        inputs = {"messages": context_window.fit(messages, agent_llm.model)}
+        decision = await astream_react(agent, inputs)
 
     # Check if the agent wants to use a tool
-    if "Thought: Do I need to use a tool? Yes" in agent_response:
-        # Extract tool name and input
-        tool_name_start = agent_response.find("Action: ") + len("Action: ")
-        tool_name_end = agent_response.find("\n", tool_name_start)
-        tool_name = agent_response[tool_name_start:tool_name_end].strip()
-        
-        tool_input_start = agent_response.find("Action Input: ") + len("Action Input: ")
-        tool_input = agent_response[tool_input_start:].strip()
-
-        # Invoke the tool
-        if tool_name in tools:
-            tool_result = tools[tool_name].invoke(tool_input)
-        else:
-            tool_result = f"Error: Tool '{tool_name}' not found."
+    if decision.is_tool_call:
+        # Invoke the tool (validated structured arguments, or the Action Input text)
+        tool_result = await tool_router.arun(decision.tool_name, decision.tool_args or decision.tool_input)
         
         agent_response = f"Tool Result: {tool_result}"
-    elif "Thought: Do I need to use a tool? No" in agent_response:
-        final_answer_start = agent_response.find("Final Answer: ") + len("Final Answer: ")
-        final_answer = agent_response[final_answer_start:].strip()
-        agent_response = f"No web search needed: {final_answer}"
+    elif decision.is_final_answer:
+        agent_response = f"No web search needed: {decision.final_answer}"
     else:
         agent_response = "Error: Could not determine if a tool should be used or not."
 
-    # Return agent response
-    agent_response = AIMessage(content=agent_response)
+    # Only this branch writes agent_response, so it cannot clash with fact_check.
+    return {"agent_response": agent_response}
 
-    return {"messages": messages + [agent_response], "num_iterations": state['num_iterations']}
+def join_branches(state: State) -> Dict:
+    """Runs once both branches are done; adds the agent's response to the history."""
+    return {"messages": [AIMessage(content=state["agent_response"])]}
 
-def incorporate_search_results(state: State) -> Dict:
+def decide_next_step(state: State) -> str:
+    """Incorporate search results if the agent searched, otherwise act on the fact check."""
+    if "No web search needed" not in state["agent_response"]:
+        return "incorporate"
+    # Add a new condition to prevent infinite loops: Stop after 3 iterations.
+    if "accurate" in state.get("assessment", "") or state["num_iterations"] >= 3:
+        return END
+    return "generate"
+
+async def incorporate_search_results(state: State) -> Dict:
     """Incorporate web search results into the content."""
     messages = state['messages']
     last_message = messages[-1].content
@@ -108,49 +167,59 @@ def incorporate_search_results(state: State) -> Dict:
     content = state.get("content")
 
     if "No web search needed" not in last_message:
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a helpful assistant, that has access to internet search results."),
-            ("human", f"Refine the following content based on the web search results provided.  Here is the original content: {content}. \n\nHere are the web search results: {last_message}")
-        ])
-
-        chain = prompt | generation_model
-
-        response = chain.invoke({})
+        response = await incorporate_chain.ainvoke({"content": content, "search_results": last_message})
         new_message = AIMessage(content=response.content)
-        return {"messages": messages + [new_message], "content": response.content, "num_iterations": state['num_iterations']}
+        return {"messages": [new_message], "content": response.content, "num_iterations": state['num_iterations']}
     else:
         return {"num_iterations": state['num_iterations']}  # if no search results, nothing to incorporate, so just pass state along
 
-def decide_agent_or_fact_check(state: State) -> str:
-    """Decide whether to call the agent or go to fact-checking."""
-    last_message = state["messages"][-1].content
-    if "No web search needed" in last_message:
-        return "fact_check"
+# 6. Build graph
+def build_graph(parallel: bool = True):
+    """Compile the graph; `parallel=False` runs the two branches one after the other."""
+    graph = StateGraph(State)
+    graph.add_node("generate", generate_content)
+    graph.add_node("fact_check", check_factual_accuracy)
+    graph.add_node("call_agent", call_agent)
+    graph.add_node("join", join_branches)
+    graph.add_node("incorporate", incorporate_search_results)
+
+    if parallel:
+        # Fan out after generate; the join node waits for both branches.
+        graph.add_edge("generate", "fact_check")
+        graph.add_edge("generate", "call_agent")
+        graph.add_edge(["fact_check", "call_agent"], "join")
     else:
-        return "incorporate"
+        graph.add_edge("generate", "call_agent")
+        graph.add_edge("call_agent", "fact_check")
+        graph.add_edge("fact_check", "join")
+
+    # Define conditional edges
+    graph.add_conditional_edges("join", decide_next_step, {"incorporate": "incorporate", "generate": "generate", END: END})
+    graph.add_edge("incorporate", "generate")
+    graph.set_entry_point("generate")
+
+    return graph.compile()
 
-# 5. Build graph
-graph = StateGraph(State)
-graph.add_node("generate", generate_content)
-graph.add_node("fact_check", check_factual_accuracy)
-graph.add_node("call_agent", call_agent)
-graph.add_node("incorporate", incorporate_search_results)
+runnable = build_graph()
 
-# Define conditional edges
-graph.add_conditional_edges("fact_check", decide_if_accurate, {"generate": "generate", END: END})
-graph.add_conditional_edges("call_agent", decide_agent_or_fact_check, {"incorporate": "incorporate", "fact_check": "fact_check"})
-graph.add_edge("generate", "call_agent")
-graph.add_edge("incorporate", "generate")
-graph.set_entry_point("generate")
+def make_inputs(question: str) -> Dict:
+    return {"messages": [HumanMessage(content=question)], "num_iterations": 0}
 
-runnable = graph.compile()
+def final_output(result: Dict) -> str:
+    return result["content"]
 
-# 6. Execute with proper input format
-inputs = {"messages": [HumanMessage(content="Write a 1,000-word blog post about the effects of fasting on the human body.")], "num_iterations": 0}
-result = runnable.invoke(inputs)
+# 7. Execute with proper input format
+if __name__ == "__main__":
+    inputs = make_inputs("Write a 1,000-word blog post about the effects of fasting on the human body.")
+    model_scheduler.warm_up([generation_model.model])  # the graph starts by generating
 
-print("Final content:", result["content"])
+    # Stream each draft to stdout and Untitled.md (node progress goes to stderr);
+    # the file ends up holding the final content.
+    asyncio.run(stream_answer(
+        runnable, inputs, "Untitled.md", answer_nodes={"generate", "incorporate"}, final_output=final_output,
+    ))
 
-# Save the final content as "Untitled.txt" in the current directory.
-with open("Untitled.md", "w") as f:
-    f.write(result["content"])
+    print("Search cache:", search_cache.stats)
+    print("LLM cache:", llm_cache.stats)
+    print("Model scheduler:", model_scheduler.stats)
+    print("Fact-check coalescer:", fact_check_coalescer.stats)
@@ -3,9 +3,12 @@ from langchain_core.messages import HumanMessage, AIMessage
 from langgraph.graph import StateGraph, END
 from typing import Annotated, Dict, List, Any, TypedDict, Union
 
+from llm_cache import TieredLLMCache
+
 # 1. Define models
 generation_model = ChatOllama(model="llama3.2:latest", temperature=0.7)
-fact_check_model = ChatOllama(model="phi4:latest", temperature=0.0)
+llm_cache = TieredLLMCache(".llm_cache.sqlite")
+fact_check_model = llm_cache.enable(ChatOllama(model="phi4:latest", temperature=0.0))
 
 # 2. Define State
 class State(TypedDict):
@@ -44,12 +47,20 @@ graph.set_entry_point("generate")
 
 runnable = graph.compile()
 
+def make_inputs(question: str) -> Dict:
+    return {"messages": [HumanMessage(content=question)]}
+
+def final_output(result: Dict) -> str:
+    return result["content"]
+
 # 5. Execute with proper input format
-inputs = {"messages": [HumanMessage(content="Write a 1,000-word blog post about the effects of fasting on the human body.")]}
-result = runnable.invoke(inputs)
+if __name__ == "__main__":
+    inputs = make_inputs("Write a 1,000-word blog post about the effects of fasting on the human body.")
+    result = runnable.invoke(inputs)
 
-print("Final content:", result["content"])
+    print("Final content:", final_output(result))
+    print("LLM cache:", llm_cache.stats)
 
-# Save the final content as "Untitled.txt" in the current directory.
-with open("Untitled.md", "w") as f:
-    f.write(result["content"])
+    # Save the final content as "Untitled.txt" in the current directory.
+    with open("Untitled.md", "w") as f:
+        f.write(final_output(result))
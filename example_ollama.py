@@ -36,6 +36,8 @@ chain = prompt | llm
 from typing import List
 from langchain_core.tools import tool
 
+from tool_executor import ToolExecutor
+
 @tool
 def validate_user(user_id: int, addresses: List[str]) -> bool:
     """Validate user using historical addresses.
@@ -75,21 +77,12 @@ print("Tool Calls:",result.tool_calls)
 
 # Check if the LLM requested a tool call
 if result.tool_calls:
-    for tool_call in result.tool_calls:
-        # Extract tool name and arguments
-        tool_name = tool_call["name"]
-        tool_args = tool_call["args"]
-
-        # Look up the tool by name in the tools dictionary
-        if tool_name in tools:
-            tool_to_invoke = tools[tool_name]
-
-            # Use the invoke method to call the tool
-            validation_result = tool_to_invoke.invoke(tool_args)
-
-            # Print the result of the tool execution
-            print(f"Validation Result for {tool_name}: {validation_result}")
-        else:
-            print(f"Tool '{tool_name}' not found in the tools dictionary.")
+    # Run the requested calls concurrently (results come back in request order);
+    # unknown tools and invalid arguments come back as error messages.
+    executor = ToolExecutor(list(tools.values()), max_parallel=4, timeout=30)
+    for tool_call, tool_message in zip(result.tool_calls, executor.run(result.tool_calls)):
+        print(f"Validation Result for {tool_call['name']}: {tool_message.content}")
+    print("Tool timings:", list(executor.timings))
+    executor.close()
 else:
     print("No tool calls were made.")
@@ -1,23 +1,24 @@
 from langchain_ollama import OllamaLLM, OllamaEmbeddings
-from transformers import AutoTokenizer
+
+from embedding_cache import CachedEmbeddings
+from tokenizer_registry import count_tokens
 
 # Initialize the Ollama model for text generation
 llm = OllamaLLM(model="llama3.2:latest")  # Replace with a text generation model of your choice
 
-# Initialize the Ollama embeddings model
-embeddings = OllamaEmbeddings(model="nomic-embed-text")
+# Initialize the Ollama embeddings model; vectors are cached on disk by content hash,
+# so re-embedding the same text does not go back to the model
+embeddings = CachedEmbeddings(OllamaEmbeddings(model="nomic-embed-text"))
 
 # Example text
 text = "Hello, how are you?"
 
-# Load the tokenizer for llama3.2
-tokenizer = AutoTokenizer.from_pretrained("meta-llama/Meta-Llama-3-8B-Instruct")
+# Tokenizer for llama3.2 (loaded once on first use, from a local snapshot if present)
+tokenizer_name = "meta-llama/Meta-Llama-3-8B-Instruct"
 
 # Tokenize the text using the tokenizer
 try:
-    # Use the tokenizer from the LLM model
-    tokens = tokenizer.encode(text)
-    token_count = len(tokens)
+    token_count = count_tokens(text, tokenizer_name)
     print(f"Number of tokens: {token_count}")
 except Exception as e:
     print(f"Error during tokenization: {e}")
@@ -27,5 +28,7 @@ try:
     embedding = embeddings.embed_query(text)
     print(f"Embedding vector (first 5 elements): {embedding[:5]}")
     print(f"Embedding length: {len(embedding)}")
+    print(f"Embedding cache: hit ratio {embeddings.stats.hit_ratio:.0%}, "
+          f"{embeddings.stats.bytes_mapped} bytes mapped")
 except Exception as e:
     print(f"Error during embedding generation: {e}")
@@ -2,8 +2,7 @@ from typing import TypedDict, Annotated
 from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
 
-import sqlite3
-from langgraph.checkpoint.sqlite import SqliteSaver
+from checkpoint_store import BatchedSqliteSaver
 
 # Define the State
 class State(TypedDict):
@@ -27,38 +26,42 @@ graphBuilder.add_node("printer", printer)
 graphBuilder.add_edge(START, "printer")
 graphBuilder.add_edge("printer", END)
 
-# Configuration and memory
-config = {"configurable": {"thread_id": 1}}
-conn = sqlite3.connect('checkpoints.sqlite', check_same_thread=False)
-memory = SqliteSaver(conn)
+# graph_server.py serves this graph to many threads at once.
+if __name__ == "__main__":
+    # Configuration and memory
+    config = {"configurable": {"thread_id": 1}}
+    # WAL + group commits; only the last 20 checkpoints of each thread are kept,
+    # so checkpoints.sqlite stops growing with every step.
+    memory = BatchedSqliteSaver.from_path('checkpoints.sqlite', keep_last=20)
 
-# Compile the graph
-graph = graphBuilder.compile(checkpointer=memory)
+    # Compile the graph
+    graph = graphBuilder.compile(checkpointer=memory)
 
-# Check if a saved state exists
-current_state = graph.get_state(config)
-if current_state is None:
-    # First run: use the initial state
-    inputs = {"count": 0}  # Initial state
-    result = graph.invoke(inputs, config)
-else:
-    # Subsequent runs: use the saved state
-    result = graph.invoke(current_state.values, config)
-print(result)  # Output the result
+    # Check if a saved state exists
+    current_state = graph.get_state(config)
+    if current_state is None:
+        # First run: use the initial state
+        inputs = {"count": 0}  # Initial state
+        result = graph.invoke(inputs, config)
+    else:
+        # Subsequent runs: use the saved state
+        result = graph.invoke(current_state.values, config)
+    print(result)  # Output the result
 
-# Draw the graph
-try:
-    graph.get_graph(xray=True).draw_mermaid_png(output_file_path="diagram_simple_graph.png")
-except Exception as e:
-    print(e)
+    # Draw the graph
+    try:
+        graph.get_graph(xray=True).draw_mermaid_png(output_file_path="diagram_simple_graph.png")
+    except Exception as e:
+        print(e)
 
-# Run the bot
-while True:
-    user_input = input(">> ")
-    if user_input.lower() in ["exit", "quit", "q"]:
-        print("Exiting...")
-        break
+    # Run the bot
+    while True:
+        user_input = input(">> ")
+        if user_input.lower() in ["exit", "quit", "q"]:
+            print("Exiting...")
+            memory.close()  # commit pending checkpoints
+            break
 
-    count = graph.get_state(config).values["count"]
-    result = graph.invoke({"count": count}, config)
-    print(result) 
\ No newline at end of file
+        count = graph.get_state(config).values["count"]
+        result = graph.invoke({"count": count}, config)
+        print(result) 
@@ -1,11 +1,11 @@
-from transformers import GPT2Tokenizer
+from tokenizer_registry import count_tokens_batch, get_tokenizer
 
 def count_tokens(text, tokenizer_name='gpt2') -> int:
-    # Load the tokenizer
-    tokenizer = GPT2Tokenizer.from_pretrained(tokenizer_name)
+    # Get the tokenizer (loaded once per process; tiktoken fast path for gpt2)
+    tokenizer = get_tokenizer(tokenizer_name)
     
     # Tokenize the input text
-    tokens = tokenizer.encode(text, add_special_tokens=False)
+    tokens = tokenizer.encode(text)
 
     # Print all the tokens
     print("Tokens:", tokens)
@@ -16,4 +16,8 @@ def count_tokens(text, tokenizer_name='gpt2') -> int:
 # Example usage
 text = "Hello, how are you?"
 token_count = count_tokens(text)
-print(f"Number of tokens: {token_count}")
\ No newline at end of file
+print(f"Number of tokens: {token_count}")
+
+# Count many texts in one batched call
+texts = [text, "What is the capital of Texas?", "Write a 1,000-word blog post about fasting."]
+print(f"Batched token counts: {count_tokens_batch(texts)}")
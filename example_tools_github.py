@@ -4,8 +4,8 @@ load_dotenv()
 
 from langchain.agents import AgentType, initialize_agent
 from langchain_ollama import ChatOllama
-from langchain_community.agent_toolkits.github.toolkit import GitHubToolkit
-from langchain_community.utilities.github import GitHubAPIWrapper
+
+from github_client import get_github_tools
 
 # Set your environment variables using os.environ
 # os.environ["GITHUB_APP_ID"] = "1171958"
@@ -17,9 +17,8 @@ from langchain_community.utilities.github import GitHubAPIWrapper
 # os.environ["GITHUB_BASE_BRANCH"] = "main"
 
 llm = ChatOllama(model="phi4", temperature=0.5)
-github = GitHubAPIWrapper()
-toolkit = GitHubToolkit.from_github_api_wrapper(github)
-tools = toolkit.get_tools()
+# One authenticated client per process, with an ETag cache and rate-limit pacing
+tools = get_github_tools()
 
 # STRUCTURED_CHAT includes args_schema for each tool, helps tool args parsing errors.
 agent = initialize_agent(
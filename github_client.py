@@ -0,0 +1,341 @@
+"""Long-lived GitHub client with an ETag response cache and rate-limit pacing.
+
+`get_github_tools()` in the agent examples built a new `GitHubAPIWrapper` on
+every tool call, which authenticates the GitHub App again (JWT, installation
+lookup, installation token) and re-downloads everything it reads, each
+request costing rate-limit quota. This module keeps one wrapper per process
+(`get_github_api_wrapper()`, `get_github_tools()`; PyGithub renews the
+installation token on its own) and plugs into PyGithub's HTTP layer:
+
+- GET responses with an `ETag` / `Last-Modified` are stored in SQLite; later
+  GETs of the same URL send `If-None-Match` / `If-Modified-Since`, and a
+  `304 Not Modified` (which GitHub does not count against the rate limit) is
+  answered from the cache,
+- `X-RateLimit-Remaining` / `-Reset` / `-Resource` are tracked per resource
+  (core, search, graphql, ...); when a bucket runs low, requests are spread
+  evenly over the time left until the reset, and when it is empty they wait
+  for the reset instead of failing,
+- a secondary rate limit (403/429 with `Retry-After`) blocks further requests
+  for that long, and the GET that hit it is retried once.
+
+The cache is shared by all connections of the process, and the connections
+can be used from several threads at once (PyGithub's own cannot), so
+`install()` it before creating `Github` / `GithubIntegration` objects. For tests, point
+`Github(base_url="http://127.0.0.1:PORT")` at a fake API server (see
+benchmark_github_client.py).
+
+    tools = get_github_tools()
+    print(github_stats())
+"""
+import email.utils
+import functools
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from github.Requester import (
+    HTTPRequestsConnectionClass,
+    HTTPSRequestsConnectionClass,
+    Requester,
+)
+
+logger = logging.getLogger(__name__)
+
+# Git blobs are addressed by their SHA and never change; repo_mirror keeps them.
+UNCACHED_PATHS = ("/git/blobs/",)
+
+# Response headers that belong to the request, not the cached representation.
+FRESH_HEADERS = ("date", "x-ratelimit-limit", "x-ratelimit-remaining", "x-ratelimit-reset",
+                 "x-ratelimit-used", "x-ratelimit-resource", "x-github-request-id")
+
+
+@dataclass
+class GitHubClientStats:
+    requests: int = 0
+    not_modified: int = 0  # 304s answered from the cache
+    stored: int = 0
+    paced: int = 0  # requests delayed to spread the remaining quota
+    waited_for_reset: int = 0
+    secondary_limits: int = 0
+    seconds_waited: float = 0.0
+
+    @property
+    def quota_saved(self) -> int:
+        return self.not_modified
+
+
+class GitHubHTTPCache:
+    """SQLite store of GET responses with their validators, least recently used evicted."""
+
+    def __init__(self, path: str = ".github_cache.sqlite", max_entries: int = 5000, namespace: str = ""):
+        self.max_entries = max_entries
+        self.namespace = namespace  # e.g. the app / installation, so identities don't share entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS github_cache ("
+            "key TEXT PRIMARY KEY, url TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+            "headers TEXT NOT NULL, body TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS github_cache_last_access ON github_cache (last_access)")
+        self._conn.commit()
+
+    def key(self, url: str, headers: Dict[str, str]) -> str:
+        # The representation depends on Accept (e.g. raw vs. JSON file contents).
+        raw = "\x1f".join([self.namespace, url, headers.get("Accept", "")])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[Optional[str], Optional[str], Dict[str, str], str]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, headers, body FROM github_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE github_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        etag, last_modified, headers, body = row
+        return etag, last_modified, json.loads(headers), body
+
+    def put(self, key: str, url: str, etag: Optional[str], last_modified: Optional[str], headers: Dict[str, str], body: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO github_cache (key, url, etag, last_modified, headers, body, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, json.dumps(headers), body, time.time()),
+            )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM github_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM github_cache WHERE key IN "
+                    "(SELECT key FROM github_cache ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM github_cache")
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+class RateLimitScheduler:
+    """Tracks GitHub's rate-limit headers and decides how long the next request must wait."""
+
+    def __init__(self, reserve: int = 0, pace_below: int = 100, clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.reserve = reserve  # requests kept back, e.g. for another process on the same token
+        self.pace_below = pace_below  # start spreading requests when fewer than this remain
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = GitHubClientStats()
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[int, float]] = {}  # resource -> (remaining, reset epoch)
+        self._blocked_until = 0.0
+
+    @staticmethod
+    def resource_for(url: str) -> str:
+        path = url.split("?", 1)[0]
+        if "/search/" in path:
+            return "code_search" if path.rstrip("/").endswith("/search/code") else "search"
+        if path.rstrip("/").endswith("/graphql"):
+            return "graphql"
+        return "core"
+
+    def delay(self, resource: str) -> Tuple[float, str]:
+        """Seconds to wait before a request to `resource`, and why."""
+        with self._lock:
+            now = self.clock()
+            if self._blocked_until > now:
+                return self._blocked_until - now, "secondary"
+            remaining, reset = self._buckets.get(resource, (None, 0.0))
+            if remaining is None or reset <= now:
+                return 0.0, ""
+            usable = remaining - self.reserve
+            if usable <= 0:
+                return reset - now + 1.0, "reset"
+            if remaining < self.pace_below:
+                # The bucket count is decremented here, so concurrent callers
+                # are spread out too; the next response corrects it.
+                self._buckets[resource] = (remaining - 1, reset)
+                return (reset - now) / usable, "paced"
+            return 0.0, ""
+
+    def wait(self, resource: str):
+        seconds, reason = self.delay(resource)
+        if seconds <= 0:
+            return
+        if reason == "reset":
+            self.stats.waited_for_reset += 1
+            logger.warning("GitHub %s rate limit exhausted, waiting %.0fs for the reset", resource, seconds)
+        elif reason == "paced":
+            self.stats.paced += 1
+        self.stats.seconds_waited += seconds
+        self.sleep(seconds)
+
+    def update(self, status: int, headers: Dict[str, str], url: str) -> float:
+        """Record a response's rate-limit headers; returns the Retry-After to honor (0 if none)."""
+        with self._lock:
+            now = self.clock()
+            if "x-ratelimit-remaining" in headers and "x-ratelimit-reset" in headers:
+                resource = headers.get("x-ratelimit-resource") or self.resource_for(url)
+                self._buckets[resource] = (int(headers["x-ratelimit-remaining"]), float(headers["x-ratelimit-reset"]))
+            if status in (403, 429) and "retry-after" in headers:
+                retry_after = _retry_after_seconds(headers["retry-after"], now)
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+                self.stats.secondary_limits += 1
+                return retry_after
+        return 0.0
+
+    def remaining(self, resource: str = "core") -> Optional[int]:
+        with self._lock:
+            return self._buckets.get(resource, (None, 0.0))[0]
+
+
+def _retry_after_seconds(value: str, now: float) -> float:
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - now)
+
+
+class _CachedResponse:
+    """A cached body replayed as a 200 response, in the shape PyGithub reads."""
+
+    status = 200
+
+    def __init__(self, headers: Dict[str, str], body: str):
+        self.headers = headers
+        self._body = body
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self._body
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+def _per_thread(name: str) -> property:
+    return property(lambda self: getattr(self._local, name), lambda self, value: setattr(self._local, name, value))
+
+
+class _CachingConnectionMixin:
+    cache: Optional[GitHubHTTPCache] = None
+    scheduler: Optional[RateLimitScheduler] = None
+
+    # A Requester shares one connection object between threads, and request()
+    # stores the call on it for getresponse(); keep that state per thread so
+    # the process-wide client can be used from worker pools.
+    verb = _per_thread("verb")
+    url = _per_thread("url")
+    input = _per_thread("input")
+    headers = _per_thread("headers")
+    stream = _per_thread("stream")
+
+    def __init__(self, *args, **kwargs):
+        self._local = threading.local()
+        super().__init__(*args, **kwargs)
+
+    def getresponse(self):
+        scheduler = type(self).scheduler
+        cacheable = self.verb == "GET" and not self.stream and not any(p in self.url for p in UNCACHED_PATHS)
+        cache = type(self).cache if cacheable else None
+        key = cached = None
+        if cache is not None:
+            key = cache.key(self.url, self.headers)
+            cached = cache.get(key)
+            if cached is not None:
+                etag, last_modified, _, _ = cached
+                # PyGithub reuses the headers dict, so copy before adding validators
+                self.headers = dict(self.headers)
+                if etag:
+                    self.headers["If-None-Match"] = etag
+                if last_modified:
+                    self.headers["If-Modified-Since"] = last_modified
+
+        for attempt in range(2):
+            if scheduler is not None:
+                scheduler.wait(scheduler.resource_for(self.url))
+                scheduler.stats.requests += 1
+            response = super().getresponse()
+            headers = {k.lower(): v for k, v in response.getheaders()}
+            retry_after = scheduler.update(response.status, headers, self.url) if scheduler is not None else 0.0
+            if retry_after and self.verb == "GET" and attempt == 0:
+                continue
+            break
+
+        if response.status == 304 and cached is not None:
+            if scheduler is not None:
+                scheduler.stats.not_modified += 1
+            stored_headers = cached[2]
+            stored_headers.update({name: headers[name] for name in FRESH_HEADERS if name in headers})
+            return _CachedResponse(stored_headers, cached[3])
+        if cache is not None and response.status == 200:
+            etag, last_modified = headers.get("etag"), headers.get("last-modified")
+            if etag or last_modified:
+                cache.put(key, self.url, etag, last_modified, headers, response.read())
+                if scheduler is not None:
+                    scheduler.stats.stored += 1
+        return response
+
+
+class CachingHTTPConnection(_CachingConnectionMixin, HTTPRequestsConnectionClass):
+    pass
+
+
+class CachingHTTPSConnection(_CachingConnectionMixin, HTTPSRequestsConnectionClass):
+    pass
+
+
+def install(cache: Optional[GitHubHTTPCache] = None, scheduler: Optional[RateLimitScheduler] = None) -> RateLimitScheduler:
+    """Route PyGithub's requests in this process through the cache and scheduler."""
+    scheduler = scheduler or RateLimitScheduler()
+    _CachingConnectionMixin.cache = cache if cache is not None else GitHubHTTPCache()
+    _CachingConnectionMixin.scheduler = scheduler
+    # Requester.injectConnectionClasses would also turn off connection reuse
+    # (it is meant for test recorders), so set the classes directly.
+    Requester._Requester__httpConnectionClass = CachingHTTPConnection
+    Requester._Requester__httpsConnectionClass = CachingHTTPSConnection
+    return scheduler
+
+
+def github_stats() -> GitHubClientStats:
+    scheduler = _CachingConnectionMixin.scheduler
+    return scheduler.stats if scheduler is not None else GitHubClientStats()
+
+
+@functools.lru_cache(maxsize=None)
+def get_github_api_wrapper():
+    """The process-wide GitHubAPIWrapper (authenticates the GitHub App once).
+
+    File listings and reads are served from a local mirror of the repository
+    (see repo_mirror).
+    """
+    import os
+
+    from repo_mirror import MirroredGitHubAPIWrapper
+
+    if _CachingConnectionMixin.scheduler is None:
+        namespace = f"{os.getenv('GITHUB_APP_ID', '')}/{os.getenv('GITHUB_REPOSITORY', '')}"
+        install(GitHubHTTPCache(namespace=namespace))
+    return MirroredGitHubAPIWrapper()
+
+
+@functools.lru_cache(maxsize=None)
+def get_github_tools():
+    """GitHub toolkit tools bound to the process-wide wrapper."""
+    from langchain_community.agent_toolkits.github.toolkit import GitHubToolkit
+
+    return GitHubToolkit.from_github_api_wrapper(get_github_api_wrapper()).get_tools()
@@ -0,0 +1,88 @@
+"""Load generator for graph_server.py.
+
+Opens `--sessions` concurrent sessions, each with its own thread_id, and
+has every session send `--steps` step requests one after another (a user at
+the REPL). 503 answers are retried after their Retry-After delay and counted
+separately. Reports requests/s, latency percentiles of successful requests,
+and checks that every thread's count went up by exactly `--steps`.
+
+Usage:
+    python graph_server.py > /dev/null &
+    python graph_loadgen.py --sessions 1000 --steps 10
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass
+
+import aiohttp
+
+from batch_runner import BatchStats
+
+
+@dataclass
+class LoadStats(BatchStats):
+    retried: int = 0  # 503 answers
+    wrong_counts: int = 0
+
+    def report(self) -> str:
+        return (
+            f"{self.ok} ok, {self.errors} errors, {self.retried} retried (503) in {self.elapsed:.1f}s: "
+            f"{self.throughput:.0f} requests/s, latency p50 {self.percentile(50) * 1e3:.1f}ms "
+            f"p95 {self.percentile(95) * 1e3:.1f}ms p99 {self.percentile(99) * 1e3:.1f}ms, "
+            f"{self.wrong_counts} threads with a wrong final count"
+        )
+
+
+async def run_session(session: aiohttp.ClientSession, url: str, thread_id: str, steps: int, stats: LoadStats):
+    async with session.get(f"{url}/threads/{thread_id}") as response:
+        first = (await response.json())["values"].get("count", 0)
+    count = first
+    for _ in range(steps):
+        while True:
+            start = time.perf_counter()
+            try:
+                async with session.post(f"{url}/threads/{thread_id}/step") as response:
+                    if response.status == 503:
+                        stats.retried += 1
+                        await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+                        continue
+                    body = await response.json()
+                    response.raise_for_status()
+            except aiohttp.ClientError:
+                stats.errors += 1
+                break
+            stats.latencies.append(time.perf_counter() - start)
+            stats.ok += 1
+            count = body["count"]
+            break
+    if count != first + steps:
+        stats.wrong_counts += 1
+
+
+async def run_load(url: str, sessions: int, steps: int) -> LoadStats:
+    stats = LoadStats()
+    connector = aiohttp.TCPConnector(limit=sessions)
+    timeout = aiohttp.ClientTimeout(total=None)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        run = uuid.uuid4().hex[:8]
+        start = time.perf_counter()
+        await asyncio.gather(*(run_session(session, url, f"load-{run}-{i}", steps, stats) for i in range(sessions)))
+        stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=10, help="requests per session")
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions x {args.steps} steps against {args.url}")
+    print(asyncio.run(run_load(args.url.rstrip("/"), args.sessions, args.steps)).report())
+
+
+if __name__ == "__main__":
+    main()
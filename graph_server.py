@@ -0,0 +1,217 @@
+"""HTTP service that runs one compiled graph for many concurrent threads.
+
+Serves the counter graph from example_simple_graph_with_db.py. Every
+request is one REPL step of a thread: read the thread's count, invoke the
+graph with it, return the result.
+
+- one compiled graph and one checkpoint store connection are shared by all
+  threads (`AsyncBatchedSqliteSaver`: SQLite has a single writer, so one
+  connection with group commits beats a pool of connections that queue on
+  the database lock),
+- requests for the same `thread_id` run one at a time, in arrival order;
+  different threads run concurrently,
+- requests wait in a bounded queue served by `--workers` tasks; when the
+  queue is full the server answers 503 with Retry-After instead of piling
+  up work,
+- on SIGINT/SIGTERM it stops accepting requests, finishes the queued ones
+  (up to `--drain-timeout` seconds) and commits pending checkpoints.
+
+Endpoints:
+    POST /threads/{thread_id}/step   run one step, returns {"thread_id", "count"}
+    GET  /threads/{thread_id}        latest state of the thread
+    GET  /stats                      queue depth and request counters
+
+Usage:
+    python graph_server.py --port 8080 --workers 64 --queue-size 1024 > /dev/null
+    python graph_loadgen.py --url http://127.0.0.1:8080 --sessions 1000
+"""
+import argparse
+import asyncio
+import logging
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+
+from checkpoint_store import AsyncBatchedSqliteSaver
+from example_simple_graph_with_db import graphBuilder
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ServerStats:
+    accepted: int = 0
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0  # queue full or draining
+    queued: int = 0
+    active_threads: int = 0
+
+
+@dataclass
+class _Job:
+    thread_id: str
+    future: asyncio.Future
+
+
+class ThreadLocks:
+    """One asyncio.Lock per thread_id, dropped again once nobody holds or waits for it."""
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._users: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    async def acquire(self, thread_id: str):
+        lock = self._locks.setdefault(thread_id, asyncio.Lock())
+        self._users[thread_id] = self._users.get(thread_id, 0) + 1
+        try:
+            await lock.acquire()
+        except BaseException:
+            self._forget(thread_id)
+            raise
+
+    def release(self, thread_id: str):
+        self._locks[thread_id].release()
+        self._forget(thread_id)
+
+    def _forget(self, thread_id: str):
+        self._users[thread_id] -= 1
+        if not self._users[thread_id]:
+            del self._users[thread_id]
+            del self._locks[thread_id]
+
+
+class GraphServer:
+    def __init__(self, graph, saver: AsyncBatchedSqliteSaver, *, workers: int = 64, queue_size: int = 1024,
+                 drain_timeout: float = 30.0):
+        self.graph = graph
+        self.saver = saver
+        self.workers = workers
+        self.drain_timeout = drain_timeout
+        self.stats = ServerStats()
+        self._queue: "asyncio.Queue[_Job]" = asyncio.Queue(maxsize=queue_size)
+        self._locks = ThreadLocks()
+        self._tasks = []
+        self._draining = False
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/threads/{thread_id}/step", self.handle_step)
+        app.router.add_get("/threads/{thread_id}", self.handle_state)
+        app.router.add_get("/stats", self.handle_stats)
+        app.on_startup.append(self._start)
+        app.on_shutdown.append(self._drain)
+        app.on_cleanup.append(self._stop)
+        return app
+
+    async def step(self, thread_id: str) -> Dict[str, Any]:
+        """One REPL step of example_simple_graph_with_db.py for `thread_id`."""
+        config = {"configurable": {"thread_id": thread_id}}
+        state = await self.graph.aget_state(config)
+        return await self.graph.ainvoke({"count": state.values.get("count", 0)}, config)
+
+    async def handle_step(self, request: web.Request) -> web.Response:
+        if self._draining:
+            return self._reject("draining")
+        job = _Job(request.match_info["thread_id"], asyncio.get_running_loop().create_future())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            return self._reject("queue full")
+        self.stats.accepted += 1
+        try:
+            result = await asyncio.shield(job.future)
+        except Exception as e:
+            return web.json_response({"error": str(e)}, status=500)
+        return web.json_response({"thread_id": job.thread_id, **result})
+
+    async def handle_state(self, request: web.Request) -> web.Response:
+        config = {"configurable": {"thread_id": request.match_info["thread_id"]}}
+        state = await self.graph.aget_state(config)
+        return web.json_response({"values": state.values, "checkpoint_id": (state.config or {}).get("configurable", {}).get("checkpoint_id")})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        self.stats.queued = self._queue.qsize()
+        self.stats.active_threads = len(self._locks)
+        return web.json_response({**asdict(self.stats), "checkpoint_store": asdict(self.saver.stats)})
+
+    def _reject(self, reason: str) -> web.Response:
+        self.stats.rejected += 1
+        return web.json_response({"error": reason}, status=503, headers={"Retry-After": "1"})
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._locks.acquire(job.thread_id)
+                try:
+                    result = await self.step(job.thread_id)
+                finally:
+                    self._locks.release(job.thread_id)
+                self.stats.completed += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+            except Exception as e:
+                self.stats.failed += 1
+                logger.exception("Step failed for thread %s", job.thread_id)
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _start(self, app: web.Application):
+        await self.saver.setup()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _drain(self, app: web.Application):
+        self._draining = True
+        logger.info("Draining %d queued requests", self._queue.qsize())
+        try:
+            await asyncio.wait_for(self._queue.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Drain timed out with %d requests queued", self._queue.qsize())
+
+    async def _stop(self, app: web.Application):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            if not job.future.done():
+                job.future.set_exception(RuntimeError("server shut down"))
+        await self.saver.aclose()
+
+
+async def create_server(path: str = "checkpoints.sqlite", keep_last: Optional[int] = 20, **kwargs) -> GraphServer:
+    saver = await AsyncBatchedSqliteSaver.from_path(path, keep_last=keep_last)
+    return GraphServer(graphBuilder.compile(checkpointer=saver), saver, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", default="checkpoints.sqlite")
+    parser.add_argument("--keep-last", type=int, default=20, help="checkpoints kept per thread")
+    parser.add_argument("--workers", type=int, default=64, help="graph steps running at the same time")
+    parser.add_argument("--queue-size", type=int, default=1024, help="requests waiting before 503s")
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    parser.add_argument("--access-log", action="store_true", help="log every request")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def make_app():
+        server = await create_server(args.db, args.keep_last, workers=args.workers, queue_size=args.queue_size,
+                                     drain_timeout=args.drain_timeout)
+        return server.app()
+
+    web.run_app(make_app(), host=args.host, port=args.port, shutdown_timeout=args.drain_timeout,
+                access_log=web.access_logger if args.access_log else None)
+
+
+if __name__ == "__main__":
+    main()
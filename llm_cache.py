@@ -0,0 +1,188 @@
+"""Two-tier response cache for deterministic (temperature 0) chat model calls.
+
+`fact_check_model` (phi4, temperature 0.0) and the llama3.2 SQL chain give
+the same answer for the same prompt, so repeating the call only burns
+inference time. `TieredLLMCache` is a LangChain `BaseCache`:
+
+- entries are keyed on the model, its sampling parameters and the
+  serialized messages,
+- an in-process LRU tier answers hot prompts without touching disk, and a
+  SQLite tier keeps answers across runs,
+- calls whose temperature is not 0 are never cached unless
+  `cache_nondeterministic=True`,
+- hits are marked with `response_metadata["cache_hit"]` ("memory" or
+  "sqlite"), so they show up in tracing output (e.g. LangSmith) and logs.
+
+Caching is opt-in per model instance, which makes it opt-in per node:
+
+    llm_cache = TieredLLMCache(".llm_cache.sqlite")
+    fact_check_model = llm_cache.enable(ChatOllama(model="phi4:latest", temperature=0.0))
+
+`enable` is needed because LangChain's own `llm_string` for ChatOllama does
+not include the model name or temperature.
+"""
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import ChatGeneration
+
+logger = logging.getLogger(__name__)
+
+# Model fields that do not change what the model generates.
+_NON_GENERATION_FIELDS = {"name", "disable_streaming", "keep_alive", "client_kwargs"}
+
+# Matches the temperature in both llm_string formats LangChain produces:
+# "('temperature', 0.0)" (param repr) and '"temperature": 0.0' (serialized JSON).
+_TEMPERATURE = re.compile(r"""['"]temperature['"]\s*[,:]\s*([-+0-9.eE]+|None|null)""")
+
+
+def is_deterministic(llm_string: str) -> bool:
+    """True if the model call was made with temperature 0."""
+    match = _TEMPERATURE.search(llm_string)
+    if match is None or match.group(1) in ("None", "null"):
+        return False  # Ollama's default temperature is not 0
+    return float(match.group(1)) == 0.0
+
+
+@dataclass
+class LLMCacheStats:
+    memory_hits: int = 0
+    sqlite_hits: int = 0
+    misses: int = 0
+    skipped: int = 0  # lookups not attempted because the call is not deterministic
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.sqlite_hits
+
+
+class TieredLLMCache(BaseCache):
+    """In-process LRU in front of a SQLite table of LLM generations."""
+
+    def __init__(
+        self,
+        path: str = ".llm_cache.sqlite",
+        max_memory_entries: int = 1024,
+        cache_nondeterministic: bool = False,
+    ):
+        self.max_memory_entries = max_memory_entries
+        self.cache_nondeterministic = cache_nondeterministic
+        self.stats = LLMCacheStats()
+        self._memory: "OrderedDict[str, RETURN_VAL_TYPE]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, llm_string TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def _cacheable(self, llm_string: str) -> bool:
+        return self.cache_nondeterministic or is_deterministic(llm_string)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if not self._cacheable(llm_string):
+            with self._lock:
+                self.stats.skipped += 1
+            return None
+        return self._get(self.make_key(prompt, llm_string))
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self._cacheable(llm_string):
+            self._put(self.make_key(prompt, llm_string), llm_string, return_val)
+
+    def enable(self, model, force: bool = False):
+        """Return a copy of `model` that uses this cache.
+
+        Models sampled with a nonzero temperature are returned unchanged
+        unless `force=True`.
+        """
+        params = {k: v for k, v in model.model_dump().items() if k not in _NON_GENERATION_FIELDS}
+        if not force and params.get("temperature") != 0:
+            logger.info("Not caching %s: temperature is %s", params.get("model"), params.get("temperature"))
+            return model
+        model_string = json.dumps({"class": type(model).__name__, **params}, sort_keys=True, default=str)
+        return model.model_copy(update={"cache": _ModelCache(self, model_string)})
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def _get(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                tier = "memory"
+            else:
+                row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.stats.misses += 1
+                    return None
+                value = loads(row[0])
+                self._remember(key, value)
+                self.stats.sqlite_hits += 1
+                tier = "sqlite"
+        logger.debug("LLM cache hit (%s) for key %s", tier, key[:12])
+        return [_mark_hit(generation, tier) for generation in value]
+
+    def _put(self, key: str, llm_string: str, value: RETURN_VAL_TYPE):
+        with self._lock:
+            self._remember(key, value)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, llm_string, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, llm_string, dumps(value), time.time()),
+            )
+            self._conn.commit()
+
+    def _remember(self, key: str, value: RETURN_VAL_TYPE):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+
+class _ModelCache(BaseCache):
+    """View of a TieredLLMCache bound to one model's parameters."""
+
+    def __init__(self, cache: TieredLLMCache, model_string: str):
+        self.cache = cache
+        self.model_string = model_string
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self.cache._get(self.cache.make_key(prompt, f"{self.model_string}---{llm_string}"))
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        llm_string = f"{self.model_string}---{llm_string}"
+        self.cache._put(self.cache.make_key(prompt, llm_string), llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear()
+
+
+def _mark_hit(generation, tier: str):
+    """Copy of a cached generation tagged with the tier it came from."""
+    info = {**(generation.generation_info or {}), "cache_hit": tier}
+    if isinstance(generation, ChatGeneration):
+        message = generation.message.model_copy(
+            update={"response_metadata": {**generation.message.response_metadata, "cache_hit": tier}}
+        )
+        return ChatGeneration(message=message, generation_info=info)
+    return generation.model_copy(update={"generation_info": info})
@@ -0,0 +1,104 @@
+"""Append-only message history with structural sharing.
+
+Graph nodes used to return `messages + [new_message]`, copying the whole
+history on every step. With `MessageLog` as the `messages` channel and
+`append_messages` as its reducer, a node returns only the new message(s):
+
+    class State(TypedDict):
+        messages: Annotated[MessageLog, append_messages]
+
+    def node(state):
+        return {"messages": [AIMessage(content="...")]}
+
+Every `MessageLog` is an immutable view (`length` items) over a backing
+list shared with its ancestors. Appending to the newest view extends the
+shared list in place, so a step costs O(1) time and memory; appending to an
+older view (a branch) copies its prefix first, so earlier views never change.
+"""
+import threading
+from collections.abc import Sequence
+from typing import Iterable, Iterator, List, Union
+
+from langchain_core.messages import BaseMessage
+
+_append_lock = threading.Lock()
+
+
+class MessageLog(Sequence):
+    __slots__ = ("_items", "_length")
+
+    def __init__(self, messages: Iterable[BaseMessage] = ()):
+        self._items: List[BaseMessage] = list(messages)
+        self._length = len(self._items)
+
+    @classmethod
+    def _view(cls, items: List[BaseMessage], length: int) -> "MessageLog":
+        log = cls.__new__(cls)
+        log._items = items
+        log._length = length
+        return log
+
+    def append(self, message: BaseMessage) -> "MessageLog":
+        return self.extend([message])
+
+    def extend(self, messages: Iterable[BaseMessage]) -> "MessageLog":
+        """Return a new log with `messages` appended; this log is left unchanged."""
+        messages = list(messages)
+        if not messages:
+            return self
+        with _append_lock:
+            if len(self._items) == self._length:
+                # Newest view of the backing list: extend it in place.
+                items = self._items
+            else:
+                # Someone already appended past this view; branch off a copy.
+                items = self._items[: self._length]
+            items.extend(messages)
+            return self._view(items, len(items))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._items[: self._length][index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("MessageLog index out of range")
+        return self._items[index]
+
+    def __iter__(self) -> Iterator[BaseMessage]:
+        for i in range(self._length):
+            yield self._items[i]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (MessageLog, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"MessageLog({list(self)!r})"
+
+    def to_list(self) -> List[BaseMessage]:
+        """Copy the visible messages into a plain list (e.g. for `MessagesPlaceholder`)."""
+        return self._items[: self._length]
+
+    def _asdict(self) -> dict:
+        # LangGraph's JsonPlusSerializer encodes objects with `_asdict` as
+        # constructor kwargs, so checkpoints restore a MessageLog.
+        return {"messages": self.to_list()}
+
+
+def append_messages(
+    left: Union[MessageLog, List[BaseMessage], None],
+    right: Union[BaseMessage, Iterable[BaseMessage], None],
+) -> MessageLog:
+    """Channel reducer: append the messages a node returned to the log."""
+    if not isinstance(left, MessageLog):
+        left = MessageLog(left or ())
+    if right is None:
+        return left
+    if isinstance(right, BaseMessage):
+        return left.append(right)
+    return left.extend(right)
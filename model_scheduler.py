@@ -0,0 +1,290 @@
+"""Group chat model calls by Ollama model so a shared host swaps models less often.
+
+The content graph alternates between llama3.2 (generation) and phi4 (fact
+check). One run at a time, that is one swap per step; with many runs
+sharing a host whose memory holds one model, Ollama serves requests in
+arrival order and reloads a model (seconds each time) whenever the next
+request wants the other one. `ModelScheduler.manage()` wraps a `ChatOllama`
+in a `ScheduledChatModel`, which holds each request until its model's turn:
+
+- requests wait in one FIFO queue per model; the active model (up to
+  `max_loaded` of them, matching `OLLAMA_MAX_LOADED_MODELS`) is served with
+  at most `parallel` calls in flight (`OLLAMA_NUM_PARALLEL`),
+- when the active model has nothing queued and its calls have finished,
+  the model whose oldest request has waited longest takes over,
+- fairness bound: once another model's oldest request has waited
+  `max_wait` seconds, or the active model has served `max_batch` requests
+  this turn while others wait, the active model stops admitting new calls
+  and hands over as soon as its running calls finish,
+- the wrapper waits inside the model call, after the LLM cache lookup, so
+  cache hits are answered right away instead of queueing for a turn (the
+  wrapped model's cache moves to the wrapper),
+- `manage(llm)` also sets `keep_alive`, so a model that is idle between
+  turns is not unloaded by Ollama's 5 minute default; `warm_up()` loads
+  models at process start and `unload()` frees them.
+
+Sync and async callers share one scheduler (threading lock; both poll).
+
+    model_scheduler = ModelScheduler(parallel=4, max_wait=10.0)
+    generation_model = model_scheduler.manage(ChatOllama(model="llama3.2:latest"))
+    model_scheduler.warm_up(["llama3.2:latest"])
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from langchain_core.caches import BaseCache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+
+@dataclass
+class ModelSchedulerStats:
+    requests: int = 0
+    turns: int = 0  # times a model became the active one
+    loads: int = 0  # turns of a model that was not among the last `max_loaded` active ones
+    waited_seconds: float = 0.0
+    max_waited: float = 0.0
+    requests_per_model: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def mean_wait(self) -> float:
+        return self.waited_seconds / self.requests if self.requests else 0.0
+
+
+@dataclass
+class _Ticket:
+    model: str
+    enqueued: float
+    seq: int
+
+
+@dataclass
+class _Turn:
+    inflight: int = 0
+    served: int = 0
+    draining: bool = False
+
+
+class ModelScheduler:
+    """Admits chat model calls in per-model batches."""
+
+    def __init__(self, parallel: Union[int, Dict[str, int]] = 4, max_loaded: int = 1, max_wait: float = 10.0,
+                 max_batch: int = 64, keep_alive: Union[str, float] = "30m", poll_interval: float = 0.01,
+                 clock: Callable[[], float] = time.monotonic):
+        self.parallel = parallel
+        self.max_loaded = max_loaded
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.keep_alive = keep_alive
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.stats = ModelSchedulerStats()
+        # Threading lock, because sync graph nodes call their models on
+        # worker threads with event loops of their own.
+        self._lock = threading.Lock()
+        self._seq = count()
+        self._queues: Dict[str, List[_Ticket]] = {}
+        self._active: "OrderedDict[str, _Turn]" = OrderedDict()
+        self._resident: List[str] = []  # most recently active last
+        self._hosts: Dict[str, Optional[str]] = {}
+
+    def manage(self, llm) -> "ScheduledChatModel":
+        """Route `llm`'s requests through the scheduler and keep its model loaded between turns."""
+        if getattr(llm, "keep_alive", None) is None:
+            llm.keep_alive = self.keep_alive
+        self._hosts[llm.model] = llm.base_url
+        # The wrapper looks up the cache before waiting for a turn; `llm` must not look again.
+        return ScheduledChatModel(llm=llm.model_copy(update={"cache": False}), scheduler=self, cache=llm.cache)
+
+    def acquire(self, model: str):
+        """Block until `model` may send a request; pair with `release(model)`."""
+        ticket = self._enqueue(model)
+        try:
+            while not self._try_admit(ticket):
+                time.sleep(self.poll_interval)
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+
+    async def aacquire(self, model: str):
+        ticket = self._enqueue(model)
+        try:
+            while not self._try_admit(ticket):
+                await asyncio.sleep(self.poll_interval)
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+
+    def release(self, model: str):
+        with self._lock:
+            turn = self._active.get(model)
+            if turn is not None:
+                turn.inflight -= 1
+
+    def _enqueue(self, model: str) -> _Ticket:
+        with self._lock:
+            ticket = _Ticket(model, self.clock(), next(self._seq))
+            self._queues.setdefault(model, []).append(ticket)
+            return ticket
+
+    def _dequeue(self, ticket: _Ticket):
+        with self._lock:
+            if ticket in self._queues[ticket.model]:
+                self._queues[ticket.model].remove(ticket)
+
+    def _slots(self, model: str) -> int:
+        return self.parallel.get(model, 1) if isinstance(self.parallel, dict) else self.parallel
+
+    def _try_admit(self, ticket: _Ticket) -> bool:
+        with self._lock:
+            now = self.clock()
+            self._schedule(now)
+            turn = self._active.get(ticket.model)
+            if turn is None or turn.draining:
+                return False
+            queue = self._queues[ticket.model]
+            # FIFO within a model: only the first `free` waiters may go.
+            if queue.index(ticket) >= self._slots(ticket.model) - turn.inflight:
+                return False
+            queue.remove(ticket)
+            turn.inflight += 1
+            turn.served += 1
+            waited = now - ticket.enqueued
+            stats = self.stats
+            stats.requests += 1
+            stats.waited_seconds += waited
+            stats.max_waited = max(stats.max_waited, waited)
+            stats.requests_per_model[ticket.model] = stats.requests_per_model.get(ticket.model, 0) + 1
+            return True
+
+    def _schedule(self, now: float):
+        """Retire finished turns, start new ones, and apply the fairness bound (lock held)."""
+        waiting = {model: queue[0].enqueued for model, queue in self._queues.items() if queue}
+        handed_over = set()
+        for model, turn in list(self._active.items()):
+            if turn.inflight == 0 and (model not in waiting or turn.draining):
+                del self._active[model]
+                if turn.draining:
+                    handed_over.add(model)
+        others = {model: since for model, since in waiting.items() if model not in self._active}
+
+        while len(self._active) < self.max_loaded and others:
+            # A model that just had to hand over goes after everyone else.
+            model = min(others, key=lambda m: (m in handed_over, others[m]))
+            del others[model]
+            self._active[model] = _Turn()
+            self.stats.turns += 1
+            if model in self._resident:
+                self._resident.remove(model)
+            else:
+                self.stats.loads += 1
+            self._resident.append(model)
+            del self._resident[: -self.max_loaded]
+
+        if others:
+            overdue = now - min(others.values()) >= self.max_wait
+            for turn in self._active.values():
+                if overdue or turn.served >= self.max_batch:
+                    turn.draining = True
+
+    def _generate_empty(self, models: Optional[List[str]], keep_alive: Union[str, float]):
+        """An empty generate request loads (or, with keep_alive=0, unloads) a model."""
+        from ollama import Client
+
+        for model in models if models is not None else list(self._hosts):
+            Client(host=self._hosts.get(model)).generate(model=model, keep_alive=keep_alive)
+
+    def warm_up(self, models: Optional[List[str]] = None):
+        """Load `models` (default: all managed ones, in order) so the first call does not pay for it.
+
+        On a host that holds one model, only the last one stays loaded, so
+        pass the model the workload starts with.
+        """
+        self._generate_empty(models, self.keep_alive)
+        with self._lock:
+            for model in models if models is not None else list(self._hosts):
+                if model not in self._resident:
+                    self._resident.append(model)
+            del self._resident[: -self.max_loaded]
+
+    async def awarm_up(self, models: Optional[List[str]] = None):
+        await asyncio.to_thread(self.warm_up, models)
+
+    def unload(self, models: Optional[List[str]] = None):
+        """Ask Ollama to unload `models` now (keep_alive=0)."""
+        self._generate_empty(models, 0)
+        with self._lock:
+            self._resident = [m for m in self._resident if models is not None and m not in models]
+
+
+class ScheduledChatModel(BaseChatModel):
+    """Chat model whose requests to `llm` wait for their model's turn in a `ModelScheduler`.
+
+    Caching happens here, before the wait; callbacks see one run per call.
+    """
+
+    llm: BaseChatModel
+    scheduler: ModelScheduler
+    cache: Union[BaseCache, bool, None] = Field(default=None, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return self.llm._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.llm._identifying_params
+
+    @property
+    def model(self) -> str:
+        return self.llm.model
+
+    def _get_ls_params(self, stop: Optional[List[str]] = None, **kwargs: Any):
+        return self.llm._get_ls_params(stop=stop, **kwargs)
+
+    def _get_llm_string(self, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        # Same cache keys as the unwrapped model.
+        return self.llm._get_llm_string(stop=stop, **kwargs)
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(**self.llm.bind_tools(tools, **kwargs).kwargs)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                  **kwargs: Any) -> ChatResult:
+        self.scheduler.acquire(self.model)
+        try:
+            return self.llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        finally:
+            self.scheduler.release(self.model)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs: Any) -> ChatResult:
+        await self.scheduler.aacquire(self.model)
+        try:
+            return await self.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        finally:
+            self.scheduler.release(self.model)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self.scheduler.acquire(self.model)
+        try:
+            yield from self.llm._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        finally:
+            self.scheduler.release(self.model)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await self.scheduler.aacquire(self.model)
+        try:
+            async for chunk in self.llm._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+        finally:
+            self.scheduler.release(self.model)
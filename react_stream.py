@@ -0,0 +1,153 @@
+"""Incremental parser for the Thought / Action / Action Input ReAct protocol.
+
+`call_agent` asks the model to answer in this format:
+
+    Thought: Do I need to use a tool? Yes
+    Action: <tool_name>
+    Action Input: <tool_input>
+
+or
+
+    Thought: Do I need to use a tool? No
+    Final Answer: <your answer>
+
+Waiting for the full completion wastes the tokens a model tends to write
+after the tool call (made-up observations, more thoughts). `stream_react`
+parses chunks as they arrive and returns as soon as the `Action Input` line
+is complete; leaving the stream early closes the HTTP response, which makes
+Ollama stop generating. `astream_react` does the same for async nodes.
+"""
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+THOUGHT = "Thought:"
+ACTION = "Action:"
+ACTION_INPUT = "Action Input:"
+FINAL_ANSWER = "Final Answer:"
+
+
+@dataclass
+class AgentDecision:
+    """What the agent decided, plus the raw text generated before parsing stopped."""
+
+    text: str
+    needs_tool: Optional[bool] = None
+    tool_name: Optional[str] = None
+    tool_input: Optional[str] = None
+    tool_args: Optional[Dict[str, Any]] = None  # validated arguments of a structured tool call
+    final_answer: Optional[str] = None
+    stopped_early: bool = False
+
+    @property
+    def is_tool_call(self) -> bool:
+        return self.tool_name is not None and self.tool_input is not None
+
+    @property
+    def is_final_answer(self) -> bool:
+        return self.final_answer is not None
+
+
+class ReActStreamParser:
+    """Feed text chunks in; `feed` returns a decision once a tool call is complete."""
+
+    def __init__(self):
+        self._text = []
+        self._line = ""
+        self._awaiting_input = False  # saw "Action Input:" with nothing after it yet
+        self._final_lines = None
+        self.decision = AgentDecision(text="")
+
+    def feed(self, chunk: str) -> Optional[AgentDecision]:
+        self._text.append(chunk)
+        self._line += chunk
+        while "\n" in self._line:
+            line, self._line = self._line.split("\n", 1)
+            if self._parse_line(line):
+                return self._finish(stopped_early=True)
+        return None
+
+    def close(self) -> AgentDecision:
+        """Flush the last partial line at the end of the stream."""
+        if self._line:
+            line, self._line = self._line, ""
+            if self._parse_line(line):
+                return self._finish(stopped_early=False)
+        if self._final_lines is not None:
+            self.decision.final_answer = "\n".join(self._final_lines).strip().strip("`").strip()
+        return self._finish(stopped_early=False)
+
+    def _finish(self, stopped_early: bool) -> AgentDecision:
+        self.decision.text = "".join(self._text)
+        self.decision.stopped_early = stopped_early
+        return self.decision
+
+    def _parse_line(self, line: str) -> bool:
+        """Consume one complete line; return True once the tool call is complete."""
+        if self._final_lines is not None:
+            self._final_lines.append(line)
+            return False
+
+        stripped = line.strip()
+        if self._awaiting_input:
+            if not stripped or stripped.startswith("```"):
+                return False
+            self.decision.tool_input = stripped
+            return self.decision.tool_name is not None
+
+        if stripped.startswith(THOUGHT):
+            thought = stripped[len(THOUGHT):].lower()
+            if "yes" in thought:
+                self.decision.needs_tool = True
+            elif "no" in thought:
+                self.decision.needs_tool = False
+        elif stripped.startswith(ACTION_INPUT):
+            tool_input = stripped[len(ACTION_INPUT):].strip()
+            if not tool_input:
+                self._awaiting_input = True
+                return False
+            self.decision.tool_input = tool_input
+            return self.decision.tool_name is not None
+        elif stripped.startswith(ACTION):
+            self.decision.tool_name = stripped[len(ACTION):].strip()
+        elif stripped.startswith(FINAL_ANSWER):
+            self._final_lines = [stripped[len(FINAL_ANSWER):]]
+        return False
+
+
+def stream_react(chain, inputs: Dict[str, Any], stream: bool = True, config: Optional[Dict] = None) -> AgentDecision:
+    """Run the agent chain and parse its ReAct output.
+
+    With `stream=True` generation is cancelled as soon as the tool call is
+    complete; with `stream=False` the full completion is parsed instead.
+    """
+    parser = ReActStreamParser()
+    if not stream:
+        decision = parser.feed(chain.invoke(inputs, config=config).content) or parser.close()
+        decision.stopped_early = False
+        return decision
+
+    for chunk in chain.stream(inputs, config=config):
+        decision = parser.feed(chunk.content)
+        if decision is not None:
+            # Leaving the loop closes the generator and the HTTP stream behind it.
+            return decision
+    return parser.close()
+
+
+async def astream_react(chain, inputs: Dict[str, Any], stream: bool = True, config: Optional[Dict] = None) -> AgentDecision:
+    """Async version of `stream_react`."""
+    parser = ReActStreamParser()
+    if not stream:
+        response = await chain.ainvoke(inputs, config=config)
+        decision = parser.feed(response.content) or parser.close()
+        decision.stopped_early = False
+        return decision
+
+    # aclosing() closes the stream right away instead of when it is garbage collected.
+    async with aclosing(chain.astream(inputs, config=config)) as chunks:
+        async for chunk in chunks:
+            decision = parser.feed(chunk.content)
+            if decision is not None:
+                return decision
+    return parser.close()
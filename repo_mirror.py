@@ -0,0 +1,272 @@
+"""Local mirror of a GitHub repository's files, synced by git tree SHA.
+
+The GitHub toolkit lists a branch by calling the contents API once per
+directory and reads every file with another contents call, on every run.
+`RepoMirror` keeps the files in SQLite instead:
+
+- a sync asks for the branch head (one request, a free `304` through
+  github_client's ETag cache while the branch has not moved) and stops there
+  if its tree SHA is the one already mirrored; within `refresh_interval`
+  seconds of the last check it does not ask at all,
+- otherwise it fetches the whole tree with one recursive git-trees call;
+  file listings are answered from the tree alone,
+- blobs are downloaded when a file is first read and stored by SHA (blobs
+  above `max_blob_bytes` are fetched on every read and not stored), so a
+  cold mirror costs two requests however large the repository is,
+- when a ref that was already mirrored moves, the new versions of the
+  changed files that had been read before are prefetched in parallel on a
+  bounded thread pool, so the files in use stay warm.
+
+Trees are stored per tree SHA and blobs per blob SHA, so branches share
+content and files that did not change are never downloaded again.
+`MirroredGitHubAPIWrapper` is a `GitHubAPIWrapper` whose listing and
+read-file tools use the mirror, and whose file writes expire it;
+`github_client.get_github_api_wrapper()` returns one.
+
+    mirror = RepoMirror(github.get_repo("owner/name"), workers=8)
+    mirror.list_files("main")
+    mirror.read("main", "README.md")
+"""
+import base64
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+from langchain_community.utilities.github import GitHubAPIWrapper
+from pydantic import model_validator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RepoMirrorStats:
+    syncs: int = 0
+    unchanged: int = 0  # syncs that found the mirrored tree SHA
+    trees_fetched: int = 0
+    blobs_fetched: int = 0
+    blobs_prefetched: int = 0  # new versions of read files fetched during a sync
+    bytes_fetched: int = 0
+    sync_seconds: float = 0.0
+
+
+class RepoMirror:
+    """Files of a PyGithub `Repository`, mirrored in SQLite and kept in sync by tree SHA."""
+
+    def __init__(self, repo: Any, path: str = ".repo_mirror.sqlite", workers: int = 8,
+                 max_blob_bytes: int = 1 << 20, refresh_interval: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.repo = repo
+        self.workers = workers
+        self.max_blob_bytes = max_blob_bytes
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.stats = RepoMirrorStats()
+        self._lock = threading.RLock()
+        self._checked: Dict[str, Tuple[float, str]] = {}  # ref -> (last check, tree SHA)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS mirror_refs (
+                repo TEXT NOT NULL, ref TEXT NOT NULL, tree_sha TEXT NOT NULL, synced_at REAL NOT NULL,
+                PRIMARY KEY (repo, ref));
+            CREATE TABLE IF NOT EXISTS mirror_trees (
+                tree_sha TEXT NOT NULL, path TEXT NOT NULL, blob_sha TEXT NOT NULL, size INTEGER NOT NULL,
+                PRIMARY KEY (tree_sha, path));
+            CREATE TABLE IF NOT EXISTS mirror_blobs (sha TEXT PRIMARY KEY, content BLOB NOT NULL);
+            """
+        )
+        self._conn.commit()
+
+    @property
+    def _name(self) -> str:
+        return self.repo.full_name
+
+    def sync(self, ref: str) -> str:
+        """Bring `ref` up to date; returns its tree SHA."""
+        with self._lock:
+            checked_at, tree_sha = self._checked.get(ref, (None, None))
+            if checked_at is not None and self.clock() - checked_at < self.refresh_interval:
+                return tree_sha
+            start = time.perf_counter()
+            self.stats.syncs += 1
+            tree_sha = self.repo.get_branch(ref).commit.commit.tree.sha
+            row = self._conn.execute(
+                "SELECT tree_sha FROM mirror_refs WHERE repo = ? AND ref = ?", (self._name, ref)
+            ).fetchone()
+            if row is not None and row[0] == tree_sha:
+                self.stats.unchanged += 1
+            else:
+                if not self._has_tree(tree_sha):
+                    self._store_tree(tree_sha, self._fetch_tree(tree_sha))
+                if row is not None:
+                    self._prefetch_changed(row[0], tree_sha)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO mirror_refs (repo, ref, tree_sha, synced_at) VALUES (?, ?, ?, ?)",
+                    (self._name, ref, tree_sha, time.time()),
+                )
+                self._prune()
+                self._conn.commit()
+            self._checked[ref] = (self.clock(), tree_sha)
+            self.stats.sync_seconds += time.perf_counter() - start
+            return tree_sha
+
+    def expire(self, ref: str):
+        """Check `ref` again on the next call (after writing to it)."""
+        with self._lock:
+            self._checked.pop(ref, None)
+
+    def list_files(self, ref: str, directory: str = "") -> List[str]:
+        tree_sha = self.sync(ref)
+        prefix = directory.strip("/")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM mirror_trees WHERE tree_sha = ? ORDER BY path", (tree_sha,)
+            ).fetchall()
+        return [path for (path,) in rows if not prefix or path.startswith(prefix + "/")]
+
+    def read(self, ref: str, path: str) -> bytes:
+        tree_sha = self.sync(ref)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT t.blob_sha, b.content FROM mirror_trees t LEFT JOIN mirror_blobs b ON b.sha = t.blob_sha "
+                "WHERE t.tree_sha = ? AND t.path = ?",
+                (tree_sha, path.strip("/")),
+            ).fetchone()
+        if row is None:
+            raise FileNotFoundError(path)
+        blob_sha, content = row
+        if content is None:
+            content = self._fetch_blob(blob_sha)[1]
+            self._count_fetched(content)
+            if len(content) <= self.max_blob_bytes:
+                with self._lock:
+                    self._conn.execute("INSERT OR REPLACE INTO mirror_blobs (sha, content) VALUES (?, ?)",
+                                       (blob_sha, content))
+                    self._conn.commit()
+        return content
+
+    def _has_tree(self, tree_sha: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM mirror_trees WHERE tree_sha = ? LIMIT 1", (tree_sha,)).fetchone() is not None
+
+    def _fetch_tree(self, tree_sha: str) -> List[Tuple[str, str, int]]:
+        """(path, blob SHA, size) of every file under the tree."""
+        self.stats.trees_fetched += 1
+        tree = self.repo.get_git_tree(tree_sha, recursive=True)
+        if tree.raw_data.get("truncated"):
+            # Over GitHub's limit for one recursive listing: walk it level by level.
+            logger.warning("Tree %s of %s is truncated, listing it per directory", tree_sha, self._name)
+            return self._walk_tree(tree_sha, "")
+        return [(e.path, e.sha, e.size or 0) for e in tree.tree if e.type == "blob"]
+
+    def _walk_tree(self, tree_sha: str, prefix: str) -> List[Tuple[str, str, int]]:
+        self.stats.trees_fetched += 1
+        files = []
+        for entry in self.repo.get_git_tree(tree_sha).tree:
+            path = f"{prefix}{entry.path}"
+            if entry.type == "tree":
+                files.extend(self._walk_tree(entry.sha, path + "/"))
+            elif entry.type == "blob":
+                files.append((path, entry.sha, entry.size or 0))
+        return files
+
+    def _store_tree(self, tree_sha: str, files: List[Tuple[str, str, int]]):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO mirror_trees (tree_sha, path, blob_sha, size) VALUES (?, ?, ?, ?)",
+            [(tree_sha, path, sha, size) for path, sha, size in files],
+        )
+
+    def _prefetch_changed(self, old_tree: str, new_tree: str):
+        """Fetch the new blobs of files whose previous version was stored (i.e. had been read)."""
+        missing = [sha for (sha,) in self._conn.execute(
+            "SELECT DISTINCT n.blob_sha FROM mirror_trees n "
+            "JOIN mirror_trees o ON o.tree_sha = ? AND o.path = n.path AND o.blob_sha != n.blob_sha "
+            "JOIN mirror_blobs ob ON ob.sha = o.blob_sha "
+            "LEFT JOIN mirror_blobs nb ON nb.sha = n.blob_sha "
+            "WHERE n.tree_sha = ? AND n.size <= ? AND nb.sha IS NULL",
+            (old_tree, new_tree, self.max_blob_bytes),
+        ).fetchall()]
+        if not missing:
+            return
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="repo-mirror") as pool:
+            batch = []
+            for sha, content in pool.map(self._fetch_blob, missing):
+                self._count_fetched(content)
+                self.stats.blobs_prefetched += 1
+                batch.append((sha, content))
+            self._conn.executemany("INSERT OR REPLACE INTO mirror_blobs (sha, content) VALUES (?, ?)", batch)
+
+    def _fetch_blob(self, sha: str) -> Tuple[str, bytes]:
+        blob = self.repo.get_git_blob(sha)
+        content = base64.b64decode(blob.content) if blob.encoding == "base64" else blob.content.encode("utf-8")
+        return sha, content
+
+    def _count_fetched(self, content: bytes):
+        self.stats.blobs_fetched += 1
+        self.stats.bytes_fetched += len(content)
+
+    def _prune(self):
+        """Drop trees no ref points to any more, and blobs no tree uses."""
+        self._conn.execute("DELETE FROM mirror_trees WHERE tree_sha NOT IN (SELECT tree_sha FROM mirror_refs)")
+        self._conn.execute("DELETE FROM mirror_blobs WHERE sha NOT IN (SELECT blob_sha FROM mirror_trees)")
+
+    def close(self):
+        self._conn.close()
+
+
+class MirroredGitHubAPIWrapper(GitHubAPIWrapper):
+    """GitHubAPIWrapper whose file-listing and read-file tools are served by a `RepoMirror`."""
+
+    mirror: Any = None  #: :meta private:
+
+    @model_validator(mode="after")
+    def _create_mirror(self) -> "MirroredGitHubAPIWrapper":
+        if self.mirror is None:
+            self.mirror = RepoMirror(self.github_repo_instance)
+        return self
+
+    def _files_report(self, ref: str, label: str) -> str:
+        try:
+            files = self.mirror.list_files(ref)
+        except Exception as e:
+            return f"Error: {e}"
+        if not files:
+            return f"No files found in {label}"
+        return f"Found {len(files)} files in {label}:\n" + "\n".join(files)
+
+    def list_files_in_main_branch(self) -> str:
+        return self._files_report(self.github_base_branch, "the main branch")
+
+    def list_files_in_bot_branch(self) -> str:
+        return self._files_report(self.active_branch, f"branch `{self.active_branch}`")
+
+    def get_files_from_directory(self, directory_path: str) -> str:
+        try:
+            files = self.mirror.list_files(self.active_branch, directory_path)
+        except Exception as e:
+            return f"Error: {e}"
+        return str(files)
+
+    def read_file(self, file_path: str) -> str:
+        try:
+            return self.mirror.read(self.active_branch, file_path).decode("utf-8")
+        except Exception as e:
+            return f"File not found `{file_path}` on branch`{self.active_branch}`. Error: {str(e)}"
+
+    def create_file(self, file_query: str) -> str:
+        result = super().create_file(file_query)
+        self.mirror.expire(self.active_branch)
+        return result
+
+    def update_file(self, file_query: str) -> str:
+        result = super().update_file(file_query)
+        self.mirror.expire(self.active_branch)
+        return result
+
+    def delete_file(self, file_path: str) -> str:
+        result = super().delete_file(file_path)
+        self.mirror.expire(self.active_branch)
+        return result
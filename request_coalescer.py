@@ -0,0 +1,293 @@
+"""Merge identical concurrent chat model calls and bound the requests in flight.
+
+When many graph runs reach the fact-check node together, every
+`fact_check_model.ainvoke("Assess accuracy: ...")` is its own HTTP request,
+some of them for the same draft, and all of them hit Ollama at once. Ollama
+serves `OLLAMA_NUM_PARALLEL` requests per model, queues up to
+`OLLAMA_MAX_QUEUE` more and answers the rest with 503 "server busy".
+`CoalescingChatModel` wraps a chat model and sends its calls through a
+`RequestCoalescer`:
+
+- the LLM cache is looked up first (the wrapped model's cache moves to the
+  wrapper), so cached prompts never queue,
+- identical prompts (same messages, model parameters, stop words and call
+  options) that are already waiting or in flight are sent once and every
+  caller gets the answer; by default only for temperature-0 models, like
+  llm_cache,
+- Ollama's chat API takes one conversation per request, so the requests go
+  out over `max_parallel` slots, in arrival order; set it to the server's
+  parallel slots so requests wait here instead of in (or being refused by)
+  the server queue. The server still answers `max_parallel` requests at a
+  time: calls per second beyond that come only from merged duplicates (and
+  cache hits); for distinct prompts the gain is no 503s, not throughput,
+- backpressure: at most `max_queue` calls wait for a slot; further callers
+  block until there is room and, after `queue_timeout` seconds, get
+  `CoalescerQueueFull`.
+
+Sync and async callers share one coalescer (threading lock; async waiters
+poll like `model_scheduler.ModelScheduler`).
+
+    coalescer = RequestCoalescer(max_parallel=4, max_queue=64)
+    fact_check_model = CoalescingChatModel(llm=ChatOllama(model="phi4:latest", temperature=0), coalescer=coalescer)
+    print(coalescer.stats)
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Union
+
+from langchain_core.caches import BaseCache
+from langchain_core.callbacks import CallbackManager
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field, model_validator
+
+
+class CoalescerQueueFull(RuntimeError):
+    """The coalescer queue stayed full for `queue_timeout` seconds."""
+
+
+@dataclass
+class CoalescerStats:
+    calls: int = 0
+    requests: int = 0  # requests sent to the wrapped model
+    merged: int = 0  # calls answered by an identical request
+    queue_waits: int = 0  # calls that found the queue full and waited
+    rejected: int = 0  # calls that gave up after `queue_timeout`
+    max_queued: int = 0
+
+
+class _InFlight:
+    """A request that is waiting for a slot or running; identical callers wait on it."""
+
+    def __init__(self, key: Optional[str]):
+        self.key = key
+        self.done = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class RequestCoalescer:
+    """In-flight deduplication and a bounded slot pool for model calls."""
+
+    def __init__(self, max_parallel: int = 4, max_queue: int = 64, queue_timeout: Optional[float] = None,
+                 poll_interval: float = 0.005, clock: Callable[[], float] = time.monotonic):
+        self.max_parallel = max_parallel
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.stats = CoalescerStats()
+        self._cond = threading.Condition()
+        self._queued = 0  # admitted calls that have neither a slot nor an in-flight request to wait on
+        self._running = 0
+        self._slot_queue: Deque[_InFlight] = deque()
+        self._in_flight: Dict[str, _InFlight] = {}
+
+    def call(self, key: Optional[str], fn: Callable[[], Any]) -> Any:
+        """Run `fn()` in turn; a call with the same non-None `key` as one in flight gets its result."""
+        with self._cond:
+            if not self._enter():
+                self.stats.queue_waits += 1
+                if not self._cond.wait_for(self._enter, self.queue_timeout):
+                    raise self._reject()
+            in_flight, leader = self._claim(key)
+            if not leader:
+                self._cond.wait_for(lambda: in_flight.done)
+        if not leader:
+            return in_flight.outcome()
+
+        ran = False
+        try:
+            with self._cond:
+                self._cond.wait_for(lambda: self._take_slot(in_flight))
+            ran = True
+            in_flight.result = fn()
+            return in_flight.result
+        except BaseException as e:
+            in_flight.error = e
+            raise
+        finally:
+            with self._cond:
+                self._finish(in_flight, ran)
+
+    async def acall(self, key: Optional[str], fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async `call`; `fn()` returns the awaitable to run."""
+        with self._cond:
+            entered = self._enter()
+            if not entered:
+                self.stats.queue_waits += 1
+        if not entered and not await self._poll(self._enter, self.queue_timeout):
+            with self._cond:
+                raise self._reject()
+        with self._cond:
+            in_flight, leader = self._claim(key)
+        if not leader:
+            await self._poll(lambda: in_flight.done)
+            return in_flight.outcome()
+
+        ran = False
+        try:
+            await self._poll(lambda: self._take_slot(in_flight))
+            ran = True
+            in_flight.result = await fn()
+            return in_flight.result
+        except asyncio.CancelledError:
+            in_flight.error = RuntimeError("the request this call was merged into was cancelled")
+            raise
+        except BaseException as e:
+            in_flight.error = e
+            raise
+        finally:
+            with self._cond:
+                self._finish(in_flight, ran)
+
+    async def _poll(self, ready: Callable[[], bool], timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            with self._cond:
+                if ready():
+                    return True
+            if deadline is not None and self.clock() >= deadline:
+                return False
+            await asyncio.sleep(self.poll_interval)
+
+    # The helpers below expect self._cond to be held.
+
+    def _enter(self) -> bool:
+        if self._queued >= self.max_queue:
+            return False
+        self._queued += 1
+        self.stats.calls += 1
+        self.stats.max_queued = max(self.stats.max_queued, self._queued)
+        return True
+
+    def _leave(self):
+        self._queued -= 1
+        self._cond.notify_all()
+
+    def _reject(self) -> CoalescerQueueFull:
+        self.stats.rejected += 1
+        return CoalescerQueueFull(f"{self.max_queue} calls already waiting for a model slot")
+
+    def _claim(self, key: Optional[str]):
+        in_flight = self._in_flight.get(key) if key is not None else None
+        if in_flight is not None:
+            self.stats.merged += 1
+            self._leave()
+            return in_flight, False
+        in_flight = _InFlight(key)
+        if key is not None:
+            self._in_flight[key] = in_flight
+        self._slot_queue.append(in_flight)
+        return in_flight, True
+
+    def _take_slot(self, in_flight: _InFlight) -> bool:
+        if self._running >= self.max_parallel or self._slot_queue[0] is not in_flight:
+            return False
+        self._slot_queue.popleft()
+        self._running += 1
+        self.stats.requests += 1
+        self._leave()
+        return True
+
+    def _finish(self, in_flight: _InFlight, ran: bool):
+        if ran:
+            self._running -= 1
+        else:
+            self._slot_queue.remove(in_flight)
+            self._queued -= 1
+        if self._in_flight.get(in_flight.key) is in_flight:
+            del self._in_flight[in_flight.key]
+        in_flight.done = True
+        self._cond.notify_all()
+
+
+def _child_callbacks(run_manager) -> Optional[CallbackManager]:
+    """Callbacks for a request made on behalf of `run_manager`'s run (what `get_child()` does for chains)."""
+    if run_manager is None:
+        return None
+    manager = CallbackManager(handlers=[], parent_run_id=run_manager.run_id)
+    manager.set_handlers(run_manager.inheritable_handlers)
+    manager.add_tags(run_manager.inheritable_tags)
+    manager.add_metadata(run_manager.inheritable_metadata)
+    return manager
+
+
+def _temperature(llm: BaseChatModel) -> Optional[float]:
+    """Temperature of `llm`, or of the model it wraps (e.g. a `model_scheduler.ScheduledChatModel`)."""
+    while not hasattr(llm, "temperature") and isinstance(getattr(llm, "llm", None), BaseChatModel):
+        llm = llm.llm
+    return getattr(llm, "temperature", None)
+
+
+class CoalescingChatModel(BaseChatModel):
+    """Chat model that sends `llm`'s calls through a `RequestCoalescer`.
+
+    The cache of `llm` moves to the wrapper, so it is checked before a
+    call queues; callbacks and keep_alive of `llm` still apply to the
+    requests it actually sends, which run as children of the caller's run.
+    """
+
+    llm: BaseChatModel
+    coalescer: RequestCoalescer
+    merge: Optional[bool] = None  # merge identical prompts; default: only if the temperature is 0
+    cache: Union[BaseCache, bool, None] = Field(default=None, exclude=True)  # default: `llm`'s
+
+    @model_validator(mode="after")
+    def _take_cache(self) -> "CoalescingChatModel":
+        if self.cache is None:
+            self.cache = self.llm.cache
+        # Looked up here, before the coalescer; `llm` must not look again.
+        self.llm = self.llm.model_copy(update={"cache": False})
+        return self
+
+    @property
+    def _llm_type(self) -> str:
+        return f"coalescing-{self.llm._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.llm._identifying_params
+
+    @property
+    def model(self) -> str:
+        return getattr(self.llm, "model", "")
+
+    def _get_ls_params(self, stop: Optional[List[str]] = None, **kwargs: Any):
+        return self.llm._get_ls_params(stop=stop, **kwargs)
+
+    def _get_llm_string(self, stop: Optional[List[str]] = None, **kwargs: Any) -> str:
+        # Same cache keys as the unwrapped model.
+        return self.llm._get_llm_string(stop=stop, **kwargs)
+
+    def _key(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Optional[str]:
+        merge = self.merge if self.merge is not None else _temperature(self.llm) == 0
+        if not merge:
+            return None
+        raw = self.llm._get_llm_string(stop=stop, **kwargs) + "\x1f" + dumps(messages)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                  **kwargs: Any) -> ChatResult:
+        config = {"callbacks": _child_callbacks(run_manager)}
+        message = self.coalescer.call(self._key(messages, stop, kwargs),
+                                      lambda: self.llm.invoke(messages, config=config, stop=stop, **kwargs))
+        return ChatResult(generations=[ChatGeneration(message=message.model_copy())])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs: Any) -> ChatResult:
+        config = {"callbacks": _child_callbacks(run_manager)}
+        message = await self.coalescer.acall(self._key(messages, stop, kwargs),
+                                             lambda: self.llm.ainvoke(messages, config=config, stop=stop, **kwargs))
+        return ChatResult(generations=[ChatGeneration(message=message.model_copy())])
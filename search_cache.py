@@ -0,0 +1,212 @@
+"""SQLite-backed cache for web search results.
+
+The agent graphs call `web_search_tool` on every iteration, and the same
+query is often repeated within a run and across runs. `SearchCache` sits in
+front of the search backend and:
+
+- keys entries on the normalized query plus region / time / max_results,
+- expires entries after a TTL and evicts the least recently used ones,
+- collapses concurrent identical queries into a single in-flight request,
+- keeps hit / miss counters so the saved round trips are visible.
+
+The backend is any callable `(query, region, time_limit, max_results) -> str`
+(by default a pooled `search_client.SearchClient`), so the cache can be
+exercised offline with a fake backend.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from text_normalize import normalize_query
+
+SearchBackend = Callable[[str, Optional[str], Optional[str], int], str]
+
+
+@dataclass
+class SearchCacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0  # callers that waited on an identical in-flight request
+    expired: int = 0
+    evictions: int = 0
+
+    @property
+    def saved_round_trips(self) -> int:
+        return self.hits + self.coalesced
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses + self.coalesced
+        return self.saved_round_trips / total if total else 0.0
+
+
+class _InFlight:
+    """A search that is currently running; identical callers wait on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class SearchCache:
+    """Persistent, deduplicating cache in front of a search backend."""
+
+    def __init__(
+        self,
+        path: str = ".search_cache.sqlite",
+        backend: Optional[SearchBackend] = None,
+        ttl: float = 24 * 60 * 60,
+        max_entries: int = 1000,
+        region: Optional[str] = "wt-wt",
+        time_limit: Optional[str] = "y",
+        max_results: int = 4,
+        clock: Callable[[], float] = time.time,
+    ):
+        if backend is None:
+            from search_client import SearchClient
+
+            backend = SearchClient().invoke
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.region = region
+        self.time_limit = time_limit
+        self.max_results = max_results
+        self.clock = clock
+        self.stats = SearchCacheStats()
+
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            "key TEXT PRIMARY KEY, query TEXT NOT NULL, result TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS search_cache_last_access ON search_cache (last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(query: str, region: Optional[str], time_limit: Optional[str], max_results: int) -> str:
+        raw = "\x1f".join([normalize_query(query), region or "", time_limit or "", str(max_results)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def search(
+        self,
+        query: str,
+        region: Optional[str] = None,
+        time_limit: Optional[str] = None,
+        max_results: Optional[int] = None,
+    ) -> str:
+        """Return cached results for the query, calling the backend only on a miss."""
+        region = region if region is not None else self.region
+        time_limit = time_limit if time_limit is not None else self.time_limit
+        max_results = max_results if max_results is not None else self.max_results
+        key = self.make_key(query, region, time_limit, max_results)
+
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                self.stats.hits += 1
+                return cached
+            in_flight = self._in_flight.get(key)
+            leader = in_flight is None
+            if leader:
+                in_flight = self._in_flight[key] = _InFlight()
+                self.stats.misses += 1
+            else:
+                self.stats.coalesced += 1
+
+        if not leader:
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.result
+
+        try:
+            result = self.backend(query, region, time_limit, max_results)
+            in_flight.result = result
+            with self._lock:
+                self._store(key, normalize_query(query), result)
+            return result
+        except BaseException as e:
+            in_flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            in_flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM search_cache")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+
+    # The helpers below expect self._lock to be held.
+
+    def _lookup(self, key: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT result, created_at FROM search_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        result, created_at = row
+        now = self.clock()
+        if now - created_at > self.ttl:
+            self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+            self._conn.commit()
+            self.stats.expired += 1
+            return None
+        self._conn.execute("UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+        return result
+
+    def _store(self, key: str, query: str, result: str):
+        now = self.clock()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO search_cache (key, query, result, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, query, result, now, now),
+        )
+        count = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM search_cache WHERE key IN "
+                "(SELECT key FROM search_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.stats.evictions += overflow
+        self._conn.commit()
+
+
+if __name__ == "__main__":
+    # Offline demo with a fake backend: only the first query reaches the "network".
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    def fake_backend(query, region, time_limit, max_results):
+        time.sleep(0.2)
+        return f"snippet: results for {query!r}, title: Fake, link: https://example.com"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SearchCache(f"{tmp}/search_cache.sqlite", backend=fake_backend, max_entries=2)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(cache.search, ["latest AI news"] * 8))
+        cache.search("  Latest   AI news ")
+        print(cache.stats, f"saved round trips: {cache.stats.saved_round_trips}")
+        cache.close()
@@ -0,0 +1,167 @@
+"""Long-lived web search client with a shared connection pool.
+
+Building a `DuckDuckGoSearchAPIWrapper` / `DuckDuckGoSearchResults` pair on
+every tool call throws away the HTTP session (TLS handshake, cookies,
+connection) each time. `SearchClient` keeps one fetcher alive for the whole
+process and adds:
+
+- `invoke` for threads and `ainvoke` for asyncio callers,
+- a concurrency limit shared by both paths,
+- a token-bucket rate limiter so parallel graph runs stay under the
+  provider's throttling threshold.
+
+The fetcher is any callable `(query, region, time_limit, max_results) -> list
+of {"snippet", "title", "link"}` dicts, so a stub transport can replace
+DuckDuckGo in benchmarks (see benchmark_search_client.py).
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+Fetcher = Callable[[str, Optional[str], Optional[str], int], List[Dict[str, str]]]
+
+
+class TokenBucket:
+    """Thread-safe token bucket; `rate` tokens per second, bursts up to `capacity`.
+
+    Callers reserve a token up front and then sleep for their turn, so waiters
+    are served in arrival order and sync and async callers share one budget.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token and return how long the caller must wait for it."""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def aacquire(self):
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class DuckDuckGoFetcher:
+    """Runs DuckDuckGo text/news searches through one long-lived `DDGS` session."""
+
+    def __init__(self, source: str = "text", safesearch: str = "moderate", backend: str = "auto", timeout: int = 10):
+        from duckduckgo_search import DDGS
+
+        class _PooledDDGS(DDGS):
+            # DDGS sleeps 0.75s between requests made on the same instance; the
+            # client's token bucket paces requests instead.
+            def _sleep(self, sleeptime: float = 0.75) -> None:
+                pass
+
+        self.ddgs = _PooledDDGS(timeout=timeout)
+        self.source = source
+        self.safesearch = safesearch
+        self.backend = backend
+
+    def __call__(self, query: str, region: Optional[str], time_limit: Optional[str], max_results: int) -> List[Dict[str, str]]:
+        if self.source == "news":
+            return [
+                {"snippet": r["body"], "title": r["title"], "link": r["url"], "date": r["date"], "source": r["source"]}
+                for r in self.ddgs.news(query, region=region, safesearch=self.safesearch,
+                                        timelimit=time_limit, max_results=max_results)
+            ]
+        return [
+            {"snippet": r["body"], "title": r["title"], "link": r["href"]}
+            for r in self.ddgs.text(query, region=region, safesearch=self.safesearch,
+                                    timelimit=time_limit, backend=self.backend, max_results=max_results)
+        ]
+
+
+def format_results(results: List[Dict[str, str]], separator: str = ", ") -> str:
+    """Format results the same way `DuckDuckGoSearchResults.run` does."""
+    return separator.join(", ".join(f"{k}: {v}" for k, v in r.items()) for r in results)
+
+
+class SearchClient:
+    """Pooled, rate-limited search client with sync and asyncio entry points."""
+
+    def __init__(
+        self,
+        fetch: Optional[Fetcher] = None,
+        max_concurrency: int = 4,
+        rate: Optional[float] = 1.0,
+        burst: float = 3.0,
+        region: Optional[str] = "wt-wt",
+        time_limit: Optional[str] = "y",
+        max_results: int = 4,
+    ):
+        self.fetch = fetch if fetch is not None else DuckDuckGoFetcher()
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.region = region
+        self.time_limit = time_limit
+        self.max_results = max_results
+        # Caps concurrent fetches across both the sync and the async path.
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="search")
+        self._async_slots: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+    def invoke(
+        self,
+        query: str,
+        region: Optional[str] = None,
+        time_limit: Optional[str] = None,
+        max_results: Optional[int] = None,
+    ) -> str:
+        """Run a search from a thread and return the formatted results."""
+        if self.bucket:
+            self.bucket.acquire()
+        return self._run(query, region, time_limit, max_results)
+
+    async def ainvoke(
+        self,
+        query: str,
+        region: Optional[str] = None,
+        time_limit: Optional[str] = None,
+        max_results: Optional[int] = None,
+    ) -> str:
+        """Run a search without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        slots = self._async_slots.get(loop)
+        if slots is None:
+            # A semaphore refers to its loop once contended, so a weak mapping
+            # would not free it; drop the entries of loops that have closed.
+            for closed in [l for l in self._async_slots if l.is_closed()]:
+                del self._async_slots[closed]
+            slots = self._async_slots[loop] = asyncio.Semaphore(self.max_concurrency)
+        async with slots:
+            if self.bucket:
+                await self.bucket.aacquire()
+            return await loop.run_in_executor(self._executor, self._run, query, region, time_limit, max_results)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def _run(self, query: str, region: Optional[str], time_limit: Optional[str], max_results: Optional[int]) -> str:
+        with self._slots:
+            results = self.fetch(
+                query,
+                region if region is not None else self.region,
+                time_limit if time_limit is not None else self.time_limit,
+                max_results if max_results is not None else self.max_results,
+            )
+        return format_results(results)
@@ -0,0 +1,298 @@
+"""Semantic cache of past web searches.
+
+The exact-match `SearchCache` misses when the agent rephrases a question it
+searched for minutes earlier ("latest AI news" vs. "recent news about AI").
+`SemanticSearchCache` embeds every query it sends to the backend and keeps a
+local vector index of (query, results). A new query whose cosine similarity
+to a stored one is above `threshold` gets the stored results back.
+
+The index is plain NumPy: an exact (flat) top-k over a normalized matrix, or
+an IVF mode for large stores that clusters the vectors with spherical
+k-means and only scans the `nprobe` closest clusters.
+
+Expired entries are not matched; when a query is stored, expired entries
+close to it are replaced or freed for reuse, so a repeated query keeps one
+row instead of one per expiry.
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class VectorIndex:
+    """Cosine top-k over a growing matrix; exact ("flat") or clustered ("ivf")."""
+
+    def __init__(self, dim: int, mode: str = "flat", nlist: Optional[int] = None, nprobe: int = 4,
+                 ivf_min_size: int = 1024):
+        if mode not in ("flat", "ivf"):
+            raise ValueError(f"Invalid mode: {mode}. Needs to be one of 'flat', 'ivf'.")
+        self.dim = dim
+        self.mode = mode
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ivf_min_size = ivf_min_size
+        self._matrix = np.empty((64, dim), dtype=np.float32)
+        self._size = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []  # cached np views of _lists
+        self._cluster_of: List[int] = []  # ivf: inverted list of every id
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._matrix[: self._size]
+
+    def add(self, vectors: np.ndarray) -> List[int]:
+        vectors = _normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        needed = self._size + len(vectors)
+        if needed > len(self._matrix):
+            grown = np.empty((max(needed, 2 * len(self._matrix)), self.dim), dtype=np.float32)
+            grown[: self._size] = self.vectors
+            self._matrix = grown
+        ids = list(range(self._size, needed))
+        self._matrix[self._size:needed] = vectors
+        self._size = needed
+
+        if self.mode == "ivf":
+            if self._size >= self.ivf_min_size and self._size >= 2 * self._trained_size:
+                self._train()
+            elif self._centroids is not None:
+                for i, cluster in zip(ids, np.argmax(vectors @ self._centroids.T, axis=1)):
+                    self._lists[cluster].append(i)
+                    self._list_arrays[cluster] = None
+                    self._cluster_of.append(int(cluster))
+        return ids
+
+    def replace(self, i: int, vector: np.ndarray):
+        """Overwrite the vector of id `i` (a zero vector never matches)."""
+        vector = _normalize(np.asarray(vector, dtype=np.float32))
+        self._matrix[i] = vector
+        if self._centroids is not None:
+            old, new = self._cluster_of[i], int(np.argmax(self._centroids @ vector))
+            if new != old:
+                self._lists[old].remove(i)
+                self._lists[new].append(i)
+                self._list_arrays[old] = self._list_arrays[new] = None
+                self._cluster_of[i] = new
+
+    def search(self, query: np.ndarray, k: int = 1, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Return up to k (id, cosine similarity) pairs, most similar first.
+
+        `allowed` is an optional boolean mask over the ids; other ids are
+        skipped before the top-k is taken.
+        """
+        if not self._size:
+            return []
+        query = _normalize(np.asarray(query, dtype=np.float32))
+        if self._centroids is None:
+            candidates = None
+            scores = self.vectors @ query
+        else:
+            probe = _top_k(self._centroids @ query, min(self.nprobe, len(self._centroids)))
+            candidates = np.concatenate([self._list_array(c) for c in probe])
+            if not len(candidates):
+                return []
+            scores = self._matrix[candidates] @ query
+        if allowed is not None:
+            scores = np.where(allowed if candidates is None else allowed[candidates], scores, -np.inf)
+        top = _top_k(scores, k)
+        ids = top if candidates is None else candidates[top]
+        return [(int(i), float(s)) for i, s in zip(ids, scores[top]) if s != -np.inf]
+
+    def _list_array(self, cluster: int) -> np.ndarray:
+        array = self._list_arrays[cluster]
+        if array is None:
+            array = self._list_arrays[cluster] = np.asarray(self._lists[cluster], dtype=np.int64)
+        return array
+
+    def _train(self, iterations: int = 10):
+        """Spherical k-means over all vectors, then rebuild the inverted lists."""
+        vectors = self.vectors
+        nlist = self.nlist or max(1, int(np.sqrt(self._size)))
+        rng = np.random.default_rng(0)
+        centroids = vectors[rng.choice(self._size, size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = vectors[assign == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = _normalize(centroids)
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        self._centroids = centroids
+        self._lists = [np.flatnonzero(assign == c).tolist() for c in range(nlist)]
+        self._cluster_of = assign.tolist()
+        self._list_arrays = [None] * nlist
+        self._trained_size = self._size
+
+
+@dataclass
+class SemanticCacheStats:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0  # expired entries replaced or freed when a similar query was stored
+    seconds_saved: float = 0.0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def seconds_saved_per_hit(self) -> float:
+        return self.seconds_saved / self.hits if self.hits else 0.0
+
+
+class SemanticSearchCache:
+    """Returns stored results for queries similar enough to an earlier one."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        backend: Callable[[str], str],
+        threshold: float = 0.92,
+        ttl: float = 60 * 60,
+        mode: str = "flat",
+        nlist: Optional[int] = None,
+        nprobe: int = 4,
+        path: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.embeddings = embeddings
+        self.backend = backend
+        self.threshold = threshold
+        self.ttl = ttl
+        self.mode = mode
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.path = Path(path) if path else None
+        self.clock = clock
+        self.stats = SemanticCacheStats()
+
+        self._lock = threading.Lock()
+        self._index: Optional[VectorIndex] = None
+        # Per index row: query, results, created_at, seconds the backend took
+        # (None for a freed row, whose vector is zeroed until it is reused).
+        self._entries: List[Optional[Tuple[str, str, float, float]]] = []
+        self._created = np.empty(0, dtype=np.float64)  # created_at per row, -inf when freed
+        self._free: List[int] = []
+        if self.path and self.path.with_suffix(".json").exists():
+            self._load()
+
+    def lookup(self, query: str) -> Optional[Tuple[str, str, float]]:
+        """Best fresh match above the threshold as (cached query, results, similarity)."""
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        match = self._lookup(vector)
+        if match is None:
+            return None
+        row, score = match
+        cached_query, results, _, _ = self._entries[row]
+        return cached_query, results, score
+
+    def search(self, query: str) -> str:
+        started = time.perf_counter()
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        match = self._lookup(vector)
+        if match is not None:
+            row, _ = match
+            with self._lock:
+                _, results, _, backend_seconds = self._entries[row]
+                self.stats.hits += 1
+                self.stats.seconds_saved += max(0.0, backend_seconds - (time.perf_counter() - started))
+            return results
+
+        backend_started = time.perf_counter()
+        results = self.backend(query)
+        elapsed = time.perf_counter() - backend_started
+        with self._lock:
+            self.stats.misses += 1
+            self._store(vector, (query, results, self.clock(), elapsed))
+        return results
+
+    def save(self):
+        """Persist entries (JSON) and vectors (.npy) next to `path`, each replaced atomically."""
+        if self.path is None:
+            return
+        with self._lock:
+            if self._index is None:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            vectors_path, entries_path = self.path.with_suffix(".npy"), self.path.with_suffix(".json")
+            with open(f"{vectors_path}.tmp", "wb") as f:
+                np.save(f, self._index.vectors)
+            with open(f"{entries_path}.tmp", "w") as f:
+                json.dump(self._entries, f)
+            os.replace(f"{vectors_path}.tmp", vectors_path)
+            os.replace(f"{entries_path}.tmp", entries_path)
+
+    def _load(self):
+        entries = [tuple(e) if e is not None else None for e in json.loads(self.path.with_suffix(".json").read_text())]
+        vectors = np.load(self.path.with_suffix(".npy"))
+        size = min(len(entries), len(vectors))  # a crash between the two replaces
+        self._entries = entries[:size]
+        self._index = VectorIndex(vectors.shape[1], self.mode, self.nlist, self.nprobe)
+        self._index.add(vectors[:size])
+        self._created = np.array([e[2] if e is not None else -np.inf for e in self._entries], dtype=np.float64)
+        self._free = [row for row, e in enumerate(self._entries) if e is None]
+
+    def _lookup(self, vector: np.ndarray) -> Optional[Tuple[int, float]]:
+        """(row, similarity) of the best fresh entry above the threshold."""
+        with self._lock:
+            if self._index is None:
+                return None
+            fresh = self._created[: len(self._index)] >= self.clock() - self.ttl
+            for row, score in self._index.search(vector, k=1, allowed=fresh):
+                if score >= self.threshold:
+                    return row, score
+        return None
+
+    def _store(self, vector: np.ndarray, entry: Tuple[str, str, float, float]):
+        """Add an entry, reusing the row of an expired similar entry (or a freed row); lock held."""
+        if self._index is None:
+            self._index = VectorIndex(len(vector), self.mode, self.nlist, self.nprobe)
+        size = len(self._index)
+        expired = self._created[:size] < entry[2] - self.ttl
+        stale = [row for row, score in self._index.search(vector, k=8, allowed=expired) if score >= self.threshold]
+        for row in stale[1:]:
+            self._index.replace(row, np.zeros_like(vector))
+            self._entries[row] = None
+            self._created[row] = -np.inf
+            self._free.append(row)
+        self.stats.expired += len(stale)
+
+        row = stale[0] if stale else self._free.pop() if self._free else None
+        if row is None:
+            row = self._index.add(vector)[0]
+            self._entries.append(entry)
+            if row >= len(self._created):
+                grown = np.full(max(64, 2 * len(self._created)), -np.inf)
+                grown[: len(self._created)] = self._created
+                self._created = grown
+        else:
+            self._index.replace(row, vector)
+            self._entries[row] = entry
+        self._created[row] = entry[2]
@@ -0,0 +1,386 @@
+"""Execution stage for the SQL that `create_sql_query_chain` generates.
+
+`SQLDatabase.run` executes whatever the model wrote, fetches every row and
+turns the result into one string. `SQLExecutor` instead:
+
+- caches question -> SQL in SQLite, keyed on the normalized question and the
+  schema fingerprint of a `CachedSQLDatabase`, so a repeated question skips
+  the model and a schema change invalidates the mapping,
+- only runs single SELECT / WITH statements, in a read-only transaction with
+  a statement timeout (PostgreSQL) or `query_only` (SQLite),
+- injects `LIMIT max_rows + 1` (or lowers a larger LIMIT) so a missing LIMIT
+  cannot pull a whole table, and reports whether rows were cut off,
+- runs `EXPLAIN` first and refuses plans whose estimated cost is above
+  `max_cost` (PostgreSQL and MySQL report a cost; on SQLite EXPLAIN QUERY
+  PLAN only validates the statement),
+- streams rows through a server-side cursor in `batch_size` partitions
+  (`stream()`), so large results never sit in memory at once,
+- caches small results in memory together with the tables they read; an
+  entry is dropped when one of those tables is `invalidate()`d, when
+  PostgreSQL's per-table modification counters move, or after `result_ttl`.
+
+`tuned_engine_args()` are pool settings for `SQLDatabase.from_uri(...,
+engine_args=...)`: a small LIFO pool with pre-ping and recycling.
+
+    db = CachedSQLDatabase.from_uri(uri, engine_args=tuned_engine_args(uri))
+    executor = SQLExecutor(db, chain)
+    result = executor.ask(question)
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from langchain_community.utilities import SQLDatabase
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from text_normalize import normalize_query
+
+# `LIMIT n`, `LIMIT n OFFSET m` and MySQL/SQLite's `LIMIT m, n`; group "count" is n.
+LIMIT_AT_END = re.compile(r"\bLIMIT\s+(?:\d+\s*,\s*)?(?P<count>\d+)(\s+OFFSET\s+\d+)?\s*$", re.IGNORECASE)
+FETCH_AT_END = re.compile(r"\bFETCH\s+(FIRST|NEXT)\b[^;]*$", re.IGNORECASE)
+IDENTIFIER = re.compile(r'[A-Za-z_][\w$]*|"[^"]+"|`[^`]+`')
+
+ChainInputs = Union[Dict[str, Any], Callable[[], Dict[str, Any]], None]
+
+PG_TABLE_VERSIONS = text(
+    "SELECT relname, n_tup_ins + n_tup_upd + n_tup_del FROM pg_stat_user_tables "
+    "WHERE schemaname = coalesce(:schema, current_schema())"
+)
+
+
+class QueryRejected(ValueError):
+    """The generated SQL is not a single read-only statement."""
+
+
+class QueryTooExpensive(RuntimeError):
+    """EXPLAIN estimated a cost above the executor's `max_cost`."""
+
+
+def tuned_engine_args(uri: str, **overrides) -> Dict[str, Any]:
+    """Connection pool settings for a chat app: few long-lived connections, checked before use."""
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return dict(overrides)  # in-memory SQLite uses a single-connection pool
+    args = {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,  # before server / proxy idle timeouts close connections
+        "pool_pre_ping": True,
+        "pool_use_lifo": True,  # keep reusing warm connections, let extra ones idle out
+    }
+    args.update(overrides)
+    return args
+
+
+def extract_sql(output: str) -> str:
+    """The SQL statement in a model answer (drops `SQLQuery:` prefixes and code fences)."""
+    output = output.split("SQLResult:")[0]
+    fence = re.search(r"```(?:sql)?\s*(.*?)```", output, re.DOTALL | re.IGNORECASE)
+    if fence:
+        output = fence.group(1)
+    output = re.sub(r"^\s*SQLQuery:\s*", "", output.strip(), flags=re.IGNORECASE)
+    return output.strip().rstrip(";").strip()
+
+
+@dataclass
+class QueryResult:
+    sql: str
+    columns: List[str]
+    rows: List[Tuple[Any, ...]]
+    truncated: bool = False  # more than max_rows rows matched
+    cost: Optional[float] = None
+    cached: bool = False
+
+
+@dataclass
+class SQLExecutorStats:
+    plan_hits: int = 0
+    plan_misses: int = 0
+    result_hits: int = 0
+    result_misses: int = 0
+    invalidations: int = 0
+    rejected: int = 0  # not read-only, or too expensive
+    streamed_rows: int = 0
+
+
+@dataclass
+class _CachedResult:
+    result: QueryResult
+    tables: Tuple[str, ...]
+    versions: Tuple[Any, ...]
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class SQLExecutor:
+    """Runs generated SQL with a plan cache, guards, streaming and a table-aware result cache."""
+
+    def __init__(
+        self,
+        db: SQLDatabase,
+        chain=None,
+        *,
+        max_rows: int = 1000,
+        max_cost: Optional[float] = 1e6,
+        batch_size: int = 500,
+        statement_timeout: float = 30.0,
+        result_ttl: float = 300.0,
+        max_cached_results: int = 256,
+        max_cached_rows: int = 10_000,
+        probe_interval: float = 1.0,
+        cache_path: str = ".sql_cache.sqlite",
+    ):
+        self.db = db
+        self.chain = chain
+        self.max_rows = max_rows
+        self.max_cost = max_cost
+        self.batch_size = batch_size
+        self.statement_timeout = statement_timeout
+        self.result_ttl = result_ttl
+        self.max_cached_results = max_cached_results
+        self.max_cached_rows = max_cached_rows
+        self.probe_interval = probe_interval
+        self.stats = SQLExecutorStats()
+        self.engine = db._engine
+        self.dialect = db.dialect
+        self.db_key = "|".join([
+            self.engine.url.render_as_string(hide_password=True),
+            db._schema or "",
+            getattr(db, "fingerprint", ""),  # CachedSQLDatabase's catalog fingerprint
+        ])
+        self._tables = {name.lower(): name for name in db.get_usable_table_names()}
+
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[str, _CachedResult]" = OrderedDict()
+        self._versions: Dict[str, int] = {}  # bumped by invalidate()
+        self._probed: Dict[str, int] = {}  # PostgreSQL modification counters
+        self._probed_at = float("-inf")
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sql_plans ("
+            "db_key TEXT NOT NULL, question TEXT NOT NULL, sql TEXT NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (db_key, question))"
+        )
+        self._conn.commit()
+
+    # Question -> SQL
+
+    def sql_for(self, question: str, inputs: ChainInputs = None) -> str:
+        """Generated SQL for a question, from the plan cache or the chain.
+
+        `inputs` may be a function returning the chain inputs, so work that is
+        only needed to generate SQL (table retrieval) is skipped on a hit.
+        """
+        key = normalize_query(question)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sql FROM sql_plans WHERE db_key = ? AND question = ?", (self.db_key, key)
+            ).fetchone()
+        if row is not None:
+            self.stats.plan_hits += 1
+            return row[0]
+        if self.chain is None:
+            raise ValueError("No chain to generate SQL with")
+        self.stats.plan_misses += 1
+        if callable(inputs):
+            inputs = inputs()
+        sql = extract_sql(self.chain.invoke(inputs or {"question": question}))
+        self.prepare(sql)  # only remember SQL that passes the guards
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sql_plans (db_key, question, sql, created_at) VALUES (?, ?, ?, ?)",
+                (self.db_key, key, sql, time.time()),
+            )
+            self._conn.commit()
+        return sql
+
+    def ask(self, question: str, inputs: ChainInputs = None) -> QueryResult:
+        return self.run(self.sql_for(question, inputs))
+
+    def forget(self, question: str):
+        """Drop a cached question -> SQL mapping (e.g. after the SQL turned out wrong)."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM sql_plans WHERE db_key = ? AND question = ?", (self.db_key, normalize_query(question))
+            )
+            self._conn.commit()
+
+    # Guards
+
+    def prepare(self, sql: str, limit: Optional[int] = None) -> str:
+        """Validate a statement as a single SELECT and cap its row count."""
+        statement = sql.strip().rstrip(";").strip()
+        first = statement.split(None, 1)[0].upper() if statement else ""
+        if first not in ("SELECT", "WITH") or ";" in statement:
+            self.stats.rejected += 1
+            raise QueryRejected(f"Only single SELECT statements can be executed: {sql!r}")
+        if limit is None:
+            return statement
+        match = LIMIT_AT_END.search(statement)
+        if match:
+            if int(match.group("count")) > limit:
+                statement = f"{statement[:match.start('count')]}{limit}{statement[match.end('count'):]}"
+        elif not FETCH_AT_END.search(statement):
+            statement = f"{statement}\nLIMIT {limit}"
+        return statement
+
+    def explain(self, sql: str) -> Optional[float]:
+        """Estimated cost of a statement, or None where the dialect has no cost estimate."""
+        with self._connection() as connection:
+            return self._explain(connection, sql)
+
+    # Execution
+
+    def run(self, sql: str) -> QueryResult:
+        """Run a statement and return at most `max_rows` rows, from the result cache if still valid."""
+        statement = self.prepare(sql, self.max_rows + 1)
+        tables = self.tables_read(statement)
+        cached = self._cached(statement, tables)
+        if cached is not None:
+            return cached
+
+        versions = self._current_versions(tables)
+        rows: List[Tuple[Any, ...]] = []
+        with self._connection() as connection:
+            cost = self._explain(connection, statement)
+            columns, batches = self._execute(connection, statement)
+            for batch in batches:
+                rows.extend(batch)
+        truncated = len(rows) > self.max_rows
+        result = QueryResult(sql=statement, columns=columns, rows=rows[: self.max_rows], truncated=truncated, cost=cost)
+        if len(result.rows) <= self.max_cached_rows:
+            self._store(statement, tables, versions, result)
+        return result
+
+    def stream(self, sql: str, batch_size: Optional[int] = None, limit: Optional[int] = None
+               ) -> Iterator[Tuple[List[str], List[Tuple[Any, ...]]]]:
+        """Yield (columns, rows) batches through a server-side cursor; nothing is cached.
+
+        Without `limit` the statement's own LIMIT (if any) applies.
+        """
+        statement = self.prepare(sql, limit)
+        with self._connection() as connection:
+            self._explain(connection, statement)
+            columns, batches = self._execute(connection, statement, batch_size)
+            for batch in batches:
+                self.stats.streamed_rows += len(batch)
+                yield columns, batch
+
+    # Result cache invalidation
+
+    def tables_read(self, sql: str) -> Tuple[str, ...]:
+        """Known tables whose names appear in the statement (a superset of what it reads)."""
+        found = set()
+        for token in IDENTIFIER.findall(sql):
+            name = self._tables.get(token.strip('"`').split(".")[-1].lower())
+            if name is not None:
+                found.add(name)
+        return tuple(sorted(found))
+
+    def invalidate(self, *tables: str):
+        """Drop cached results that read any of `tables` (all results when none are given)."""
+        with self._lock:
+            if not tables:
+                self.stats.invalidations += len(self._results)
+                self._results.clear()
+                return
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            stale = [key for key, entry in self._results.items() if set(entry.tables) & set(tables)]
+            for key in stale:
+                del self._results[key]
+            self.stats.invalidations += len(stale)
+
+    def close(self):
+        self._conn.close()
+
+    @contextmanager
+    def _connection(self):
+        with self.engine.connect() as connection:
+            if self.dialect == "postgresql":
+                connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+                connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(self.statement_timeout * 1000)}")
+            elif self.dialect == "sqlite":
+                connection.exec_driver_sql("PRAGMA query_only = ON")
+            try:
+                yield connection
+            finally:
+                connection.rollback()
+                if self.dialect == "sqlite":
+                    connection.exec_driver_sql("PRAGMA query_only = OFF")
+
+    def _explain(self, connection, statement: str) -> Optional[float]:
+        cost = None
+        if self.dialect == "postgresql":
+            plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}").scalar()
+            cost = float(plan[0]["Plan"]["Total Cost"])
+        elif self.dialect in ("mysql", "mariadb"):
+            plan = json.loads(connection.exec_driver_sql(f"EXPLAIN FORMAT=JSON {statement}").scalar())
+            cost = float(plan["query_block"].get("cost_info", {}).get("query_cost", 0))
+        else:
+            connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}" if self.dialect == "sqlite"
+                                       else f"EXPLAIN {statement}").fetchall()
+        if cost is not None and self.max_cost is not None and cost > self.max_cost:
+            self.stats.rejected += 1
+            raise QueryTooExpensive(f"Estimated cost {cost:.0f} is above {self.max_cost:.0f}: {statement!r}")
+        return cost
+
+    def _execute(self, connection, statement: str, batch_size: Optional[int] = None
+                 ) -> Tuple[List[str], Iterator[List[Tuple[Any, ...]]]]:
+        # yield_per turns on stream_results: a named (server-side) cursor on
+        # psycopg2, an unbuffered cursor on MySQL drivers.
+        batch_size = batch_size or self.batch_size
+        result = connection.execution_options(yield_per=batch_size).exec_driver_sql(statement)
+        columns = list(result.keys())
+        return columns, ([tuple(row) for row in partition] for partition in result.partitions(batch_size))
+
+    def _cached(self, statement: str, tables: Sequence[str]) -> Optional[QueryResult]:
+        versions = self._current_versions(tables)
+        with self._lock:
+            entry = self._results.get(statement)
+            if entry is None:
+                self.stats.result_misses += 1
+                return None
+            if entry.versions != versions or time.monotonic() - entry.created_at > self.result_ttl:
+                del self._results[statement]
+                self.stats.invalidations += 1
+                self.stats.result_misses += 1
+                return None
+            self._results.move_to_end(statement)
+            self.stats.result_hits += 1
+        return QueryResult(**{**entry.result.__dict__, "cached": True})
+
+    def _store(self, statement: str, tables: Tuple[str, ...], versions: Tuple[Any, ...], result: QueryResult):
+        with self._lock:
+            self._results[statement] = _CachedResult(result, tables, versions)
+            self._results.move_to_end(statement)
+            while len(self._results) > self.max_cached_results:
+                self._results.popitem(last=False)
+
+    def _current_versions(self, tables: Sequence[str]) -> Tuple[Any, ...]:
+        probed = self._probe()
+        with self._lock:
+            return tuple((self._versions.get(table, 0), probed.get(table)) for table in tables)
+
+    def _probe(self) -> Dict[str, int]:
+        """PostgreSQL's per-table insert/update/delete counters, read at most every `probe_interval` s.
+
+        The statistics collector reports with a delay of up to about a second,
+        so a write can take that long to invalidate a result.
+        """
+        if self.dialect != "postgresql":
+            return {}
+        now = time.monotonic()
+        if now - self._probed_at >= self.probe_interval:
+            with self.engine.connect() as connection:
+                rows = connection.execute(PG_TABLE_VERSIONS, {"schema": self.db._schema}).fetchall()
+            self._probed = {name: count for name, count in rows}
+            self._probed_at = now
+        return self._probed
@@ -0,0 +1,115 @@
+"""Pick the tables a question needs before `create_sql_query_chain` builds its prompt.
+
+`create_sql_query_chain` puts the CREATE TABLE statement and sample rows of
+every usable table into the prompt, so prompt size and prefill time grow
+with the schema. `TableRetriever` indexes one short description per table
+(table name, column names and types, foreign keys, comment), embeds them
+once, and per question passes only:
+
+- the `k` tables whose description is most similar to the question (cosine
+  top-k over a NumPy matrix, see `semantic_search_cache.VectorIndex`),
+- plus the tables those reference or are referenced by, so the model can
+  write the joins.
+
+Pass `CachedEmbeddings` so the descriptions are only embedded the first time
+a schema is seen. Columns and foreign keys are read with SQLAlchemy's
+batched `get_multi_*` inspector calls, not by reflecting every table.
+
+    retriever = TableRetriever(db, CachedEmbeddings(OllamaEmbeddings(model="nomic-embed-text")), k=5)
+    chain.invoke(retriever.chain_inputs(question))
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from langchain_community.utilities import SQLDatabase
+from langchain_core.embeddings import Embeddings
+from sqlalchemy import inspect
+
+from semantic_search_cache import VectorIndex
+
+
+@dataclass
+class TableInfo:
+    name: str
+    description: str
+    neighbors: Set[str] = field(default_factory=set)  # foreign keys in either direction
+
+
+def _words(identifier: str) -> str:
+    """`countryCode_id` -> `country code id`, so embedders see words."""
+    return re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", identifier).replace("_", " ").lower()
+
+
+def describe_tables(db: SQLDatabase) -> Dict[str, TableInfo]:
+    """One text description per usable table, with its foreign-key neighbors."""
+    names = list(db.get_usable_table_names())
+    schema = db._schema
+    inspector = inspect(db._engine)
+    columns = inspector.get_multi_columns(schema=schema, filter_names=names)
+    foreign_keys = inspector.get_multi_foreign_keys(schema=schema, filter_names=names)
+    try:
+        comments = inspector.get_multi_table_comment(schema=schema, filter_names=names)
+    except NotImplementedError:  # SQLite has no table comments
+        comments = {}
+
+    tables = {name: TableInfo(name, "") for name in names}
+    for (_, name), keys in foreign_keys.items():
+        for key in keys:
+            referred = key["referred_table"]
+            if name in tables and referred in tables and referred != name:
+                tables[name].neighbors.add(referred)
+                tables[referred].neighbors.add(name)
+
+    for (_, name), table_columns in columns.items():
+        if name not in tables:
+            continue
+        column_text = ", ".join(f"{_words(c['name'])} ({c['type']})" for c in table_columns)
+        references = [
+            f"{_words(', '.join(key['constrained_columns']))} references {_words(key['referred_table'])}"
+            for key in foreign_keys.get((schema, name), [])
+        ]
+        comment = (comments.get((schema, name)) or {}).get("text")
+        parts = [f"Table {_words(name)}", f"columns: {column_text}"]
+        if references:
+            parts.append("; ".join(references))
+        if comment:
+            parts.append(comment)
+        tables[name].description = ". ".join(parts)
+    return tables
+
+
+class TableRetriever:
+    """Embedding top-k over table descriptions, expanded with foreign-key neighbors."""
+
+    def __init__(self, db: SQLDatabase, embeddings: Embeddings, k: int = 5, include_neighbors: bool = True,
+                 max_tables: Optional[int] = 12):
+        self.db = db
+        self.embeddings = embeddings
+        self.k = k
+        self.include_neighbors = include_neighbors
+        self.max_tables = max_tables
+        self.tables = describe_tables(db)
+        self._names = list(self.tables)
+        vectors = np.asarray(
+            self.embeddings.embed_documents([self.tables[name].description for name in self._names]), dtype=np.float32
+        )
+        self._index = VectorIndex(vectors.shape[1])
+        self._index.add(vectors)
+
+    def retrieve(self, question: str) -> List[str]:
+        """Names of the tables to show the model, most relevant first."""
+        query = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        selected = [self._names[i] for i, _ in self._index.search(query, self.k)]
+        if self.include_neighbors:
+            seen = set(selected)
+            for name in list(selected):
+                for neighbor in sorted(self.tables[name].neighbors - seen):
+                    seen.add(neighbor)
+                    selected.append(neighbor)
+        return selected[: self.max_tables] if self.max_tables else selected
+
+    def chain_inputs(self, question: str) -> Dict[str, object]:
+        """Inputs for `create_sql_query_chain`, restricted to the retrieved tables."""
+        return {"question": question, "table_names_to_use": self.retrieve(question)}
@@ -0,0 +1,6 @@
+"""Normalization of user-written text for the caches that key on it."""
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold and collapse whitespace so trivially different queries share an entry."""
+    return " ".join(query.casefold().split())
@@ -0,0 +1,158 @@
+"""Process-wide registry of tokenizers, each loaded once.
+
+`count_tokens` in example_token_count.py used to call
+`GPT2Tokenizer.from_pretrained` on every call, and example_ollama_tokenizer.py
+loaded a full HF tokenizer at startup just to count tokens. The registry:
+
+- loads every tokenizer once and reuses it (thread-safe; failures are cached
+  too, so an offline machine does not retry a download on every call),
+- prefers a tiktoken fast path when tiktoken has the same encoding
+  (`gpt2`, `cl100k_base`, ...) or the snapshot ships a tiktoken BPE file
+  (Llama 3's `original/tokenizer.model`); tiktoken reads its encoding files
+  from `TIKTOKEN_CACHE_DIR`, so they can be shipped with the snapshot too,
+- otherwise loads a HF tokenizer from a local snapshot directory
+  (`TOKENIZER_SNAPSHOT_DIR/<org>__<name>`) or the HF cache, and never touches
+  the network when `offline=True` or `HF_HUB_OFFLINE=1`,
+- counts lists of texts in one batched call with `count_tokens_batch`.
+
+    from tokenizer_registry import count_tokens, count_tokens_batch
+
+    count_tokens("Hello, how are you?", "gpt2")
+    count_tokens_batch(documents, "meta-llama/Meta-Llama-3-8B-Instruct")
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+# HF tokenizer names whose vocabulary tiktoken ships under another name.
+TIKTOKEN_ALIASES = {
+    "gpt2": "gpt2",
+    "openai-community/gpt2": "gpt2",
+    "microsoft/phi-4": "cl100k_base",
+}
+
+TIKTOKEN_ENCODINGS = {"gpt2", "r50k_base", "p50k_base", "cl100k_base", "o200k_base"}
+
+# Pre-tokenization pattern of the Llama 3 tiktoken BPE (from Meta's tokenizer.py).
+LLAMA3_PAT_STR = (
+    r"(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}{1,3}|"
+    r" ?[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"
+)
+
+
+class TokenizerUnavailable(RuntimeError):
+    """Raised when a tokenizer cannot be loaded (e.g. not in the offline snapshot)."""
+
+
+class TiktokenTokenizer:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.name = encoding.name
+
+    def encode(self, text: str) -> List[int]:
+        return self.encoding.encode_ordinary(text)
+
+    def encode_batch(self, texts: Sequence[str]) -> List[List[int]]:
+        return self.encoding.encode_ordinary_batch(list(texts))
+
+
+class HFTokenizer:
+    def __init__(self, tokenizer, name: str):
+        self.tokenizer = tokenizer
+        self.name = name
+
+    def encode(self, text: str) -> List[int]:
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def encode_batch(self, texts: Sequence[str]) -> List[List[int]]:
+        # Fast (Rust) tokenizers encode a whole batch in parallel.
+        return self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+
+
+Tokenizer = Union[TiktokenTokenizer, HFTokenizer]
+
+
+class TokenizerRegistry:
+    def __init__(self, snapshot_dir: Optional[str] = None, offline: Optional[bool] = None):
+        self.snapshot_dir = Path(snapshot_dir or os.getenv("TOKENIZER_SNAPSHOT_DIR", ".tokenizer_snapshots"))
+        if offline is None:
+            offline = os.getenv("HF_HUB_OFFLINE", "0") not in ("0", "false", "False")
+        self.offline = offline
+        self._tokenizers: Dict[str, Union[Tokenizer, TokenizerUnavailable]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Tokenizer:
+        """Return the tokenizer for `name`, loading it on first use."""
+        tokenizer = self._tokenizers.get(name)
+        if tokenizer is None:
+            with self._lock:
+                tokenizer = self._tokenizers.get(name)
+                if tokenizer is None:
+                    try:
+                        tokenizer = self._load(name)
+                    except Exception as e:
+                        tokenizer = TokenizerUnavailable(f"Could not load tokenizer '{name}': {e}")
+                    self._tokenizers[name] = tokenizer
+        if isinstance(tokenizer, TokenizerUnavailable):
+            raise tokenizer
+        return tokenizer
+
+    def count_tokens(self, text: str, name: str = "gpt2") -> int:
+        return len(self.get(name).encode(text))
+
+    def count_tokens_batch(self, texts: Sequence[str], name: str = "gpt2") -> List[int]:
+        return [len(ids) for ids in self.get(name).encode_batch(texts)]
+
+    def snapshot_path(self, name: str) -> Path:
+        return self.snapshot_dir / name.replace("/", "__")
+
+    def _load(self, name: str) -> Tokenizer:
+        encoding_name = TIKTOKEN_ALIASES.get(name, name)
+        if encoding_name in TIKTOKEN_ENCODINGS:
+            try:
+                import tiktoken
+
+                return TiktokenTokenizer(tiktoken.get_encoding(encoding_name))
+            except Exception:
+                # Encoding file not cached locally; fall back to the HF tokenizer
+                # if there is one with the same vocabulary.
+                if name not in TIKTOKEN_ALIASES:
+                    raise
+
+        snapshot = self.snapshot_path(name)
+        bpe_file = snapshot / "original" / "tokenizer.model"
+        if "llama-3" in name.lower() and bpe_file.exists():
+            import tiktoken
+            from tiktoken.load import load_tiktoken_bpe
+
+            encoding = tiktoken.Encoding(
+                name=name,
+                pat_str=LLAMA3_PAT_STR,
+                mergeable_ranks=load_tiktoken_bpe(str(bpe_file)),
+                special_tokens={},
+            )
+            return TiktokenTokenizer(encoding)
+
+        from transformers import AutoTokenizer
+
+        if snapshot.exists():
+            tokenizer = AutoTokenizer.from_pretrained(str(snapshot), local_files_only=True)
+        else:
+            tokenizer = AutoTokenizer.from_pretrained(name, local_files_only=self.offline)
+        return HFTokenizer(tokenizer, name)
+
+
+registry = TokenizerRegistry()
+
+
+def get_tokenizer(name: str = "gpt2") -> Tokenizer:
+    return registry.get(name)
+
+
+def count_tokens(text: str, name: str = "gpt2") -> int:
+    return registry.count_tokens(text, name)
+
+
+def count_tokens_batch(texts: Sequence[str], name: str = "gpt2") -> List[int]:
+    return registry.count_tokens_batch(texts, name)
@@ -0,0 +1,146 @@
+"""Structured tool calls for the agent nodes, as an alternative to the ReAct text protocol.
+
+With the Thought / Action / Action Input protocol (react_stream.py) every
+answer the parser cannot read costs another agent iteration, and the GitHub
+agent even finds its tool by substring-matching tool names in the reply.
+Here the tools are bound to the model with `bind_tools`, as in
+example_ollama.py, so Ollama returns `tool_calls` with JSON arguments:
+
+- `ToolRouter` is built once from the tools: a name -> tool table (that also
+  accepts `Get Issue` / `get_issue` style spellings) and each tool's argument
+  schema; `validate` checks a call's arguments against the schema before
+  anything runs,
+- `decide_with_tools` / `adecide_with_tools` run the tool-bound chain and
+  return the same `AgentDecision` as `stream_react`, so `call_agent` only
+  swaps the call that produces it; a call with unknown tool or invalid
+  arguments is reported like an unparseable ReAct answer.
+
+    router = ToolRouter([web_search_tool])
+    agent = prompt | llm.bind_tools(router.tools)
+    decision = decide_with_tools(agent, {"messages": messages}, router)
+    if decision.is_tool_call:
+        result = router.run(decision.tool_name, decision.tool_args)
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, ValidationError
+
+from react_stream import AgentDecision
+
+
+class ToolCallError(ValueError):
+    """The model asked for a tool that does not exist, or with arguments that do not fit its schema."""
+
+
+def _tool_key(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+class ToolRouter:
+    """Name lookup and argument validation for a fixed set of tools, prepared once."""
+
+    def __init__(self, tools: Sequence[BaseTool]):
+        self.tools: List[BaseTool] = list(tools)
+        self._by_key: Dict[str, BaseTool] = {}
+        self._schemas: Dict[str, Optional[type]] = {}
+        for tool in self.tools:
+            self._by_key[tool.name] = tool
+            self._by_key.setdefault(_tool_key(tool.name), tool)
+            schema = tool.tool_call_schema
+            self._schemas[tool.name] = schema if isinstance(schema, type) and issubclass(schema, BaseModel) else None
+
+    def resolve(self, name: str) -> BaseTool:
+        tool = self._by_key.get(name) or self._by_key.get(_tool_key(name))
+        if tool is None:
+            raise ToolCallError(f"Tool '{name}' not found.")
+        return tool
+
+    def validate(self, name: str, args: Union[str, Dict[str, Any]]) -> Tuple[BaseTool, Dict[str, Any]]:
+        """The tool and its arguments, checked against the tool's schema.
+
+        A string (a ReAct `Action Input`) is accepted for tools with a single
+        argument.
+        """
+        tool = self.resolve(name)
+        schema = self._schemas[tool.name]
+        if schema is None:
+            return tool, args if isinstance(args, dict) else {"input": args}
+        if isinstance(args, str):
+            fields = list(schema.model_fields)
+            if len(fields) != 1:
+                raise ToolCallError(f"Tool '{tool.name}' takes {fields}, got a single string.")
+            args = {fields[0]: args}
+        try:
+            schema.model_validate(args)
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, err['loc'])) or 'args'}: {err['msg']}" for err in e.errors())
+            raise ToolCallError(f"Invalid arguments for tool '{tool.name}': {errors}") from None
+        return tool, args
+
+    def run(self, name: str, args: Union[str, Dict[str, Any]]) -> str:
+        try:
+            tool, args = self.validate(name, args)
+        except ToolCallError as e:
+            return f"Error: {e}"
+        return tool.invoke(args)
+
+    async def arun(self, name: str, args: Union[str, Dict[str, Any]]) -> str:
+        try:
+            tool, args = self.validate(name, args)
+        except ToolCallError as e:
+            return f"Error: {e}"
+        return await tool.ainvoke(args)
+
+    def tool_message(self, tool_call: Dict[str, Any]) -> ToolMessage:
+        """Run one `AIMessage.tool_calls` entry and wrap the result for the conversation."""
+        try:
+            tool, args = self.validate(tool_call["name"], tool_call["args"])
+        except ToolCallError as e:
+            return ToolMessage(content=f"Error: {e}", tool_call_id=tool_call["id"], status="error")
+        return ToolMessage(content=str(tool.invoke(args)), tool_call_id=tool_call["id"], name=tool.name)
+
+
+def decision_from_message(message: AIMessage, router: ToolRouter) -> AgentDecision:
+    """Read a tool-bound model's reply as an `AgentDecision` (first valid tool call wins)."""
+    decision = AgentDecision(text=message.content if isinstance(message.content, str) else json.dumps(message.content))
+    problems = [f"Unparseable tool call {call.get('name')!r}: {call.get('error')}"
+                for call in getattr(message, "invalid_tool_calls", [])]
+    for call in message.tool_calls:
+        try:
+            tool, args = router.validate(call["name"], call["args"])
+        except ToolCallError as e:
+            problems.append(str(e))
+            continue
+        decision.needs_tool = True
+        decision.tool_name = tool.name
+        decision.tool_args = args
+        # Single-argument tools (web search) keep the plain query as tool_input.
+        decision.tool_input = next(iter(args.values())) if len(args) == 1 else json.dumps(args)
+        if not isinstance(decision.tool_input, str):
+            decision.tool_input = json.dumps(decision.tool_input)
+        return decision
+    if problems:
+        decision.needs_tool = True
+        decision.text = "\n".join(filter(None, [decision.text, *problems]))
+    elif decision.text.strip():
+        decision.needs_tool = False
+        decision.final_answer = decision.text.strip()
+    return decision
+
+
+def decide_with_tools(chain, inputs: Dict[str, Any], router: ToolRouter, config: Optional[Dict] = None) -> AgentDecision:
+    """Run a `prompt | llm.bind_tools(...)` chain and return its decision.
+
+    Not streamed: Ollama sends tool calls in one piece at the end of the
+    reply, so there is nothing to stop early on.
+    """
+    return decision_from_message(chain.invoke(inputs, config=config), router)
+
+
+async def adecide_with_tools(chain, inputs: Dict[str, Any], router: ToolRouter, config: Optional[Dict] = None) -> AgentDecision:
+    """Async version of `decide_with_tools`."""
+    return decision_from_message(await chain.ainvoke(inputs, config=config), router)
@@ -0,0 +1,179 @@
+"""Run the tool calls of one model response concurrently, with timeouts.
+
+example_ollama.py runs `result.tool_calls` one after another, so a reply that
+asks for three independent lookups waits for the sum of their latencies.
+`ToolExecutor` runs them at the same time:
+
+- tools with a native async implementation are awaited on the event loop,
+  sync tools run on a thread pool (at most `max_parallel` calls in flight in
+  total),
+- each call has a timeout (`timeout`, or a per-tool value from `timeouts`);
+  a call that times out or fails becomes an error `ToolMessage`, the others
+  are not affected, and cancelling `arun` cancels every pending call,
+- with `concurrent` (names of tools without side effects), only those run
+  side by side; any other tool is a barrier: it starts after every earlier
+  call of the reply has finished and the calls after it wait for it, so
+  tools that change shared state (a checked-out branch, a file) see each
+  other's effects in request order,
+- results come back in the order of `tool_calls`, as `ToolMessage`s ready
+  to append to the conversation,
+- every call is timed (`ToolCallTiming`: start offset in its batch,
+  duration, outcome, async or thread) for profiling.
+
+Arguments are validated by a `tool_calling.ToolRouter` first. A sync tool
+that times out cannot be interrupted: its thread keeps running (and holds
+a pool slot) until the tool returns, only the result is dropped.
+
+    executor = ToolExecutor(tools, max_parallel=4, timeout=30, timeouts={"web_search_tool": 10},
+                            concurrent={"web_search_tool"})
+    messages += executor.run(result.tool_calls)
+    print(executor.stats, executor.timings[-1])
+"""
+import asyncio
+import contextvars
+import functools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Collection, Deque, Dict, List, Optional, Sequence, Union
+
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool, StructuredTool
+
+from tool_calling import ToolCallError, ToolRouter
+
+
+@dataclass
+class ToolCallTiming:
+    name: str
+    call_id: str
+    started: float  # seconds after the batch started
+    seconds: float
+    status: str  # ok, error, timeout or cancelled
+    mode: str  # async or thread
+
+
+@dataclass
+class ToolExecutorStats:
+    batches: int = 0
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    cancelled: int = 0
+    tool_seconds: float = 0.0  # sum of the calls' durations
+    wall_seconds: float = 0.0  # sum of the batches' durations
+
+    @property
+    def overlap(self) -> float:
+        """How many calls were running at once on average (1.0 = sequential)."""
+        return self.tool_seconds / self.wall_seconds if self.wall_seconds else 0.0
+
+
+def _has_native_async(tool: BaseTool) -> bool:
+    if isinstance(tool, StructuredTool):
+        return tool.coroutine is not None
+    return type(tool)._arun is not BaseTool._arun
+
+
+class ToolExecutor:
+    """Concurrent, time-limited execution of a response's `tool_calls`."""
+
+    def __init__(self, tools: Union[ToolRouter, Sequence[BaseTool]], max_parallel: int = 4,
+                 timeout: Optional[float] = 30.0, timeouts: Optional[Dict[str, float]] = None,
+                 keep_timings: int = 1000, concurrent: Optional[Collection[str]] = None):
+        self.router = tools if isinstance(tools, ToolRouter) else ToolRouter(tools)
+        self.max_parallel = max_parallel
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.concurrent = None if concurrent is None else frozenset(concurrent)  # None: every tool
+        self.stats = ToolExecutorStats()
+        self.timings: Deque[ToolCallTiming] = deque(maxlen=keep_timings)
+        self._native_async = {tool.name: _has_native_async(tool) for tool in self.router.tools}
+        self._pool = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="tool")
+
+    def run(self, tool_calls: Sequence[Dict[str, Any]]) -> List[ToolMessage]:
+        """Sync entry point; must not be called from a running event loop."""
+        return asyncio.run(self.arun(tool_calls))
+
+    async def arun(self, tool_calls: Sequence[Dict[str, Any]]) -> List[ToolMessage]:
+        """One `ToolMessage` per call, in request order."""
+        if not tool_calls:
+            return []
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        try:
+            results: List[ToolMessage] = []
+            for group in self._groups(tool_calls):
+                results.extend(await asyncio.gather(*(self._run_one(call, semaphore, start) for call in group)))
+            return results
+        finally:
+            self.stats.batches += 1
+            self.stats.wall_seconds += time.perf_counter() - start
+
+    def _groups(self, tool_calls: Sequence[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Consecutive concurrent calls share a group; every other call is a group of its own."""
+        if self.concurrent is None:
+            return [list(tool_calls)]
+        groups: List[List[Dict[str, Any]]] = []
+        side_by_side = False
+        for call in tool_calls:
+            try:
+                # The router also accepts aliases (snake_case); classify by the tool's own name.
+                safe = self.router.resolve(call["name"]).name in self.concurrent
+            except ToolCallError:
+                safe = True  # unknown tools never run (validation fails), so they need no barrier
+            if safe and side_by_side:
+                groups[-1].append(call)
+            else:
+                groups.append([call])
+            side_by_side = safe
+        return groups
+
+    async def _run_one(self, tool_call: Dict[str, Any], semaphore: asyncio.Semaphore, batch_start: float) -> ToolMessage:
+        call_id = tool_call.get("id") or ""
+        try:
+            tool, args = self.router.validate(tool_call["name"], tool_call["args"])
+        except ToolCallError as e:
+            self._record(tool_call["name"], call_id, batch_start, time.perf_counter(), "error", "-")
+            return ToolMessage(content=f"Error: {e}", tool_call_id=call_id, status="error")
+
+        timeout = self.timeouts.get(tool.name, self.timeout)
+        mode = "async" if self._native_async[tool.name] else "thread"
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if mode == "async":
+                    result = await asyncio.wait_for(tool.ainvoke(args), timeout)
+                else:
+                    # copy_context keeps callbacks/tracing attached to the caller's run
+                    call = functools.partial(contextvars.copy_context().run, tool.invoke, args)
+                    result = await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(self._pool, call), timeout)
+            except asyncio.TimeoutError:
+                self._record(tool.name, call_id, batch_start, started, "timeout", mode)
+                return ToolMessage(content=f"Error: tool '{tool.name}' timed out after {timeout:g}s",
+                                   tool_call_id=call_id, name=tool.name, status="error")
+            except asyncio.CancelledError:
+                self._record(tool.name, call_id, batch_start, started, "cancelled", mode)
+                raise
+            except Exception as e:
+                self._record(tool.name, call_id, batch_start, started, "error", mode)
+                return ToolMessage(content=f"Error: {e!r}", tool_call_id=call_id, name=tool.name, status="error")
+        self._record(tool.name, call_id, batch_start, started, "ok", mode)
+        return ToolMessage(content=str(result), tool_call_id=call_id, name=tool.name)
+
+    def _record(self, name: str, call_id: str, batch_start: float, started: float, status: str, mode: str):
+        seconds = time.perf_counter() - started
+        self.timings.append(ToolCallTiming(name, call_id, started - batch_start, seconds, status, mode))
+        self.stats.calls += 1
+        self.stats.tool_seconds += seconds
+        if status == "error":
+            self.stats.errors += 1
+        elif status == "timeout":
+            self.stats.timeouts += 1
+        elif status == "cancelled":
+            self.stats.cancelled += 1
+
+    def close(self):
+        # Don't wait for sync tools that timed out and are still running.
+        self._pool.shutdown(wait=False, cancel_futures=True)